@@ -1,19 +1,51 @@
-from fastapi import APIRouter, FastAPI
+from fastapi import APIRouter, Depends, FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from app.routes import auth, rbac, audit, users
+from app.routes import (
+    auth, rbac, audit, users, jwks, system, dashboard, batch, profiling, settings as settings_routes,
+)
 from app.config import settings
+from app.dependencies.database import db_session
+from app.middleware.admission import AdmissionMiddleware, admission
+from app.middleware.compression import CompressionMiddleware
 
 def create_app() -> FastAPI:
     # Include routers
-    base = APIRouter(prefix=settings.API_PREFIX)
+    # One database session per API request, shared by auth, permission
+    # checks and the handler
+    base = APIRouter(prefix=settings.API_PREFIX, dependencies=[Depends(db_session)])
     base.include_router(auth.router)
     base.include_router(rbac.router)
     base.include_router(audit.router)
     base.include_router(users.router)
+    base.include_router(system.router)
+    base.include_router(profiling.router)
+    base.include_router(dashboard.router)
+    base.include_router(batch.router)
+    base.include_router(settings_routes.router)
     
     app = FastAPI(title=settings.PROJECT_NAME)
     app.include_router(base)
+    app.include_router(jwks.router)
+    if settings.SERVE_FRONTEND:
+        from app.assets import AssetFiles
+        # Mounted last so it only sees paths no route claimed
+        app.mount("/", AssetFiles(directory=settings.FRONTEND_BUILD_DIR, html=True), name="frontend")
     
+    # Compress large responses; innermost so shed and preflight responses skip it
+    app.add_middleware(
+        CompressionMiddleware,
+        minimum_size=settings.COMPRESSION_MIN_SIZE,
+        gzip_level=settings.COMPRESSION_GZIP_LEVEL,
+        brotli_quality=settings.COMPRESSION_BROTLI_QUALITY
+    )
+
+    # Admission control; added before CORS so shed responses still get CORS headers
+    app.add_middleware(
+        AdmissionMiddleware,
+        controller=admission,
+        exempt=(f"{settings.API_PREFIX}/system/metrics",)
+    )
+
     # Configure CORS
     app.add_middleware(
         CORSMiddleware,
@@ -0,0 +1,198 @@
+import argparse
+import gzip
+import hashlib
+import json
+import os
+import posixpath
+import re
+import shutil
+from mimetypes import guess_type
+from typing import Callable, Dict, List, Optional
+from starlette.datastructures import Headers
+from starlette.responses import FileResponse, Response
+from starlette.staticfiles import NotModifiedResponse, StaticFiles
+from starlette.types import Scope
+from app.middleware.compression import brotli, choose_encoding
+
+MANIFEST = "manifest.json"
+
+# Origin the sources call the API on; the build points it at ``api_origin``
+DEV_API_ORIGIN = "http://localhost:8000"
+
+TEXT_EXTENSIONS = {".html", ".css", ".js", ".mjs", ".json", ".svg", ".txt", ".map"}
+PAGE_EXTENSIONS = {".html"}
+
+# Files smaller than this are not worth a compressed variant
+MIN_COMPRESS_SIZE = 256
+
+SUFFIXES = {"br": ".br", "gzip": ".gz"}
+
+IMMUTABLE = "public, max-age=31536000, immutable"
+REVALIDATE = "no-cache"
+HASHED_NAME = re.compile(r"\.[0-9a-f]{10}\.[^./]+$")
+
+# Relative URL references, with the URL in group "url"
+REFERENCES = {
+    ".html": re.compile(r"""\s(?:src|href)=(?P<quote>["'])(?P<url>[^"'#]+)(?P=quote)"""),
+    ".css": re.compile(r"""url\(\s*(?P<quote>["']?)(?P<url>[^"')]+)(?P=quote)\s*\)"""),
+    ".js": re.compile(
+        r"""(?:\bfrom\s*|\bimport\s*\(?\s*)(?P<quote>["'])(?P<url>\.{1,2}/[^"']+)(?P=quote)"""
+    ),
+}
+REFERENCES[".mjs"] = REFERENCES[".js"]
+
+def build(source: str, target: str, api_origin: str = "") -> Dict:
+    """Build the frontend in ``source`` into ``target`` and return the manifest.
+
+    Every file referenced from HTML, CSS or JavaScript is renamed to include
+    a hash of its content, and the references are rewritten to match, so
+    the files can be cached forever. HTML pages keep their names. Text files
+    also get ``.gz`` (and, with the optional ``brotli`` package, ``.br``)
+    siblings. Calls to ``DEV_API_ORIGIN`` are pointed at ``api_origin``.
+    """
+    source = os.path.abspath(source)
+    target = os.path.abspath(target)
+    if source == target or target.startswith(source + os.sep):
+        raise ValueError("The build directory must be outside the source directory")
+    if os.path.isdir(target):
+        # Only ever wipe a directory an earlier build produced
+        if os.listdir(target) and not os.path.exists(os.path.join(target, MANIFEST)):
+            raise ValueError(f"{target} exists and is not a frontend build")
+        shutil.rmtree(target)
+
+    sources = {
+        posixpath.join(*os.path.relpath(os.path.join(root, name), source).split(os.sep))
+        for root, _, names in os.walk(source)
+        for name in names
+    }
+    outputs: Dict[str, str] = {}
+    encodings: Dict[str, List[str]] = {}
+
+    def output(path: str) -> str:
+        if path in outputs:
+            return outputs[path]
+        # Guards against reference cycles, which then keep the plain name
+        outputs[path] = path
+        with open(os.path.join(source, *path.split("/")), "rb") as handle:
+            data = handle.read()
+        extension = posixpath.splitext(path)[1].lower()
+        if extension in TEXT_EXTENSIONS:
+            text = data.decode("utf-8").replace(DEV_API_ORIGIN, api_origin)
+            data = _rewrite(text, path, extension, sources, output).encode("utf-8")
+        name = path if extension in PAGE_EXTENSIONS else _fingerprint(path, data)
+        encodings[name] = _write(os.path.join(target, *name.split("/")), data, extension)
+        outputs[path] = name
+        return name
+
+    for path in sorted(sources):
+        output(path)
+
+    manifest = {
+        "files": dict(sorted(outputs.items())),
+        "encodings": {name: found for name, found in sorted(encodings.items()) if found},
+    }
+    with open(os.path.join(target, MANIFEST), "w") as handle:
+        json.dump(manifest, handle, indent=2)
+    return manifest
+
+def _rewrite(text: str, path: str, extension: str, sources: set,
+             output: Callable[[str], str]) -> str:
+    pattern = REFERENCES.get(extension)
+    if pattern is None:
+        return text
+
+    def replace(match: re.Match) -> str:
+        url = match.group("url")
+        if re.match(r"^[a-z][a-z0-9+.-]*:|^//", url, re.IGNORECASE):
+            return match.group(0)
+        plain = re.split(r"[?#]", url, 1)[0]
+        if plain.startswith("/"):
+            referenced = posixpath.normpath(plain.lstrip("/"))
+        else:
+            referenced = posixpath.normpath(posixpath.join(posixpath.dirname(path), plain))
+        if referenced not in sources or referenced == path:
+            return match.group(0)
+        renamed = posixpath.basename(output(referenced))
+        new_url = plain[:len(plain) - len(posixpath.basename(plain))] + renamed + url[len(plain):]
+        start, end = match.span("url")
+        offset = match.start(0)
+        whole = match.group(0)
+        return whole[:start - offset] + new_url + whole[end - offset:]
+
+    return pattern.sub(replace, text)
+
+def _fingerprint(path: str, data: bytes) -> str:
+    stem, extension = posixpath.splitext(path)
+    return f"{stem}.{hashlib.sha256(data).hexdigest()[:10]}{extension}"
+
+def _write(path: str, data: bytes, extension: str) -> List[str]:
+    """Write ``data`` and its compressed variants; return the encodings written."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as handle:
+        handle.write(data)
+    if extension not in TEXT_EXTENSIONS or len(data) < MIN_COMPRESS_SIZE:
+        return []
+    variants = [("gzip", ".gz", lambda: gzip.compress(data, 9, mtime=0))]
+    if brotli is not None:
+        variants.insert(0, ("br", ".br", lambda: brotli.compress(data, quality=11)))
+    found = []
+    for encoding, suffix, compress in variants:
+        packed = compress()
+        if len(packed) < len(data):
+            with open(path + suffix, "wb") as handle:
+                handle.write(packed)
+            found.append(encoding)
+    return found
+
+class AssetFiles(StaticFiles):
+    """``StaticFiles`` for a ``build`` output.
+
+    Serves the precompressed variant the client accepts, marks
+    content-hashed files immutable and has pages revalidated.
+    """
+
+    def __init__(self, directory: str, **kwargs):
+        super().__init__(directory=directory, **kwargs)
+        with open(os.path.join(directory, MANIFEST)) as handle:
+            manifest = json.load(handle)
+        self._root = os.path.realpath(directory)
+        self._encodings: Dict[str, List[str]] = manifest.get("encodings", {})
+
+    def file_response(self, full_path, stat_result: os.stat_result, scope: Scope,
+                      status_code: int = 200) -> Response:
+        request_headers = Headers(scope=scope)
+        name = posixpath.join(*os.path.relpath(full_path, self._root).split(os.sep))
+        available = self._encodings.get(name)
+        headers = {"Cache-Control": IMMUTABLE if HASHED_NAME.search(name) else REVALIDATE}
+        encoding: Optional[str] = None
+        if available:
+            headers["Vary"] = "Accept-Encoding"
+            encoding = choose_encoding(request_headers.get("accept-encoding", ""), available)
+        if encoding is not None:
+            headers["Content-Encoding"] = encoding
+            full_path = str(full_path) + SUFFIXES[encoding]
+            stat_result = os.stat(full_path)
+
+        response = FileResponse(
+            full_path, status_code=status_code, headers=headers,
+            media_type=guess_type(name)[0] or "text/plain", stat_result=stat_result
+        )
+        if self.is_not_modified(response.headers, request_headers):
+            return NotModifiedResponse(response.headers)
+        return response
+
+def main():
+    root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    parser = argparse.ArgumentParser(description="Build the frontend for AssetFiles")
+    parser.add_argument("--source", default=os.path.join(root, "frontend", "public"))
+    parser.add_argument("--target", default=os.path.join(root, "frontend", "dist"))
+    parser.add_argument(
+        "--api-origin", default="",
+        help=f"Replaces {DEV_API_ORIGIN} in the sources; empty means same origin"
+    )
+    args = parser.parse_args()
+    manifest = build(args.source, args.target, args.api_origin)
+    print(f"Built {len(manifest['files'])} files into {args.target}")
+
+if __name__ == "__main__":
+    main()
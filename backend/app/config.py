@@ -8,8 +8,12 @@ class Settings(BaseSettings):
     
     # Security
     SECRET_KEY: str = "secret-key-here"  # Change this in production!
-    ALGORITHM: str = "HS256"
+    # RS* algorithms sign with the rotating key ring; HS* fall back to SECRET_KEY
+    ALGORITHM: str = "RS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
+    REFRESH_TOKEN_EXPIRE_DAYS: int = 7
+    SIGNING_KEY_ROTATION_DAYS: int = 30
+    JWKS_CACHE_SECONDS: int = 3600
     
     # CORS
     ALLOWED_ORIGINS: List[str] = [
@@ -19,8 +23,52 @@ class Settings(BaseSettings):
         "http://127.0.0.1:8000",
     ]
     
+    # Admission control: API requests in flight and waiting before shedding
+    ADMISSION_TOTAL_LIMIT: int = 64
+    ADMISSION_MAX_QUEUE: int = 256
+
+    # Response compression (brotli needs the optional ``brotli`` package)
+    COMPRESSION_MIN_SIZE: int = 1024
+    COMPRESSION_GZIP_LEVEL: int = 6
+    COMPRESSION_BROTLI_QUALITY: int = 4
+
+    # Upper bound on sub-requests accepted by POST /batch
+    BATCH_MAX_REQUESTS: int = 20
+
     # Database
     DATABASE_URL: str = "sqlite:///./app.db"
+    READ_POOL_SIZE: int = 8
+    # Upper bound on how long another worker's write can leave caches stale
+    CHANGE_POLL_INTERVAL: float = 0.5
+    # Upper bound on how long last_login/last_seen updates stay in memory
+    ACTIVITY_FLUSH_INTERVAL: float = 30.0
+
+    # SQLite maintenance schedule, in seconds. Due tasks wait for a moment
+    # with at most MAINTENANCE_IDLE_REQUESTS API requests in flight, but no
+    # longer than MAINTENANCE_MAX_DEFER.
+    MAINTENANCE_ENABLED: bool = True
+    MAINTENANCE_CHECKPOINT_INTERVAL: float = 300
+    MAINTENANCE_OPTIMIZE_INTERVAL: float = 3600
+    MAINTENANCE_ANALYZE_INTERVAL: float = 86400
+    MAINTENANCE_VACUUM_INTERVAL: float = 3600
+    MAINTENANCE_VACUUM_PAGES: int = 1000
+    MAINTENANCE_IDLE_REQUESTS: int = 2
+    MAINTENANCE_MAX_DEFER: float = 600
+
+    # Online backups: pages copied per step and the pause between steps
+    BACKUP_DIR: str = "./backups"
+    BACKUP_KEEP: int = 10
+    BACKUP_STEP_PAGES: int = 256
+    BACKUP_STEP_SLEEP: float = 0.005
+
+    # On-demand profiling: longest CPU profile, and how long allocation
+    # tracing may stay on before it stops by itself
+    PROFILE_MAX_SECONDS: float = 60
+    PROFILE_TRACE_MAX_SECONDS: float = 900
+
+    # Serve the admin frontend built by ``python -m app.assets`` at "/"
+    SERVE_FRONTEND: bool = False
+    FRONTEND_BUILD_DIR: str = "../frontend/dist"
     
     class Config:
         case_sensitive = True
@@ -0,0 +1,296 @@
+import asyncio
+import logging
+import sqlite3
+import threading
+import time
+from collections import defaultdict
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Tables whose changes are broadcast to every worker, with the column that
+# identifies the changed entity. Triggers bump ``change_versions`` and append
+# to ``change_log`` for each of them.
+TRACKED_TABLES: Dict[str, str] = {
+    "users": "id",
+    "roles": "id",
+    "permissions": "id",
+    "role_permissions": "role_id",
+    "revoked_tokens": "jti",
+    "revoked_user_tokens": "user_id",
+    "signing_keys": "kid",
+}
+
+# Refresh tokens are inserted on every login; only updates (rotation,
+# revocation) need to reach the other workers.
+UPDATE_ONLY_TABLES: Dict[str, str] = {
+    "refresh_tokens": "token_hash",
+}
+
+# Columns whose updates are not broadcast. Activity timestamps change on
+# nearly every request and would otherwise invalidate every user cache.
+UNTRACKED_COLUMNS: Dict[str, Tuple[str, ...]] = {
+    "users": ("last_login", "last_seen"),
+}
+
+# The remaining columns of those tables. An update is broadcast unless all
+# of them are unchanged, so one that also touches an untracked column still
+# reaches the other workers. Columns added to these tables belong here.
+TRACKED_COLUMNS: Dict[str, Tuple[str, ...]] = {
+    "users": ("id", "username", "email", "hashed_password", "role_id", "is_active", "created_at"),
+}
+
+# ``change_versions`` counter of the untracked activity columns. It has no
+# ``change_log`` rows; whoever writes the columns bumps it once per batch so
+# ETags covering them still move.
+ACTIVITY_VERSION = "users_activity"
+
+CHANGE_LOG_RETENTION_SECONDS = 3600
+
+# How far ``reset_change_tracking`` skips ahead. The state it is given is
+# read before the tables are replaced, so commits made in between may
+# already have been seen; they would have to number this many to collide.
+RESET_GAP = 1_000_000
+
+Listener = Callable[[str, Optional[str]], None]
+
+def create_change_tracking(db: sqlite3.Connection):
+    """Create the change tables and the triggers that feed them."""
+    db.execute('''
+        CREATE TABLE IF NOT EXISTS change_versions (
+            entity TEXT PRIMARY KEY,
+            version INTEGER NOT NULL DEFAULT 0
+        )
+    ''')
+    db.execute('''
+        CREATE TABLE IF NOT EXISTS change_log (
+            seq INTEGER PRIMARY KEY AUTOINCREMENT,
+            entity TEXT NOT NULL,
+            entity_id TEXT,
+            changed_at REAL NOT NULL DEFAULT ((julianday('now') - 2440587.5) * 86400.0)
+        )
+    ''')
+
+    db.execute(
+        "INSERT OR IGNORE INTO change_versions (entity, version) VALUES (?, 0)",
+        (ACTIVITY_VERSION,)
+    )
+    events = [(table, key, ("INSERT", "UPDATE", "DELETE")) for table, key in TRACKED_TABLES.items()]
+    events += [(table, key, ("UPDATE",)) for table, key in UPDATE_ONLY_TABLES.items()]
+    for table, key, operations in events:
+        db.execute(
+            "INSERT OR IGNORE INTO change_versions (entity, version) VALUES (?, 0)",
+            (table,)
+        )
+        for operation in operations:
+            row = "OLD" if operation == "DELETE" else "NEW"
+            name = f"trg_{table}_{operation.lower()}_change"
+            condition = ""
+            if operation == "UPDATE" and table in UNTRACKED_COLUMNS:
+                # Skip updates that only moved untracked columns
+                condition = "WHEN NOT (" + " AND ".join(
+                    f"NEW.{column} IS OLD.{column}" for column in TRACKED_COLUMNS[table]
+                ) + ")"
+                db.execute(f"DROP TRIGGER IF EXISTS {name}")
+            db.execute(f'''
+                CREATE TRIGGER IF NOT EXISTS {name}
+                AFTER {operation} ON {table}
+                {condition}
+                BEGIN
+                    UPDATE change_versions SET version = version + 1 WHERE entity = '{table}';
+                    INSERT INTO change_log (entity, entity_id) VALUES ('{table}', {row}.{key});
+                END
+            ''')
+
+def bump_version(db: sqlite3.Connection, entity: str):
+    """Move the ``change_versions`` counter of ``entity`` without logging rows."""
+    db.execute("UPDATE change_versions SET version = version + 1 WHERE entity = ?", (entity,))
+
+def reset_change_tracking(db: sqlite3.Connection, last_seq: int, versions: Dict[str, int]):
+    """Announce that every tracked table changed wholesale, e.g. after a restore.
+
+    ``last_seq`` and ``versions`` are the change state read before the
+    tables were replaced. Numbering resumes ``RESET_GAP`` past them, so no
+    worker takes the new rows for ones it has already seen and no ``ETag``
+    can repeat, even if other workers committed after the state was read.
+    """
+    entities = [*TRACKED_TABLES, *UPDATE_ONLY_TABLES]
+    if not db.execute(
+        "UPDATE sqlite_sequence SET seq = MAX(seq, ?) + ? WHERE name = 'change_log'",
+        (last_seq, RESET_GAP)
+    ).rowcount:
+        db.execute(
+            "INSERT INTO sqlite_sequence (name, seq) VALUES ('change_log', ?)",
+            (last_seq + RESET_GAP,)
+        )
+    db.executemany(
+        "UPDATE change_versions SET version = MAX(version, ?) + ? WHERE entity = ?",
+        [
+            (versions.get(entity, 0), RESET_GAP, entity)
+            for entity in (*entities, ACTIVITY_VERSION)
+        ]
+    )
+    # A NULL entity_id tells listeners to drop everything they hold
+    db.executemany(
+        "INSERT INTO change_log (entity, entity_id) VALUES (?, NULL)",
+        [(entity,) for entity in entities]
+    )
+
+class ChangeFeed:
+    """Delivers row-level change notifications written by any process.
+
+    Every worker keeps one connection open and checks ``PRAGMA data_version``,
+    which only moves when another connection has committed. When it moves,
+    new ``change_log`` rows are read and handed to the listeners subscribed to
+    their table. ``run`` polls in the background so notifications arrive
+    within ``interval`` seconds; hot paths can call ``sync`` to catch up
+    immediately before trusting a cache.
+    """
+
+    def __init__(self):
+        self._conn: Optional[sqlite3.Connection] = None
+        self._writer = None
+        self._data_version: Optional[int] = None
+        self._last_seq = 0
+        # Moves whenever another connection's commits have been picked up
+        self.position = 0
+        self._listeners: Dict[str, List[Listener]] = defaultdict(list)
+        self._versions: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._last_prune = 0.0
+
+    def subscribe(self, entities: Iterable[str], listener: Listener):
+        """Call ``listener(entity, entity_id)`` for changes to ``entities``.
+
+        ``entity_id`` is ``None`` when the feed lost track of individual rows
+        and every cached entry of that entity must be dropped.
+        """
+        for entity in entities:
+            self._listeners[entity].append(listener)
+
+    def start(self, database: str, writer):
+        with self._lock:
+            self._writer = writer
+            if self._conn is None:
+                self._conn = sqlite3.connect(database, check_same_thread=False)
+                self._data_version = self._conn.execute("PRAGMA data_version").fetchone()[0]
+                row = self._conn.execute(
+                    "SELECT seq FROM sqlite_sequence WHERE name = 'change_log'"
+                ).fetchone()
+                self._last_seq = row[0] if row else 0
+                self._load_versions()
+
+    def stop(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def sync(self) -> int:
+        """Dispatch pending changes and return how many were delivered."""
+        if self._conn is None:
+            return 0
+        with self._lock:
+            data_version = self._conn.execute("PRAGMA data_version").fetchone()[0]
+            if data_version == self._data_version:
+                return 0
+            self._data_version = data_version
+            self.position += 1
+            oldest = self._conn.execute("SELECT MIN(seq) FROM change_log").fetchone()[0]
+            changes: List[Tuple[int, str, Optional[str]]] = self._conn.execute(
+                "SELECT seq, entity, entity_id FROM change_log WHERE seq > ? ORDER BY seq",
+                (self._last_seq,)
+            ).fetchall()
+            missed = oldest is not None and oldest > self._last_seq + 1
+            if changes:
+                self._last_seq = changes[-1][0]
+            self._load_versions()
+            self._prune()
+
+        if missed:
+            # Rows were pruned before this worker read them
+            for entity in list(self._listeners):
+                self._dispatch(entity, None)
+        for _, entity, entity_id in changes:
+            self._dispatch(entity, entity_id)
+        return len(changes)
+
+    def versions(self, entities: Iterable[str]) -> Optional[Tuple[int, ...]]:
+        """Current change counters of ``entities``, or ``None`` before ``start``."""
+        if self._conn is None:
+            return None
+        self.sync()
+        return tuple(self._versions.get(entity, 0) for entity in entities)
+
+    async def run(self, interval: float):
+        while True:
+            try:
+                self.sync()
+            except sqlite3.Error:
+                logger.exception("Change feed poll failed")
+            await asyncio.sleep(interval)
+
+    def _load_versions(self):
+        self._versions = dict(
+            self._conn.execute("SELECT entity, version FROM change_versions").fetchall()
+        )
+
+    def _dispatch(self, entity: str, entity_id: Optional[str]):
+        for listener in self._listeners.get(entity, ()):
+            try:
+                listener(entity, entity_id)
+            except Exception:
+                logger.exception("Change listener failed for %s", entity)
+
+    def _prune(self):
+        now = time.time()
+        if now - self._last_prune < 60:
+            return
+        self._last_prune = now
+        self._writer.submit(lambda db: db.execute(
+            "DELETE FROM change_log WHERE changed_at < ?",
+            (now - CHANGE_LOG_RETENTION_SECONDS,)
+        ))
+
+change_feed = ChangeFeed()
+
+class EntityCache:
+    """Dict cache kept coherent across workers through a ``ChangeFeed``.
+
+    Every entry is tagged with the id of the ``owner`` row it was built from.
+    A change to that row drops only its entries; a change to any of the other
+    ``entities`` clears the whole cache.
+    """
+
+    def __init__(self, feed: ChangeFeed, owner: str, entities: Iterable[str] = (),
+                 max_entries: int = 10_000):
+        self._feed = feed
+        self._owner = owner
+        self._entries: Dict[object, object] = {}
+        self._keys_by_id: Dict[str, set] = defaultdict(set)
+        self._max_entries = max_entries
+        feed.subscribe((owner, *entities), self.invalidate)
+
+    def get(self, key):
+        self._feed.sync()
+        return self._entries.get(key)
+
+    def put(self, key, value, entity_id):
+        if len(self._entries) >= self._max_entries:
+            self.clear()
+        self._entries[key] = value
+        self._keys_by_id[str(entity_id)].add(key)
+
+    def invalidate(self, entity: str, entity_id: Optional[str]):
+        if entity != self._owner or entity_id is None:
+            self.clear()
+            return
+        for key in self._keys_by_id.pop(entity_id, ()):
+            self._entries.pop(key, None)
+
+    def clear(self):
+        self._entries.clear()
+        self._keys_by_id.clear()
+
+    def __len__(self):
+        return len(self._entries)
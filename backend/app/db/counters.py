@@ -0,0 +1,96 @@
+import sqlite3
+
+# Counter names; per-role and per-day counters append the role id or the
+# UTC date (YYYY-MM-DD) to their prefix.
+USERS = "users"
+ACTIVE_USERS = "active_users"
+ROLES = "roles"
+ROLE_USERS = "role_users:"
+AUDIT_EVENTS = "audit_events:"
+
+def _bump(name_sql: str, delta_sql: str) -> str:
+    return f'''
+        INSERT INTO counters (name, value) VALUES ({name_sql}, {delta_sql})
+        ON CONFLICT (name) DO UPDATE SET value = value + excluded.value;
+    '''
+
+def _role(row: str) -> str:
+    return f"'{ROLE_USERS}' || IFNULL({row}.role_id, '')"
+
+def _day(row: str) -> str:
+    return f"'{AUDIT_EVENTS}' || IFNULL(date({row}.created_at), '')"
+
+def _active(row: str) -> str:
+    return f"(CASE WHEN {row}.is_active THEN 1 ELSE 0 END)"
+
+def create_counters(db: sqlite3.Connection):
+    """Create the counters table, the triggers that keep it exact and rebuild it.
+
+    The rebuild makes the counters match the tables whenever the schema is
+    (re)applied; from then on every insert, update and delete adjusts them in
+    the same transaction as the row change.
+    """
+    db.execute('''
+        CREATE TABLE IF NOT EXISTS counters (
+            name TEXT PRIMARY KEY,
+            value INTEGER NOT NULL DEFAULT 0
+        )
+    ''')
+
+    triggers = {
+        "trg_users_insert_count": ("AFTER INSERT ON users", [
+            _bump(f"'{USERS}'", "1"),
+            _bump(f"'{ACTIVE_USERS}'", _active("NEW")),
+            _bump(_role("NEW"), "1"),
+        ]),
+        "trg_users_delete_count": ("AFTER DELETE ON users", [
+            _bump(f"'{USERS}'", "-1"),
+            _bump(f"'{ACTIVE_USERS}'", f"-{_active('OLD')}"),
+            _bump(_role("OLD"), "-1"),
+        ]),
+        "trg_users_update_count": ("AFTER UPDATE OF is_active, role_id ON users", [
+            _bump(f"'{ACTIVE_USERS}'", f"{_active('NEW')} - {_active('OLD')}"),
+            _bump(_role("OLD"), "-1"),
+            _bump(_role("NEW"), "1"),
+        ]),
+        "trg_roles_insert_count": ("AFTER INSERT ON roles", [
+            _bump(f"'{ROLES}'", "1"),
+        ]),
+        "trg_roles_delete_count": ("AFTER DELETE ON roles", [
+            _bump(f"'{ROLES}'", "-1"),
+        ]),
+        "trg_audit_logs_insert_count": ("AFTER INSERT ON audit_logs", [
+            _bump(_day("NEW"), "1"),
+        ]),
+        "trg_audit_logs_delete_count": ("AFTER DELETE ON audit_logs", [
+            _bump(_day("OLD"), "-1"),
+        ]),
+    }
+    for name, (event, statements) in triggers.items():
+        db.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS {name}
+            {event}
+            BEGIN
+                {"".join(statements)}
+            END
+        ''')
+
+    # Rebuild from the tables; existing rows predate the triggers
+    db.execute("DELETE FROM counters")
+    db.execute(f'''
+        INSERT INTO counters (name, value)
+        SELECT '{USERS}', COUNT(*) FROM users
+        UNION ALL
+        SELECT '{ACTIVE_USERS}', COUNT(*) FROM users WHERE is_active
+        UNION ALL
+        SELECT '{ROLES}', COUNT(*) FROM roles
+        UNION ALL
+        SELECT {_role("users")}, COUNT(*) FROM users GROUP BY role_id
+        UNION ALL
+        SELECT {_day("audit_logs")}, COUNT(*) FROM audit_logs
+        GROUP BY date(created_at)
+    ''')
+
+def read_counter(db: sqlite3.Connection, name: str) -> int:
+    row = db.execute("SELECT value FROM counters WHERE name = ?", (name,)).fetchone()
+    return row[0] if row else 0
@@ -1,144 +1,332 @@
+import hashlib
 import sqlite3
 from contextlib import contextmanager
-from typing import Generator
+from contextvars import ContextVar
+from functools import wraps
+from typing import Any, Callable, Generator, Iterable, Tuple
 
+from app.config import settings
+from app.db.changes import change_feed, create_change_tracking
+from app.db.counters import create_counters
+from app.db.hierarchy import add_role_parent, create_role_hierarchy
+from app.db.pool import ReadPool
+from app.db.session import DatabaseSession, current_session
+from app.db.writer import DatabaseWriter, Job
 from app.utils.security import get_password_hash
 
 DATABASE_URL = "app.db"
 
-def init_db():
+# All mutations go through this single writer; see DatabaseWriter
+db_writer = DatabaseWriter(DATABASE_URL)
+
+# Read paths use read-only snapshot connections; see ReadPool
+read_pool = ReadPool(DATABASE_URL, size=settings.READ_POOL_SIZE)
+
+_read_only: ContextVar[bool] = ContextVar("read_only", default=False)
+
+SCHEMA_FINGERPRINT_KEY = "schema_fingerprint"
+
+def init_db() -> bool:
+    """Create or upgrade the schema and seed data.
+
+    The statements are only executed when their fingerprint differs from
+    the one stored by the previous run. Returns whether they were executed.
+    """
+    fingerprint = schema_fingerprint()
     with get_db() as db:
-        # Create roles table
-        db.execute('''
-            CREATE TABLE IF NOT EXISTS roles (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                name TEXT UNIQUE NOT NULL,
-                description TEXT,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        current = _stored_fingerprint(db) == fingerprint
+        if not current:
+            # Only takes effect on a new database; see app.db.maintenance
+            db.execute("PRAGMA auto_vacuum=INCREMENTAL")
+            # WAL lets read-only connections read while the writer commits
+            db.execute("PRAGMA journal_mode=WAL")
+            create_schema(db)
+            db.execute(
+                "INSERT OR REPLACE INTO schema_meta (key, value) VALUES (?, ?)",
+                (SCHEMA_FINGERPRINT_KEY, fingerprint)
             )
-        ''')
-
-        # Create default roles
-        db.execute('''
-            INSERT OR IGNORE INTO roles (name, description) VALUES 
-            ('admin', 'Administrator with full access'),
-            ('user', 'Regular user with basic access'),
-            ('moderator', 'User with moderation privileges')
-        ''')
-
-        # Create permissions table with more detailed permissions
-        db.execute('''
-            CREATE TABLE IF NOT EXISTS permissions (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                name TEXT UNIQUE NOT NULL,
-                description TEXT,
-                category TEXT NOT NULL,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        ''')
-
-        # Insert comprehensive permissions
-        permissions = [
-            # User management permissions
-            ('manage_users', 'Can create, update, and delete users', 'user'),
-            ('view_users', 'Can view user list and details', 'user'),
-            ('create_user', 'Can create new users', 'user'),
-            ('update_user', 'Can update user information', 'user'),
-            ('delete_user', 'Can delete users', 'user'),
-            
-            # Role management permissions
-            ('manage_roles', 'Can create, update, and delete roles', 'role'),
-            ('view_roles', 'Can view roles and permissions', 'role'),
-            ('assign_roles', 'Can assign roles to users', 'role'),
-            
-            # Permission management
-            ('manage_permissions', 'Can manage permission assignments', 'permission'),
-            ('view_permissions', 'Can view permissions list', 'permission'),
-            
-            # System settings
-            ('manage_settings', 'Can modify system settings', 'system'),
-            ('view_settings', 'Can view system settings', 'system'),
-            
-            # Audit logs
-            ('view_audit_logs', 'Can view audit logs', 'audit'),
-            ('manage_audit_logs', 'Can manage audit logs', 'audit')
-        ]
+        _seed_admin(db)
+        db.commit()
+    return not current
+
+def create_schema(db):
+    # Create roles table
+    db.execute('''
+        CREATE TABLE IF NOT EXISTS roles (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT UNIQUE NOT NULL,
+            description TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+
+    # Create default roles
+    db.execute('''
+        INSERT OR IGNORE INTO roles (name, description) VALUES 
+        ('admin', 'Administrator with full access'),
+        ('user', 'Regular user with basic access'),
+        ('moderator', 'User with moderation privileges')
+    ''')
+
+    # Let roles inherit the permissions of the roles below them
+    add_role_parent(db)
+
+    # Create permissions table with more detailed permissions
+    db.execute('''
+        CREATE TABLE IF NOT EXISTS permissions (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT UNIQUE NOT NULL,
+            description TEXT,
+            category TEXT NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+
+    # Insert comprehensive permissions
+    permissions = [
+        # User management permissions
+        ('manage_users', 'Can create, update, and delete users', 'user'),
+        ('view_users', 'Can view user list and details', 'user'),
+        ('create_user', 'Can create new users', 'user'),
+        ('update_user', 'Can update user information', 'user'),
+        ('delete_user', 'Can delete users', 'user'),
         
-        db.executemany('''
-            INSERT OR IGNORE INTO permissions (name, description, category) 
-            VALUES (?, ?, ?)
-        ''', permissions)
-
-        # Create role_permissions table
-        db.execute('''
-            CREATE TABLE IF NOT EXISTS role_permissions (
-                role_id INTEGER,
-                permission_id INTEGER,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                PRIMARY KEY (role_id, permission_id),
-                FOREIGN KEY (role_id) REFERENCES roles (id),
-                FOREIGN KEY (permission_id) REFERENCES permissions (id)
-            )
-        ''')
-
-        # Assign all permissions to admin role
-        db.execute('''
-            INSERT OR IGNORE INTO role_permissions (role_id, permission_id)
-            SELECT r.id, p.id 
-            FROM roles r, permissions p 
-            WHERE r.name = 'admin'
-        ''')
-
-        # Create users table
-        db.execute('''
-            CREATE TABLE IF NOT EXISTS users (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                username TEXT UNIQUE NOT NULL,
-                email TEXT UNIQUE NOT NULL,
-                hashed_password TEXT NOT NULL,
-                role_id INTEGER DEFAULT 2,
-                is_active BOOLEAN NOT NULL DEFAULT 1,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                last_login TIMESTAMP,
-                FOREIGN KEY (role_id) REFERENCES roles (id)
-            )
-        ''')
-
-        # Create default admin user
-        default_admin = {
-            'username': 'admin',
-            'email': 'admin@example.com',
-            'password': 'admin123'  # Change this in production!
-        }
-
-        db.execute('''
-            INSERT OR IGNORE INTO users (username, email, hashed_password, role_id)
-            VALUES (?, ?, ?, (SELECT id FROM roles WHERE name = 'admin'))
-        ''', (
-            default_admin['username'],
-            default_admin['email'],
-            get_password_hash(default_admin['password'])
-        ))
-
-        # Create audit logs table
-        db.execute('''
-            CREATE TABLE IF NOT EXISTS audit_logs (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                user_id INTEGER,
-                action TEXT NOT NULL,
-                entity_type TEXT NOT NULL,
-                entity_id INTEGER,
-                details TEXT,
-                ip_address TEXT,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (user_id) REFERENCES users (id)
-            )
-        ''')
+        # Role management permissions
+        ('manage_roles', 'Can create, update, and delete roles', 'role'),
+        ('view_roles', 'Can view roles and permissions', 'role'),
+        ('assign_roles', 'Can assign roles to users', 'role'),
+        
+        # Permission management
+        ('manage_permissions', 'Can manage permission assignments', 'permission'),
+        ('view_permissions', 'Can view permissions list', 'permission'),
+        
+        # System settings
+        ('manage_settings', 'Can modify system settings', 'system'),
+        ('view_settings', 'Can view system settings', 'system'),
+        
+        # Audit logs
+        ('view_audit_logs', 'Can view audit logs', 'audit'),
+        ('manage_audit_logs', 'Can manage audit logs', 'audit')
+    ]
+    
+    db.executemany('''
+        INSERT OR IGNORE INTO permissions (name, description, category) 
+        VALUES (?, ?, ?)
+    ''', permissions)
 
-        db.commit()
+    # Create role_permissions table
+    db.execute('''
+        CREATE TABLE IF NOT EXISTS role_permissions (
+            role_id INTEGER,
+            permission_id INTEGER,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (role_id, permission_id),
+            FOREIGN KEY (role_id) REFERENCES roles (id),
+            FOREIGN KEY (permission_id) REFERENCES permissions (id)
+        )
+    ''')
+
+    # Assign all permissions to admin role
+    db.execute('''
+        INSERT OR IGNORE INTO role_permissions (role_id, permission_id)
+        SELECT r.id, p.id 
+        FROM roles r, permissions p 
+        WHERE r.name = 'admin'
+    ''')
+
+    # Create users table
+    db.execute('''
+        CREATE TABLE IF NOT EXISTS users (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            username TEXT UNIQUE NOT NULL,
+            email TEXT UNIQUE NOT NULL,
+            hashed_password TEXT NOT NULL,
+            role_id INTEGER DEFAULT 2,
+            is_active BOOLEAN NOT NULL DEFAULT 1,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            last_login TIMESTAMP,
+            last_seen TIMESTAMP,
+            FOREIGN KEY (role_id) REFERENCES roles (id)
+        )
+    ''')
+
+    # Coalesced activity timestamps; see app.services.activity
+    _add_column(db, "users", "last_seen TIMESTAMP")
+    db.execute('''
+        CREATE INDEX IF NOT EXISTS idx_users_last_seen
+        ON users (last_seen)
+    ''')
+
+    # Create audit logs table
+    db.execute('''
+        CREATE TABLE IF NOT EXISTS audit_logs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER,
+            action TEXT NOT NULL,
+            entity_type TEXT NOT NULL,
+            entity_id INTEGER,
+            details TEXT,
+            ip_address TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (user_id) REFERENCES users (id)
+        )
+    ''')
+
+    # Create refresh token sessions table
+    db.execute('''
+        CREATE TABLE IF NOT EXISTS refresh_tokens (
+            token_hash TEXT PRIMARY KEY,
+            family_id TEXT NOT NULL,
+            user_id INTEGER NOT NULL,
+            expires_at TIMESTAMP NOT NULL,
+            used_at TIMESTAMP,
+            revoked BOOLEAN NOT NULL DEFAULT 0,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (user_id) REFERENCES users (id)
+        )
+    ''')
+    db.execute('''
+        CREATE INDEX IF NOT EXISTS idx_refresh_tokens_family
+        ON refresh_tokens (family_id)
+    ''')
+    db.execute('''
+        CREATE INDEX IF NOT EXISTS idx_refresh_tokens_user
+        ON refresh_tokens (user_id)
+    ''')
+
+    # Create access token revocation tables
+    db.execute('''
+        CREATE TABLE IF NOT EXISTS revoked_tokens (
+            jti TEXT PRIMARY KEY,
+            user_id INTEGER,
+            expires_at REAL NOT NULL
+        )
+    ''')
+    db.execute('''
+        CREATE TABLE IF NOT EXISTS revoked_user_tokens (
+            user_id INTEGER PRIMARY KEY,
+            revoked_before REAL NOT NULL,
+            expires_at REAL NOT NULL
+        )
+    ''')
+
+    # Create JWT signing keys table
+    db.execute('''
+        CREATE TABLE IF NOT EXISTS signing_keys (
+            kid TEXT PRIMARY KEY,
+            private_pem TEXT NOT NULL,
+            public_pem TEXT NOT NULL,
+            created_at REAL NOT NULL,
+            activates_at REAL NOT NULL,
+            retires_at REAL
+        )
+    ''')
+
+    # Materialize the role hierarchy and each role's effective permissions
+    create_role_hierarchy(db)
+
+    # Keep dashboard counters exact without COUNT(*) scans
+    create_counters(db)
+
+    # Broadcast changes to cached tables across workers
+    create_change_tracking(db)
+
+    # Track which schema version this database was initialized with
+    db.execute('''
+        CREATE TABLE IF NOT EXISTS schema_meta (
+            key TEXT PRIMARY KEY,
+            value TEXT NOT NULL
+        )
+    ''')
+
+def _add_column(db, table: str, definition: str):
+    """Add a column to an existing table; tables created above already have it."""
+    try:
+        db.execute(f"ALTER TABLE {table} ADD COLUMN {definition}")
+    except sqlite3.OperationalError as exc:
+        if "duplicate column" not in str(exc):
+            raise
+
+class _StatementRecorder:
+    """Stands in for a connection to capture the statements of create_schema."""
+
+    def __init__(self):
+        self.statements = []
+
+    def execute(self, sql, params=()):
+        self.statements.append((sql, tuple(params)))
+
+    def executemany(self, sql, rows):
+        self.statements.append((sql, tuple(map(tuple, rows))))
+
+def schema_fingerprint() -> str:
+    recorder = _StatementRecorder()
+    create_schema(recorder)
+    return hashlib.sha256(repr(recorder.statements).encode()).hexdigest()
+
+def _stored_fingerprint(db):
+    try:
+        row = db.execute(
+            "SELECT value FROM schema_meta WHERE key = ?", (SCHEMA_FINGERPRINT_KEY,)
+        ).fetchone()
+    except sqlite3.OperationalError:
+        return None
+    return row[0] if row else None
+
+def _seed_admin(db):
+    """Create the default admin user if it is missing.
+
+    Checked before hashing so the bcrypt round is only paid on first start.
+    """
+    default_admin = {
+        'username': 'admin',
+        'email': 'admin@example.com',
+        'password': 'admin123'  # Change this in production!
+    }
+
+    if db.execute(
+        "SELECT 1 FROM users WHERE username = ?", (default_admin['username'],)
+    ).fetchone():
+        return
+
+    db.execute('''
+        INSERT OR IGNORE INTO users (username, email, hashed_password, role_id)
+        VALUES (?, ?, ?, (SELECT id FROM roles WHERE name = 'admin'))
+    ''', (
+        default_admin['username'],
+        default_admin['email'],
+        get_password_hash(default_admin['password'])
+    ))
+
+def read_only(func):
+    """Declare a service method read-only.
+
+    ``get_db()`` calls made while the method runs use the read-only pool.
+    """
+    @wraps(func)
+    async def wrapper(*args, **kwargs):
+        token = _read_only.set(True)
+        try:
+            return await func(*args, **kwargs)
+        finally:
+            _read_only.reset(token)
+    return wrapper
+
+@contextmanager
+def get_read_db() -> Generator[sqlite3.Connection, None, None]:
+    with read_pool.connection() as conn:
+        yield conn
 
 @contextmanager
 def get_db() -> Generator[sqlite3.Connection, None, None]:
+    if _read_only.get():
+        session = current_session.get()
+        if session is not None:
+            yield session.read()
+            return
+        with read_pool.connection() as conn:
+            yield conn
+        return
     conn = sqlite3.connect(DATABASE_URL)
     conn.row_factory = sqlite3.Row
     try:
@@ -146,8 +334,36 @@ def get_db() -> Generator[sqlite3.Connection, None, None]:
     finally:
         conn.close()
 
+def open_session() -> DatabaseSession:
+    return DatabaseSession(read_pool, db_writer, change_feed)
+
+def release_session():
+    """Hand the request's read connection back before slow work such as bcrypt."""
+    session = current_session.get()
+    if session is not None:
+        session.release()
+
+async def write(job: Job) -> Any:
+    """Run ``job`` on the writer, through the request's session if there is one."""
+    session = current_session.get()
+    if session is not None:
+        return await session.write(job)
+    return await db_writer.write(job)
+
+# A write job and the in-memory update to apply once it has committed
+Change = Tuple[Job, Callable[[], None]]
+
+async def write_together(changes: Iterable[Change]):
+    """Run ``changes`` as one writer job, so they commit or fail as a unit."""
+    changes = list(changes)
+    if not changes:
+        return
+    await write(lambda db: [job(db) for job, _ in changes])
+    for _, apply in changes:
+        apply()
+
 def get_user_by_username(username: str):
-    with get_db() as db:
+    with get_read_db() as db:
         cursor = db.execute('''
             SELECT u.*, r.name as role_name 
             FROM users u 
@@ -157,7 +373,7 @@ def get_user_by_username(username: str):
         return cursor.fetchone()
 
 def get_user_permissions(user_id: int):
-    with get_db() as db:
+    with get_read_db() as db:
         cursor = db.execute('''
             SELECT DISTINCT p.name 
             FROM permissions p
@@ -167,17 +383,17 @@ def get_user_permissions(user_id: int):
         ''', (user_id,))
         return [row[0] for row in cursor.fetchall()]
 
-def create_user(username: str, email: str, hashed_password: str, role_id: int = 2):
-    with get_db() as db:
+async def create_user(username: str, email: str, hashed_password: str, role_id: int = 2):
+    def insert(db):
         cursor = db.execute(
             "INSERT INTO users (username, email, hashed_password, role_id) VALUES (?, ?, ?, ?)",
             (username, email, hashed_password, role_id)
         )
-        db.commit()
         return cursor.lastrowid
+    return await write(insert)
 
 def get_user_by_email(email: str):
-    with get_db() as db:
+    with get_read_db() as db:
         cursor = db.cursor()
         cursor.execute(
             "SELECT * FROM users WHERE email=?",
@@ -0,0 +1,169 @@
+import sqlite3
+
+# Default inheritance: each role's permissions are also held by its parent
+DEFAULT_PARENTS = [
+    ("user", "moderator"),
+    ("moderator", "admin"),
+]
+
+CYCLE_ERROR = "role hierarchy cycle"
+PARENT_ERROR = "role parent does not exist"
+
+def add_role_parent(db: sqlite3.Connection):
+    """Add ``roles.parent_id`` and link the default roles on first run."""
+    try:
+        db.execute("ALTER TABLE roles ADD COLUMN parent_id INTEGER REFERENCES roles (id)")
+    except sqlite3.OperationalError as exc:
+        if "duplicate column" not in str(exc):
+            raise
+        return
+    db.executemany('''
+        UPDATE roles SET parent_id = (SELECT id FROM roles WHERE name = ?)
+        WHERE name = ? AND parent_id IS NULL
+    ''', [(parent, child) for child, parent in DEFAULT_PARENTS])
+
+def create_role_hierarchy(db: sqlite3.Connection):
+    """Create the role closure tables, the triggers that maintain them and fill them.
+
+    ``role_closure`` holds one row per (ancestor, descendant) pair, including
+    each role paired with itself. ``role_effective_permissions`` holds every
+    permission a role has directly or through one of its descendants. Both
+    are adjusted by triggers in the transaction that changes ``roles`` or
+    ``role_permissions``, touching only the roles above the change.
+    """
+    db.execute('''
+        CREATE TABLE IF NOT EXISTS role_closure (
+            ancestor_id INTEGER NOT NULL,
+            descendant_id INTEGER NOT NULL,
+            depth INTEGER NOT NULL,
+            PRIMARY KEY (ancestor_id, descendant_id)
+        )
+    ''')
+    db.execute('''
+        CREATE INDEX IF NOT EXISTS idx_role_closure_descendant
+        ON role_closure (descendant_id)
+    ''')
+    db.execute('''
+        CREATE TABLE IF NOT EXISTS role_effective_permissions (
+            role_id INTEGER NOT NULL,
+            permission_id INTEGER NOT NULL,
+            PRIMARY KEY (role_id, permission_id)
+        )
+    ''')
+
+    # Roles above ``role`` (inclusive) whose effective permissions are rebuilt
+    def rebuild_above(*roles: str) -> str:
+        above = f'''
+            SELECT ancestor_id FROM role_closure
+            WHERE descendant_id IN ({", ".join(roles)})
+        '''
+        return f'''
+            DELETE FROM role_effective_permissions WHERE role_id IN ({above});
+            INSERT OR IGNORE INTO role_effective_permissions (role_id, permission_id)
+            SELECT c.ancestor_id, rp.permission_id
+            FROM role_closure c
+            JOIN role_permissions rp ON rp.role_id = c.descendant_id
+            WHERE c.ancestor_id IN ({above});
+        '''
+
+    subtree = "SELECT descendant_id FROM role_closure WHERE ancestor_id = NEW.id"
+    # Foreign keys are not enforced, so a dangling parent is refused here
+    missing_parent = f'''
+        WHEN NEW.parent_id IS NOT NULL
+         AND NOT EXISTS (SELECT 1 FROM roles WHERE id = NEW.parent_id)
+        BEGIN
+            SELECT RAISE(ABORT, '{PARENT_ERROR}');
+        END
+    '''
+    triggers = {
+        "trg_roles_insert_parent": f"BEFORE INSERT ON roles {missing_parent}",
+        "trg_roles_update_parent": f"BEFORE UPDATE OF parent_id ON roles {missing_parent}",
+        "trg_roles_insert_hierarchy": f'''
+            AFTER INSERT ON roles
+            BEGIN
+                INSERT INTO role_closure (ancestor_id, descendant_id, depth)
+                VALUES (NEW.id, NEW.id, 0);
+                INSERT INTO role_closure (ancestor_id, descendant_id, depth)
+                SELECT ancestor_id, NEW.id, depth + 1
+                FROM role_closure WHERE descendant_id = NEW.parent_id;
+            END
+        ''',
+        "trg_roles_parent_cycle": f'''
+            BEFORE UPDATE OF parent_id ON roles
+            WHEN NEW.parent_id IN ({subtree})
+            BEGIN
+                SELECT RAISE(ABORT, '{CYCLE_ERROR}');
+            END
+        ''',
+        "trg_roles_parent_hierarchy": f'''
+            AFTER UPDATE OF parent_id ON roles
+            WHEN NEW.parent_id IS NOT OLD.parent_id
+            BEGIN
+                DELETE FROM role_closure
+                WHERE descendant_id IN ({subtree})
+                  AND ancestor_id NOT IN ({subtree});
+                INSERT INTO role_closure (ancestor_id, descendant_id, depth)
+                SELECT a.ancestor_id, d.descendant_id, a.depth + d.depth + 1
+                FROM role_closure a, role_closure d
+                WHERE a.descendant_id = NEW.parent_id AND d.ancestor_id = NEW.id;
+                {rebuild_above("OLD.parent_id", "NEW.parent_id")}
+            END
+        ''',
+        "trg_roles_delete_hierarchy": f'''
+            AFTER DELETE ON roles
+            BEGIN
+                DELETE FROM role_permissions WHERE role_id = OLD.id;
+                UPDATE roles SET parent_id = OLD.parent_id WHERE parent_id = OLD.id;
+                DELETE FROM role_closure WHERE ancestor_id = OLD.id OR descendant_id = OLD.id;
+                DELETE FROM role_effective_permissions WHERE role_id = OLD.id;
+            END
+        ''',
+        "trg_role_permissions_insert_hierarchy": '''
+            AFTER INSERT ON role_permissions
+            BEGIN
+                INSERT OR IGNORE INTO role_effective_permissions (role_id, permission_id)
+                SELECT ancestor_id, NEW.permission_id
+                FROM role_closure WHERE descendant_id = NEW.role_id;
+            END
+        ''',
+        "trg_role_permissions_delete_hierarchy": '''
+            AFTER DELETE ON role_permissions
+            BEGIN
+                DELETE FROM role_effective_permissions
+                WHERE permission_id = OLD.permission_id
+                  AND role_id IN (
+                      SELECT ancestor_id FROM role_closure WHERE descendant_id = OLD.role_id
+                  )
+                  AND NOT EXISTS (
+                      SELECT 1 FROM role_closure c
+                      JOIN role_permissions rp ON rp.role_id = c.descendant_id
+                      WHERE c.ancestor_id = role_effective_permissions.role_id
+                        AND rp.permission_id = OLD.permission_id
+                  );
+            END
+        ''',
+    }
+    for name, body in triggers.items():
+        db.execute(f"CREATE TRIGGER IF NOT EXISTS {name} {body}")
+
+    # Rebuild from the tables; existing rows predate the triggers
+    db.execute("DELETE FROM role_closure")
+    db.execute('''
+        INSERT INTO role_closure (ancestor_id, descendant_id, depth)
+        WITH RECURSIVE chain (ancestor_id, descendant_id, depth) AS (
+            SELECT id, id, 0 FROM roles
+            UNION
+            SELECT r.parent_id, chain.descendant_id, chain.depth + 1
+            FROM chain JOIN roles r ON r.id = chain.ancestor_id
+            WHERE r.parent_id IS NOT NULL AND chain.depth < 64
+        )
+        SELECT ancestor_id, descendant_id, MIN(depth) FROM chain
+        GROUP BY ancestor_id, descendant_id
+    ''')
+    db.execute("DELETE FROM role_effective_permissions")
+    db.execute('''
+        INSERT INTO role_effective_permissions (role_id, permission_id)
+        SELECT DISTINCT c.ancestor_id, rp.permission_id
+        FROM role_closure c
+        JOIN role_permissions rp ON rp.role_id = c.descendant_id
+    ''')
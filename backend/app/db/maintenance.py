@@ -0,0 +1,178 @@
+import asyncio
+import logging
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+# PRAGMA auto_vacuum value that enables ``PRAGMA incremental_vacuum``
+AUTO_VACUUM_INCREMENTAL = 2
+
+@dataclass
+class MaintenanceTask:
+    """A maintenance job run every ``interval`` seconds on its own connection."""
+    name: str
+    interval: float
+    run: Callable[[sqlite3.Connection], dict]
+    last_run: Optional[float] = None
+    due_since: Optional[float] = None
+    stats: Dict[str, object] = field(default_factory=lambda: {
+        "runs": 0, "failures": 0, "deferred": 0, "last_ms": None, "last_result": None,
+    })
+
+    def due(self, now: float) -> bool:
+        return self.last_run is None or now - self.last_run >= self.interval
+
+def analyze(db: sqlite3.Connection) -> dict:
+    db.execute("ANALYZE")
+    return {}
+
+def optimize(db: sqlite3.Connection) -> dict:
+    db.execute("PRAGMA optimize")
+    return {}
+
+def checkpoint(db: sqlite3.Connection) -> dict:
+    # PASSIVE copies what it can without waiting on readers or the writer
+    busy, wal_pages, checkpointed = db.execute("PRAGMA wal_checkpoint(PASSIVE)").fetchone()
+    return {"busy": bool(busy), "wal_pages": wal_pages, "checkpointed_pages": checkpointed}
+
+def incremental_vacuum(max_pages: int) -> Callable[[sqlite3.Connection], dict]:
+    def run(db: sqlite3.Connection) -> dict:
+        if db.execute("PRAGMA auto_vacuum").fetchone()[0] != AUTO_VACUUM_INCREMENTAL:
+            # Switching modes takes a full VACUUM, which holds the write lock
+            # for the whole rewrite; that is left to ``enable_incremental_vacuum``
+            return {"skipped": "auto_vacuum is not incremental"}
+        free = db.execute("PRAGMA freelist_count").fetchone()[0]
+        # Each step frees one page; executescript steps to completion
+        db.executescript(f"PRAGMA incremental_vacuum({max_pages})")
+        remaining = db.execute("PRAGMA freelist_count").fetchone()[0]
+        return {"reclaimed_pages": free - remaining, "free_pages": remaining}
+    return run
+
+def enable_incremental_vacuum(database: str) -> dict:
+    """Switch an existing database to incremental auto-vacuum.
+
+    Databases created before incremental vacuum was enabled need one full
+    ``VACUUM`` to switch modes. It rewrites the whole file under the write
+    lock, so run it while the app is stopped.
+    """
+    db = sqlite3.connect(database, isolation_level=None)
+    try:
+        if db.execute("PRAGMA auto_vacuum").fetchone()[0] == AUTO_VACUUM_INCREMENTAL:
+            return {"converted": False}
+        before = db.execute("PRAGMA page_count").fetchone()[0]
+        db.execute(f"PRAGMA auto_vacuum = {AUTO_VACUUM_INCREMENTAL}")
+        db.execute("VACUUM")
+        after = db.execute("PRAGMA page_count").fetchone()[0]
+        return {"converted": True, "reclaimed_pages": max(before - after, 0)}
+    finally:
+        db.close()
+
+class MaintenanceScheduler:
+    """Runs SQLite housekeeping in the background during quiet periods.
+
+    Every ``tick`` seconds the scheduler looks for due tasks. A due task
+    only starts while ``is_idle()`` holds, unless it has already waited
+    ``max_defer`` seconds for a quiet moment. Tasks run one at a time in a
+    thread, on a dedicated autocommit connection, so they compete with the
+    writer only for SQLite's own lock.
+    """
+
+    def __init__(self, tasks: List[MaintenanceTask], tick: float = 5.0,
+                 max_defer: float = 600.0, timeout: float = 30.0):
+        self.tasks = tasks
+        self.tick = tick
+        self.max_defer = max_defer
+        self._timeout = timeout
+        self._conn: Optional[sqlite3.Connection] = None
+        # Held while a task runs so ``stop`` cannot close the connection under it
+        self._lock = threading.Lock()
+        self._is_idle: Callable[[], bool] = lambda: True
+
+    def start(self, database: str, is_idle: Callable[[], bool]):
+        self._is_idle = is_idle
+        if self._conn is None:
+            self._conn = sqlite3.connect(
+                database, timeout=self._timeout, isolation_level=None, check_same_thread=False
+            )
+        # Intervals count from startup; a restart loop should not rerun everything
+        now = time.time()
+        for task in self.tasks:
+            task.last_run = task.last_run or now
+
+    def stop(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    async def run(self):
+        while True:
+            await asyncio.sleep(self.tick)
+            for task in self.tasks:
+                if self._conn is None:
+                    return
+                await self._maybe_run(task)
+
+    def metrics(self) -> dict:
+        return {
+            task.name: {
+                "interval": task.interval,
+                "last_run": task.last_run,
+                **task.stats,
+            }
+            for task in self.tasks
+        }
+
+    async def _maybe_run(self, task: MaintenanceTask):
+        now = time.time()
+        if not task.due(now):
+            return
+        first_check = task.due_since is None
+        if first_check:
+            task.due_since = now
+        if not self._is_idle() and now - task.due_since < self.max_defer:
+            if first_check:
+                task.stats["deferred"] += 1
+            return
+        await self._execute(task)
+
+    async def _execute(self, task: MaintenanceTask):
+        started = time.perf_counter()
+        try:
+            result = await asyncio.to_thread(self._call, task)
+        except Exception:
+            # A failed task must not end the loop; it is retried next interval
+            logger.exception("Maintenance task %s failed", task.name)
+            task.stats["failures"] += 1
+            result = None
+        else:
+            task.stats["runs"] += 1
+        task.stats["last_ms"] = round((time.perf_counter() - started) * 1000, 1)
+        task.stats["last_result"] = result
+        task.last_run = time.time()
+        task.due_since = None
+
+    def _call(self, task: MaintenanceTask) -> Optional[dict]:
+        with self._lock:
+            if self._conn is None:
+                return None
+            return task.run(self._conn)
+
+maintenance = MaintenanceScheduler(
+    tasks=[
+        MaintenanceTask("checkpoint", settings.MAINTENANCE_CHECKPOINT_INTERVAL, checkpoint),
+        MaintenanceTask("optimize", settings.MAINTENANCE_OPTIMIZE_INTERVAL, optimize),
+        MaintenanceTask("analyze", settings.MAINTENANCE_ANALYZE_INTERVAL, analyze),
+        MaintenanceTask(
+            "incremental_vacuum",
+            settings.MAINTENANCE_VACUUM_INTERVAL,
+            incremental_vacuum(settings.MAINTENANCE_VACUUM_PAGES)
+        ),
+    ],
+    max_defer=settings.MAINTENANCE_MAX_DEFER,
+)
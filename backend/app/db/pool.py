@@ -0,0 +1,89 @@
+import sqlite3
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Deque, Dict, Generator
+
+class ReadPool:
+    """Pool of read-only SQLite connections.
+
+    Connections are opened with ``mode=ro`` and ``PRAGMA query_only`` so they
+    can never take the write lock. Each checkout runs inside ``BEGIN`` ...
+    ``ROLLBACK``, which pins one WAL snapshot for all queries of the block.
+    When every pooled connection is busy, an overflow connection is opened
+    instead of blocking the event loop and closed again on release.
+    """
+
+    def __init__(self, database: str, size: int = 8):
+        self._uri = f"file:{database}?mode=ro"
+        self._size = size
+        self._idle: Deque[sqlite3.Connection] = deque()
+        self._lock = threading.Lock()
+        self._created = 0
+        self._in_use = 0
+        self._stats: Dict[str, float] = {
+            "acquired": 0,
+            "overflow": 0,
+            "max_in_use": 0,
+            "hold_seconds": 0.0,
+        }
+
+    @contextmanager
+    def connection(self) -> Generator[sqlite3.Connection, None, None]:
+        conn, pooled = self._acquire()
+        started = time.perf_counter()
+        try:
+            conn.execute("BEGIN")
+            yield conn
+        finally:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            self._release(conn, pooled, time.perf_counter() - started)
+
+    def metrics(self) -> dict:
+        with self._lock:
+            return {
+                **self._stats,
+                "size": self._size,
+                "open": self._created,
+                "idle": len(self._idle),
+                "in_use": self._in_use,
+            }
+
+    def close(self):
+        with self._lock:
+            while self._idle:
+                self._idle.pop().close()
+                self._created -= 1
+
+    def _acquire(self):
+        with self._lock:
+            self._in_use += 1
+            self._stats["acquired"] += 1
+            self._stats["max_in_use"] = max(self._stats["max_in_use"], self._in_use)
+            if self._idle:
+                return self._idle.pop(), True
+            pooled = self._created < self._size
+            if pooled:
+                self._created += 1
+            else:
+                self._stats["overflow"] += 1
+        return self._connect(), pooled
+
+    def _release(self, conn: sqlite3.Connection, pooled: bool, held: float):
+        with self._lock:
+            self._in_use -= 1
+            self._stats["hold_seconds"] += held
+            if pooled:
+                self._idle.append(conn)
+                return
+        conn.close()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(
+            self._uri, uri=True, isolation_level=None, check_same_thread=False
+        )
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA query_only = ON")
+        return conn
@@ -0,0 +1,183 @@
+from collections.abc import Sequence
+from functools import lru_cache
+from operator import itemgetter
+from typing import Callable, Dict, Iterator, List, Optional, Tuple, Type
+
+class Record:
+    """Base for compact ``__slots__`` records built from query rows.
+
+    Records support attribute access (for pydantic ``from_attributes``) and the
+    mapping protocol (``dict(record)``, ``Model(**record)``, ``record["id"]``).
+    Fields that the query did not select read as ``None``.
+    """
+    __slots__ = ()
+    converters: Dict[str, Callable] = {}
+
+    def __getattr__(self, name):
+        if name in type(self).__slots__:
+            return None
+        raise AttributeError(name)
+
+    def keys(self) -> Tuple[str, ...]:
+        return type(self).__slots__
+
+    def __getitem__(self, key):
+        try:
+            return getattr(self, key)
+        except AttributeError:
+            raise KeyError(key) from None
+
+    def get(self, key, default=None):
+        """Value of ``key``, or ``default`` when it is not a field or was never set."""
+        if key not in type(self).__slots__:
+            return default
+        try:
+            # The slot descriptor itself, bypassing the ``None`` of ``__getattr__``
+            return type(self).__dict__[key].__get__(self)
+        except AttributeError:
+            return default
+
+    def to_dict(self) -> dict:
+        return {name: getattr(self, name) for name in type(self).__slots__}
+
+    def __eq__(self, other):
+        if type(other) is not type(self):
+            return NotImplemented
+        return self.to_dict() == other.to_dict()
+
+    def __repr__(self):
+        fields = ", ".join(f"{k}={v!r}" for k, v in self.to_dict().items())
+        return f"{type(self).__name__}({fields})"
+
+class UserRecord(Record):
+    __slots__ = ("id", "username", "email", "role_id", "is_active", "created_at",
+                 "last_login", "last_seen", "role_name")
+    converters = {"is_active": bool}
+
+class RoleRecord(Record):
+    __slots__ = ("id", "name", "description", "parent_id", "created_at", "user_count", "permissions")
+
+class PermissionRecord(Record):
+    __slots__ = ("id", "name", "description", "category", "created_at")
+
+class ActivityRecord(Record):
+    __slots__ = ("id", "timestamp", "action", "entity_type", "entity_id", "details", "username", "ip_address")
+
+class RowMapper:
+    """Tuple-to-record converter compiled once for a fixed column layout.
+
+    ``columns`` lists the selected column names in order. Columns that are not
+    fields of ``record_type`` are skipped; the rest are pulled out by index with
+    a single ``itemgetter`` call and passed through the record's converters.
+    """
+    __slots__ = ("record_type", "fields", "_getter", "_converters")
+
+    def __init__(self, record_type: Type[Record], columns: Tuple[str, ...]):
+        slots = set(record_type.__slots__)
+        positions = [(i, name) for i, name in enumerate(columns) if name in slots]
+        self.record_type = record_type
+        self.fields = tuple(name for _, name in positions)
+        indexes = [i for i, _ in positions]
+        if len(indexes) == 1:
+            index = indexes[0]
+            self._getter = lambda row: (row[index],)
+        else:
+            self._getter = itemgetter(*indexes)
+        self._converters = tuple(
+            (pos, record_type.converters[name])
+            for pos, name in enumerate(self.fields)
+            if name in record_type.converters
+        )
+
+    def __call__(self, row) -> Record:
+        values = self._getter(row)
+        if self._converters:
+            values = list(values)
+            for pos, convert in self._converters:
+                if values[pos] is not None:
+                    values[pos] = convert(values[pos])
+        record = self.record_type.__new__(self.record_type)
+        for name, value in zip(self.fields, values):
+            setattr(record, name, value)
+        return record
+
+    def one(self, row) -> Optional[Record]:
+        return None if row is None else self(row)
+
+    def all(self, rows) -> List[Record]:
+        return list(map(self, rows))
+
+    def lazy(self, rows) -> "RecordList":
+        return RecordList(rows, self)
+
+    def iter(self, cursor) -> Iterator[Record]:
+        return map(self, cursor)
+
+class RecordList(Sequence):
+    """Sequence of raw rows that are converted to records on access."""
+    __slots__ = ("_rows", "_mapper")
+
+    def __init__(self, rows, mapper: RowMapper):
+        self._rows = rows
+        self._mapper = mapper
+
+    def __len__(self):
+        return len(self._rows)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return RecordList(self._rows[index], self._mapper)
+        return self._mapper(self._rows[index])
+
+    def __iter__(self):
+        return map(self._mapper, self._rows)
+
+def _columns(projection: str) -> Tuple[str, ...]:
+    """Output column names of a comma separated SELECT list."""
+    names = []
+    for expr in projection.split(","):
+        expr = expr.strip()
+        name = expr.split()[-1] if " as " in expr.lower() else expr
+        names.append(name.split(".")[-1])
+    return tuple(names)
+
+# Shared projections. Every query that produces one of the records above selects
+# exactly these columns so the mapper below can be compiled once at import time.
+USER_PROJECTION = """
+    u.id, u.username, u.email, u.role_id, u.is_active, u.created_at,
+    u.last_login, u.last_seen, r.name AS role_name
+"""
+USER_FROM = "FROM users u LEFT JOIN roles r ON u.role_id = r.id"
+
+# The same columns for INSERT/UPDATE ... RETURNING on users, which cannot join
+USER_RETURNING = """
+    id, username, email, role_id, is_active, created_at, last_login, last_seen,
+    (SELECT name FROM roles WHERE roles.id = users.role_id) AS role_name
+"""
+
+ROLE_PROJECTION = "r.id, r.name, r.description, r.parent_id, r.created_at"
+ROLE_RETURNING = "id, name, description, parent_id, created_at"
+
+PERMISSION_PROJECTION = "p.id, p.name, p.description, p.category, p.created_at"
+
+ACTIVITY_PROJECTION = """
+    al.id, al.created_at AS timestamp, al.action, al.entity_type, al.entity_id,
+    al.details, u.username, al.ip_address
+"""
+
+# Column expression of every user field, for sparse projections
+USER_COLUMNS: Dict[str, str] = dict(zip(
+    _columns(USER_PROJECTION),
+    (expr.strip() for expr in USER_PROJECTION.split(","))
+))
+
+@lru_cache(maxsize=64)
+def user_fields(fields: Tuple[str, ...]) -> Tuple[str, "RowMapper"]:
+    """Projection and mapper selecting only ``fields`` of a user row."""
+    projection = ", ".join(USER_COLUMNS[name] for name in fields)
+    return projection, RowMapper(UserRecord, fields)
+
+user_mapper = RowMapper(UserRecord, _columns(USER_PROJECTION))
+role_mapper = RowMapper(RoleRecord, _columns(ROLE_PROJECTION))
+permission_mapper = RowMapper(PermissionRecord, _columns(PERMISSION_PROJECTION))
+activity_mapper = RowMapper(ActivityRecord, _columns(ACTIVITY_PROJECTION))
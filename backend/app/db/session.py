@@ -0,0 +1,47 @@
+import sqlite3
+from contextlib import ExitStack
+from contextvars import ContextVar
+from typing import Any, Optional
+from app.db.changes import ChangeFeed
+from app.db.pool import ReadPool
+from app.db.writer import DatabaseWriter, Job
+
+class DatabaseSession:
+    """Database access shared by everything that runs within one request.
+
+    The first read checks a connection out of the read pool and keeps it,
+    with its snapshot, for the rest of the request, so authentication, the
+    permission check and the handler's queries all run on it. The snapshot
+    is renewed after the request writes, and whenever the change feed has
+    picked up commits from elsewhere, so caches filled from it are never
+    older than the invalidations they have already seen.
+    """
+
+    def __init__(self, pool: ReadPool, writer: DatabaseWriter, feed: ChangeFeed):
+        self._pool = pool
+        self._writer = writer
+        self._feed = feed
+        self._stack: Optional[ExitStack] = None
+        self._conn: Optional[sqlite3.Connection] = None
+        self._position = -1
+
+    def read(self) -> sqlite3.Connection:
+        if self._conn is not None and self._position != self._feed.position:
+            self.release()
+        if self._conn is None:
+            self._position = self._feed.position
+            self._stack = ExitStack()
+            self._conn = self._stack.enter_context(self._pool.connection())
+        return self._conn
+
+    async def write(self, job: Job) -> Any:
+        """Run ``job`` on the writer; later reads see its result."""
+        self.release()
+        return await self._writer.write(job)
+
+    def release(self):
+        stack, self._stack, self._conn = self._stack, None, None
+        if stack is not None:
+            stack.close()
+
+current_session: ContextVar[Optional[DatabaseSession]] = ContextVar("db_session", default=None)
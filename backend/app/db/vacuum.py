@@ -0,0 +1,13 @@
+import argparse
+from app.db.maintenance import enable_incremental_vacuum
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Convert the database to incremental auto-vacuum. Run it with the app stopped."
+    )
+    parser.add_argument("--database", default="app.db")
+    args = parser.parse_args()
+    print(enable_incremental_vacuum(args.database))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+import asyncio
+import logging
+import queue
+import sqlite3
+import threading
+from concurrent.futures import Future
+from typing import Any, Callable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+Job = Callable[[sqlite3.Connection], Any]
+
+_STOP = object()
+
+class DatabaseWriter:
+    """Runs every mutation on one connection owned by a dedicated thread.
+
+    Callers hand in a job, a callable that receives the writer connection
+    and returns a result. The thread takes whatever jobs are queued (up to
+    ``max_batch``) and runs them in a single transaction, wrapping each one
+    in a savepoint. A failing job rolls back to its own savepoint and gets
+    its exception back, while the rest of the batch still commits. One
+    ``COMMIT`` (and one fsync) then covers the whole group.
+
+    Jobs must not submit further jobs; they would wait on themselves.
+    """
+
+    def __init__(self, database: str, max_batch: int = 64, timeout: float = 30.0):
+        self._database = database
+        self._max_batch = max_batch
+        self._timeout = timeout
+        self._queue: "queue.SimpleQueue[Any]" = queue.SimpleQueue()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self.batches = 0
+        self.jobs = 0
+
+    def start(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(
+                    target=self._run, name="sqlite-writer", daemon=True
+                )
+                self._thread.start()
+
+    def stop(self):
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            self._queue.put(_STOP)
+            thread.join()
+
+    def submit(self, job: Job) -> Future:
+        """Queue ``job`` and return a future for its result."""
+        if self._thread is None:
+            self.start()
+        future: Future = Future()
+        self._queue.put((job, future))
+        return future
+
+    async def write(self, job: Job) -> Any:
+        """Run ``job`` on the writer and wait for its commit."""
+        return await asyncio.wrap_future(self.submit(job))
+
+    def metrics(self) -> dict:
+        return {
+            "jobs": self.jobs,
+            "batches": self.batches,
+            "queued": self._queue.qsize(),
+        }
+
+    def _run(self):
+        conn = sqlite3.connect(
+            self._database,
+            timeout=self._timeout,
+            isolation_level=None,
+            check_same_thread=False,
+        )
+        conn.row_factory = sqlite3.Row
+        try:
+            while True:
+                item = self._queue.get()
+                if item is _STOP:
+                    return
+                batch = [item]
+                while len(batch) < self._max_batch:
+                    try:
+                        item = self._queue.get_nowait()
+                    except queue.Empty:
+                        break
+                    if item is _STOP:
+                        self._queue.put(_STOP)
+                        break
+                    batch.append(item)
+                self._run_batch(conn, batch)
+        finally:
+            conn.close()
+
+    def _run_batch(self, conn: sqlite3.Connection, batch: List[Tuple[Job, Future]]):
+        outcomes = []
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            for job, future in batch:
+                if not future.set_running_or_notify_cancel():
+                    continue
+                conn.execute("SAVEPOINT job")
+                try:
+                    result = job(conn)
+                except Exception as exc:
+                    conn.execute("ROLLBACK TO job")
+                    conn.execute("RELEASE job")
+                    outcomes.append((future, None, exc))
+                else:
+                    conn.execute("RELEASE job")
+                    outcomes.append((future, result, None))
+            conn.execute("COMMIT")
+        except sqlite3.Error as exc:
+            logger.exception("Write batch of %d jobs failed", len(batch))
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            for _, future in batch:
+                if not future.done():
+                    if not future.running():
+                        future.set_running_or_notify_cancel()
+                    future.set_exception(exc)
+            return
+
+        self.batches += 1
+        self.jobs += len(outcomes)
+        for future, result, exc in outcomes:
+            if exc is None:
+                future.set_result(result)
+            else:
+                future.set_exception(exc)
@@ -0,0 +1,33 @@
+import hashlib
+from typing import Optional
+from fastapi import HTTPException, Request, Response, status
+from app.db.changes import change_feed
+
+def conditional(*entities: str):
+    """Dependency adding a strong ETag derived from table change counters.
+
+    The tag covers the request path, query string and the ``change_versions``
+    counters of ``entities``, so it only changes when one of those tables
+    does. A matching ``If-None-Match`` ends the request with ``304`` before the
+    handler runs any query. Declare it after the permission dependency so
+    unauthorized callers never get a 304.
+    """
+    async def dependency(request: Request, response: Response) -> Optional[str]:
+        versions = change_feed.versions(entities)
+        if versions is None:
+            return None
+        digest = hashlib.sha1(
+            f"{request.url.path}?{request.url.query}:{versions}".encode()
+        ).hexdigest()[:20]
+        etag = f'"{digest}"'
+        headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+
+        if_none_match = request.headers.get("if-none-match")
+        if if_none_match and (if_none_match.strip() == "*" or
+                              etag in (tag.strip() for tag in if_none_match.split(","))):
+            raise HTTPException(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+        response.headers.update(headers)
+        return etag
+
+    return dependency
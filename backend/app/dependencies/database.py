@@ -0,0 +1,17 @@
+from typing import AsyncGenerator
+from app.db.database import open_session
+from app.db.session import DatabaseSession, current_session
+
+async def db_session() -> AsyncGenerator[DatabaseSession, None]:
+    """Share one database session across the dependencies and handler of a request.
+
+    Services pick it up through ``get_db()`` and ``write()``; routes that
+    need the connection directly can depend on this as well.
+    """
+    session = open_session()
+    token = current_session.set(session)
+    try:
+        yield session
+    finally:
+        current_session.reset(token)
+        session.release()
@@ -0,0 +1,31 @@
+from typing import Iterable, List, Optional, Tuple, Type
+from fastapi import HTTPException, Query, status
+from pydantic import BaseModel
+
+def sparse_fields(model: Type[BaseModel]):
+    """Dependency parsing a ``fields=a,b`` query into a tuple of ``model`` fields.
+
+    Resolves to ``None`` when the parameter is absent, meaning all fields.
+    """
+    allowed = tuple(model.model_fields)
+
+    async def dependency(
+        fields: Optional[str] = Query(None, description=f"Comma separated subset of: {', '.join(allowed)}")
+    ) -> Optional[Tuple[str, ...]]:
+        if not fields:
+            return None
+        requested = tuple(dict.fromkeys(
+            name.strip() for name in fields.split(",") if name.strip()
+        ))
+        unknown = [name for name in requested if name not in allowed]
+        if unknown or not requested:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Unknown fields: {', '.join(unknown)}" if unknown else "No fields requested"
+            )
+        return requested
+
+    return dependency
+
+def select_fields(records: Iterable, fields: Tuple[str, ...]) -> List[dict]:
+    return [{name: record[name] for name in fields} for record in records]
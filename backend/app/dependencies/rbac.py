@@ -1,7 +1,7 @@
 from typing import List
 from fastapi import Depends, HTTPException, status
 from app.utils.security import get_current_user
-from app.services.rbac import RBACService
+from app.services.rbac import PermissionRequirement, RBACService, permission_masks
 from app.models.user import User
 from functools import wraps
 
@@ -14,18 +14,44 @@ async def check_permission(permission: str, user: User = Depends(get_current_use
         )
     return user
 
-def require_permission(permission: str):
+def _require(requirement: PermissionRequirement):
+    # The requirement is compiled to a mask once; each request tests it against
+    # the mask of the caller's role, which comes with the resolved user
     async def permission_dependency(user: User = Depends(get_current_user)):
-        return await check_permission(permission, user)
+        if not requirement.allows(user.role_id):
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="Not enough permissions"
+            )
+        return user
     return permission_dependency
 
+def require_permission(permission: str):
+    return _require(PermissionRequirement((permission,)))
+
+def require_all(*permissions: str):
+    return _require(PermissionRequirement(permissions, match_all=True))
+
+def require_any(*permissions: str):
+    return _require(PermissionRequirement(permissions, match_all=False))
+
 def require_role(role: str):
     async def role_dependency(user: User = Depends(get_current_user)):
-        user_role = await RBACService.get_user_role(user.id)
-        if user_role != role:
+        if user.role_id != permission_masks.role_id(role):
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
                 detail=f"Role '{role}' required"
             )
         return user
-    return role_dependency
\ No newline at end of file
+    return role_dependency
+
+def require_role_at_least(role: str):
+    """Require ``role`` or any role that inherits from it."""
+    async def role_dependency(user: User = Depends(get_current_user)):
+        if not permission_masks.is_at_least(user.role_id, role):
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail=f"Role '{role}' or higher required"
+            )
+        return user
+    return role_dependency
@@ -1,12 +1,86 @@
+import asyncio
+import logging
+import time
+from contextlib import contextmanager
 import uvicorn
 from app import create_app
-from app.db.database import init_db
+from app.config import settings
+from app.db.changes import change_feed
+from app.db.database import DATABASE_URL, db_writer, init_db, read_pool
+from app.db.maintenance import maintenance
+from app.middleware.admission import admission
+from app.services.activity import activity_tracker
+from app.services.availability import identity_filter
+from app.services.keyring import key_ring
+from app.services.revocation import deny_list
+from app.services.session import session_store
+
+# uvicorn's logger, so the startup breakdown shows with its default log config
+logger = logging.getLogger("uvicorn.error")
 
 app = create_app()
+
+@contextmanager
+def _phase(timings: dict, name: str):
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings[name] = (time.perf_counter() - started) * 1000
+
+def _quiet() -> bool:
+    """Whether load is low enough for database maintenance."""
+    return (admission.metrics()["active"] <= settings.MAINTENANCE_IDLE_REQUESTS
+            and db_writer.metrics()["queued"] == 0)
+
 # Initialize database on startup
 @app.on_event("startup")
 async def startup():
-    init_db()
+    timings = {}
+    with _phase(timings, "init_db"):
+        schema_updated = init_db()
+    with _phase(timings, "writer"):
+        db_writer.start()
+    with _phase(timings, "purge_expired"):
+        await session_store.purge_expired()
+        await deny_list.purge_expired()
+    with _phase(timings, "deny_list"):
+        deny_list.load()
+    with _phase(timings, "identity_filter"):
+        identity_filter.load()
+    if not settings.ALGORITHM.startswith("HS"):
+        with _phase(timings, "signing_keys"):
+            await key_ring.ensure_key()
+    with _phase(timings, "change_feed"):
+        change_feed.start(DATABASE_URL, db_writer)
+        app.state.change_feed_task = asyncio.create_task(
+            change_feed.run(settings.CHANGE_POLL_INTERVAL)
+        )
+    app.state.activity_task = asyncio.create_task(
+        activity_tracker.run(settings.ACTIVITY_FLUSH_INTERVAL)
+    )
+    app.state.maintenance_task = None
+    if settings.MAINTENANCE_ENABLED:
+        maintenance.start(DATABASE_URL, is_idle=_quiet)
+        app.state.maintenance_task = asyncio.create_task(maintenance.run())
+    logger.info(
+        "Startup finished in %.1f ms (schema %s): %s",
+        sum(timings.values()),
+        "updated" if schema_updated else "current",
+        ", ".join(f"{name}={ms:.1f}ms" for name, ms in timings.items())
+    )
+
+@app.on_event("shutdown")
+async def shutdown():
+    app.state.change_feed_task.cancel()
+    app.state.activity_task.cancel()
+    if app.state.maintenance_task is not None:
+        app.state.maintenance_task.cancel()
+        maintenance.stop()
+    await activity_tracker.flush()
+    change_feed.stop()
+    db_writer.stop()
+    read_pool.close()
 
 if __name__ == "__main__":
     uvicorn.run("main:app", host="0.0.0.0", port=8000, reload=True)
\ No newline at end of file
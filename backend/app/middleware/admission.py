@@ -0,0 +1,207 @@
+import asyncio
+import itertools
+import json
+import re
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Pattern, Tuple
+from app.config import settings
+
+@dataclass
+class RouteClass:
+    """Requests that share a concurrency limit and a priority (0 is highest)."""
+    name: str
+    priority: int
+    limit: int
+    queue_timeout: float
+    retry_after: int
+    active: int = 0
+    waiting: int = 0
+    stats: Dict[str, int] = field(default_factory=lambda: {
+        "admitted": 0, "queued": 0, "shed": 0, "timed_out": 0,
+    })
+
+class Shed(Exception):
+    """The request was refused admission."""
+
+@dataclass
+class _Waiter:
+    route_class: RouteClass
+    seq: int
+    future: asyncio.Future
+
+    @property
+    def rank(self) -> Tuple[int, int]:
+        return (self.route_class.priority, self.seq)
+
+class AdmissionController:
+    """Priority admission with per-class concurrency limits.
+
+    A request runs immediately when its class is below its limit and fewer
+    than ``total_limit`` requests are in flight. Otherwise it waits, up to
+    its class's ``queue_timeout``. Freed slots go to the highest-priority
+    waiter that fits. When ``max_queue`` requests are already waiting, the
+    lowest-priority one is shed with ``503``. That is the newcomer itself
+    unless it outranks a waiter.
+    """
+
+    def __init__(self, classes: List[RouteClass], rules: List[Tuple[Optional[str], Pattern, str]],
+                 default: str, total_limit: int, max_queue: int):
+        self.classes = {route_class.name: route_class for route_class in classes}
+        self._rules = rules
+        self._default = default
+        self.total_limit = total_limit
+        self.max_queue = max_queue
+        self._active = 0
+        self._waiters: List[_Waiter] = []
+        self._seq = itertools.count()
+
+    def classify(self, method: str, path: str) -> RouteClass:
+        for rule_method, pattern, name in self._rules:
+            if (rule_method is None or rule_method == method) and pattern.match(path):
+                return self.classes[name]
+        return self.classes[self._default]
+
+    async def acquire(self, route_class: RouteClass):
+        # Freed slots are handed out on release, so no waiter fits right now
+        # and admitting a request that fits cannot jump the queue of its class
+        if self._fits(route_class):
+            self._admit(route_class)
+            return
+
+        if len(self._waiters) >= self.max_queue:
+            victim = max(self._waiters, key=lambda waiter: waiter.rank)
+            if victim.route_class.priority <= route_class.priority:
+                route_class.stats["shed"] += 1
+                raise Shed()
+            self._remove(victim)
+            victim.route_class.stats["shed"] += 1
+            victim.future.set_exception(Shed())
+
+        waiter = _Waiter(route_class, next(self._seq), asyncio.get_running_loop().create_future())
+        self._waiters.append(waiter)
+        route_class.waiting += 1
+        route_class.stats["queued"] += 1
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter.future), route_class.queue_timeout)
+        except asyncio.TimeoutError:
+            if waiter.future.done() and waiter.future.exception() is None:
+                return
+            self._remove(waiter)
+            route_class.stats["timed_out"] += 1
+            raise Shed() from None
+        except asyncio.CancelledError:
+            if waiter.future.done() and not waiter.future.exception():
+                self.release(route_class)
+            else:
+                self._remove(waiter)
+            raise
+
+    def release(self, route_class: RouteClass):
+        route_class.active -= 1
+        self._active -= 1
+        for waiter in sorted(self._waiters, key=lambda waiter: waiter.rank):
+            if self._fits(waiter.route_class):
+                self._remove(waiter)
+                self._admit(waiter.route_class)
+                waiter.future.set_result(None)
+
+    def metrics(self) -> dict:
+        return {
+            "active": self._active,
+            "waiting": len(self._waiters),
+            "total_limit": self.total_limit,
+            "max_queue": self.max_queue,
+            "classes": {
+                name: {
+                    "priority": route_class.priority,
+                    "limit": route_class.limit,
+                    "active": route_class.active,
+                    "waiting": route_class.waiting,
+                    **route_class.stats,
+                }
+                for name, route_class in self.classes.items()
+            },
+        }
+
+    def _fits(self, route_class: RouteClass) -> bool:
+        return route_class.active < route_class.limit and self._active < self.total_limit
+
+    def _admit(self, route_class: RouteClass):
+        route_class.active += 1
+        route_class.stats["admitted"] += 1
+        self._active += 1
+
+    def _remove(self, waiter: _Waiter):
+        if waiter in self._waiters:
+            self._waiters.remove(waiter)
+            waiter.route_class.waiting -= 1
+
+class AdmissionMiddleware:
+    """ASGI middleware that runs API requests through an ``AdmissionController``.
+
+    Requests outside the API prefix, CORS preflights and the metrics
+    endpoint bypass it, so operators can watch the queues while the API is
+    shedding.
+    """
+
+    def __init__(self, app, controller: "AdmissionController", exempt: Tuple[str, ...] = ()):
+        self.app = app
+        self.controller = controller
+        self.exempt = exempt
+
+    async def __call__(self, scope, receive, send):
+        path = scope.get("path", "")
+        if (scope["type"] != "http" or scope["method"] == "OPTIONS"
+                or not path.startswith(settings.API_PREFIX) or path in self.exempt):
+            await self.app(scope, receive, send)
+            return
+
+        route_class = self.controller.classify(scope["method"], path)
+        try:
+            await self.controller.acquire(route_class)
+        except Shed:
+            await _busy(send, route_class.retry_after)
+            return
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.controller.release(route_class)
+
+async def _busy(send, retry_after: int):
+    body = json.dumps({"detail": "Server is busy, please retry later"}).encode()
+    await send({
+        "type": "http.response.start",
+        "status": 503,
+        "headers": [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode()),
+            (b"retry-after", str(retry_after).encode()),
+        ],
+    })
+    await send({"type": "http.response.body", "body": body})
+
+def _rule(method: Optional[str], path: str, name: str):
+    return (method, re.compile(re.escape(settings.API_PREFIX) + path), name)
+
+# Route classes in priority order: interactive reads first, bulk work last
+admission = AdmissionController(
+    classes=[
+        RouteClass("interactive", 0, limit=48, queue_timeout=2.0, retry_after=1),
+        RouteClass("auth", 1, limit=4, queue_timeout=3.0, retry_after=2),
+        RouteClass("admin_write", 2, limit=8, queue_timeout=5.0, retry_after=2),
+        RouteClass("export", 3, limit=2, queue_timeout=1.0, retry_after=5),
+    ],
+    rules=[
+        _rule("POST", r"/(token|token/refresh|register)$", "auth"),
+        _rule(None, r"/(settings/backups?|system/profile)(/|$)", "export"),
+        # The admin UI loads its pages through batch; it is a read path despite the POST
+        _rule("POST", r"/batch$", "interactive"),
+        _rule("POST", r"/", "admin_write"),
+        _rule("PUT", r"/", "admin_write"),
+        _rule("PATCH", r"/", "admin_write"),
+        _rule("DELETE", r"/", "admin_write"),
+    ],
+    default="interactive",
+    total_limit=settings.ADMISSION_TOTAL_LIMIT,
+    max_queue=settings.ADMISSION_MAX_QUEUE,
+)
@@ -0,0 +1,139 @@
+import zlib
+from typing import Optional, Sequence
+
+try:
+    import brotli
+except ImportError:  # optional; gzip is used when it is missing
+    brotli = None
+
+# Content types worth compressing; images, archives and the like already are
+COMPRESSIBLE_TYPES = (
+    "application/json", "text/", "application/javascript", "image/svg+xml",
+)
+
+# Encodings this process can produce, in order of preference
+SUPPORTED_ENCODINGS = ("br", "gzip") if brotli is not None else ("gzip",)
+
+def choose_encoding(accept_encoding: str,
+                    available: Sequence[str] = SUPPORTED_ENCODINGS) -> Optional[str]:
+    """Pick one of ``available`` from an Accept-Encoding header, honouring q=0."""
+    offered = {}
+    for item in accept_encoding.split(","):
+        name, _, params = item.strip().partition(";")
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        offered[name.strip().lower()] = quality
+    wildcard = offered.get("*", 0.0)
+    if not available:
+        return None
+    best = max(available, key=lambda name: offered.get(name, wildcard))
+    return best if offered.get(best, wildcard) > 0 else None
+
+class _Compressor:
+    def __init__(self, encoding: str, gzip_level: int, brotli_quality: int):
+        if encoding == "br":
+            self._brotli = brotli.Compressor(quality=brotli_quality)
+            self._zlib = None
+        else:
+            self._brotli = None
+            self._zlib = zlib.compressobj(gzip_level, zlib.DEFLATED, 31)
+
+    def process(self, data: bytes) -> bytes:
+        if self._brotli is not None:
+            return self._brotli.process(data)
+        return self._zlib.compress(data)
+
+    def finish(self) -> bytes:
+        if self._brotli is not None:
+            return self._brotli.finish()
+        return self._zlib.flush()
+
+class CompressionMiddleware:
+    """Negotiated brotli/gzip compression of responses above ``minimum_size``.
+
+    Brotli is offered only when the ``brotli`` package is installed.
+    Single-message bodies below the threshold go out unchanged; streamed
+    bodies are compressed chunk by chunk.
+    """
+
+    def __init__(self, app, minimum_size: int = 1024, gzip_level: int = 6,
+                 brotli_quality: int = 4):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        accept = ""
+        for name, value in scope["headers"]:
+            if name == b"accept-encoding":
+                accept = value.decode("latin-1")
+                break
+        encoding = choose_encoding(accept) if accept else None
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start = None
+        compressor: Optional[_Compressor] = None
+        passthrough = False
+
+        async def compressing_send(message):
+            nonlocal start, compressor, passthrough
+            if message["type"] == "http.response.start":
+                start = message
+                return
+            if message["type"] != "http.response.body" or passthrough:
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+            if compressor is None:
+                headers = {name.lower(): value for name, value in start.get("headers", [])}
+                content_type = headers.get(b"content-type", b"").decode("latin-1")
+                if (b"content-encoding" in headers
+                        or not content_type.startswith(COMPRESSIBLE_TYPES)
+                        or (not more_body and len(body) < self.minimum_size)):
+                    passthrough = True
+                    await send(start)
+                    await send(message)
+                    return
+
+                compressor = _Compressor(encoding, self.gzip_level, self.brotli_quality)
+                start["headers"] = [
+                    (name, value) for name, value in start.get("headers", [])
+                    if name.lower() not in (b"content-length", b"vary")
+                ] + [
+                    (b"content-encoding", encoding.encode()),
+                    (b"vary", _vary(headers.get(b"vary"))),
+                ]
+                if not more_body:
+                    compressed = compressor.process(body) + compressor.finish()
+                    start["headers"].append((b"content-length", str(len(compressed)).encode()))
+                    await send(start)
+                    await send({"type": "http.response.body", "body": compressed})
+                    return
+                await send(start)
+
+            chunk = compressor.process(body)
+            if not more_body:
+                chunk += compressor.finish()
+            await send({"type": "http.response.body", "body": chunk, "more_body": more_body})
+
+        await self.app(scope, receive, compressing_send)
+
+def _vary(existing: Optional[bytes]) -> bytes:
+    if not existing:
+        return b"Accept-Encoding"
+    if b"accept-encoding" in existing.lower():
+        return existing
+    return existing + b", Accept-Encoding"
@@ -0,0 +1,7 @@
+from datetime import datetime
+from pydantic import BaseModel
+
+class Backup(BaseModel):
+    id: str
+    created_at: datetime
+    size: int
@@ -0,0 +1,12 @@
+from pydantic import BaseModel, Field
+from typing import Any, Dict, List, Optional
+from app.config import settings
+
+class BatchRequestItem(BaseModel):
+    method: str = "GET"
+    path: str
+    headers: Dict[str, str] = {}
+    body: Optional[Any] = None
+
+class BatchRequest(BaseModel):
+    requests: List[BatchRequestItem] = Field(max_length=settings.BATCH_MAX_REQUESTS)
@@ -6,6 +6,7 @@ class Role(BaseModel):
     id: int
     name: str
     description: Optional[str] = None
+    parent_id: Optional[int] = None
     created_at: datetime
 
 class Permission(BaseModel):
@@ -17,10 +18,14 @@ class Permission(BaseModel):
 class RoleCreate(BaseModel):
     name: str
     description: Optional[str] = None
+    # Role that also receives this role's permissions
+    parent_id: Optional[int] = None
 
 class RoleUpdate(BaseModel):
     name: Optional[str] = None
     description: Optional[str] = None
+    # Send null explicitly to detach the role from its parent
+    parent_id: Optional[int] = None
 
 class RoleWithPermissions(Role):
     permissions: List[Permission]
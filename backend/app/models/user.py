@@ -1,3 +1,4 @@
+from datetime import datetime
 from pydantic import BaseModel, EmailStr
 from typing import List, Optional
 
@@ -13,6 +14,8 @@ class User(UserBase):
     id: int
     role_id: int
     is_active: bool = True
+    last_login: Optional[datetime] = None
+    last_seen: Optional[datetime] = None
     
     class Config:
         from_attributes = True
@@ -20,6 +23,13 @@ class User(UserBase):
 class Token(BaseModel):
     access_token: str
     token_type: str
+    refresh_token: Optional[str] = None
+
+class TokenRefresh(BaseModel):
+    refresh_token: str
+
+class TokenRevoke(BaseModel):
+    refresh_token: Optional[str] = None
 
 class TokenData(BaseModel):
     username: Optional[str] = None
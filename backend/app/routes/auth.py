@@ -1,13 +1,16 @@
 from fastapi import APIRouter, Depends, HTTPException, status
-from fastapi.security import OAuth2PasswordRequestForm, OAuth2PasswordBearer
+from fastapi.security import OAuth2PasswordRequestForm
 from datetime import timedelta
+from typing import Optional
 from app.config import settings
-from app.models.user import UserCreate, User, Token
+from app.db.database import write_together
+from app.models.user import UserCreate, User, Token, TokenRefresh, TokenRevoke
 from app.services.auth import AuthService
-from app.utils.security import create_access_token, get_current_user
+from app.services.revocation import deny_list
+from app.services.session import session_store
+from app.utils.security import create_access_token, decode_token, get_current_user, oauth2_scheme
 
 router = APIRouter(tags=["auth"])
-oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
 
 @router.post("/register", response_model=User)
 async def register(user_data: UserCreate):
@@ -29,15 +32,45 @@ async def login(form_data: OAuth2PasswordRequestForm = Depends()):
             headers={"WWW-Authenticate": "Bearer"},
         )
     
+    return _token_response(user.username, await session_store.issue(user.id, user.username))
+
+@router.post("/token/refresh", response_model=Token)
+async def refresh_token(data: TokenRefresh):
+    """
+    Exchange a refresh token for a new access token and refresh token.
+    """
+    session, new_refresh_token = await session_store.rotate(data.refresh_token)
+    return _token_response(session.username, new_refresh_token)
+
+@router.post("/token/revoke")
+async def revoke_token(
+    data: Optional[TokenRevoke] = None,
+    token: str = Depends(oauth2_scheme),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Revoke the current access token and, if given, its refresh token.
+    """
+    claims = decode_token(token)
+    changes = []
+    if claims.get("jti"):
+        changes.append(deny_list.token_revocation(claims["jti"], current_user.id, claims["exp"]))
+    if data and data.refresh_token:
+        changes.append(session_store.token_revocation(data.refresh_token))
+    await write_together(change for change in changes if change is not None)
+    return {"status": "success", "message": "Token revoked"}
+
+def _token_response(username: str, refresh_token: str) -> dict:
     access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = create_access_token(
-        data={"sub": user.username},
+        data={"sub": username},
         expires_delta=access_token_expires
     )
     
     return {
         "access_token": access_token,
-        "token_type": "bearer"
+        "token_type": "bearer",
+        "refresh_token": refresh_token
     }
 
 @router.get("/verify-admin")
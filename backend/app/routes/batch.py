@@ -0,0 +1,144 @@
+import asyncio
+import json
+import logging
+from typing import List, Optional, Tuple
+from fastapi import APIRouter, Depends, Request, Response
+from starlette.exceptions import HTTPException
+from app.models.batch import BatchRequest, BatchRequestItem
+from app.models.user import User
+from app.utils.security import CURRENT_USER_STATE, get_current_user, oauth2_scheme
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(tags=["batch"])
+
+# Headers a sub-request may not set; the caller's credentials always apply
+_RESERVED_HEADERS = {"authorization", "content-length", "host"}
+
+# Response headers passed back per sub-request
+_RESPONSE_HEADERS = {"content-type", "etag", "cache-control", "location", "retry-after"}
+
+SubResponse = Tuple[int, List[Tuple[str, str]], bytes]
+
+@router.post("/batch")
+async def batch(
+    batch_request: BatchRequest,
+    request: Request,
+    token: str = Depends(oauth2_scheme),
+    user: User = Depends(get_current_user)
+):
+    """
+    Run several API requests in one round trip.
+
+    The caller is authenticated once; every sub-request still goes through
+    its route's own permission checks. Sub-requests run concurrently and
+    their responses are returned in request order.
+    """
+    results = await asyncio.gather(*(
+        _dispatch(request, item, token, user) for item in batch_request.requests
+    ))
+    # Sub-response bodies are spliced in as-is rather than decoded and re-encoded
+    parts = [_encode(status_code, headers, body) for status_code, headers, body in results]
+    return Response(
+        b'{"responses":[' + b",".join(parts) + b"]}",
+        media_type="application/json"
+    )
+
+async def _dispatch(request: Request, item: BatchRequestItem, token: str, user: User) -> SubResponse:
+    path, _, query = item.path.partition("?")
+    if not path.startswith("/") or path == request.url.path:
+        return _error(400, "Invalid batch path")
+
+    body = b"" if item.body is None else json.dumps(item.body).encode()
+    try:
+        headers = [
+            (name.lower().encode("latin-1"), value.encode("latin-1"))
+            for name, value in item.headers.items()
+            if name.lower() not in _RESERVED_HEADERS
+        ]
+    except UnicodeEncodeError:
+        # HTTP header values are latin-1; only this sub-request is rejected
+        return _error(400, "Invalid batch header")
+    headers += [
+        (b"authorization", f"Bearer {token}".encode("latin-1")),
+        (b"content-length", str(len(body)).encode()),
+    ]
+    if body and "content-type" not in {name.lower() for name in item.headers}:
+        headers.append((b"content-type", b"application/json"))
+
+    parent = request.scope
+    scope = {
+        "type": "http",
+        "asgi": parent.get("asgi", {"version": "3.0"}),
+        "http_version": parent.get("http_version", "1.1"),
+        "method": item.method.upper(),
+        "scheme": parent["scheme"],
+        "server": parent.get("server"),
+        "client": parent.get("client"),
+        "root_path": parent.get("root_path", ""),
+        "path": path,
+        "raw_path": path.encode(),
+        "query_string": query.encode(),
+        "headers": headers,
+        "app": parent["app"],
+        "state": {CURRENT_USER_STATE: (token, user)},
+        "starlette.exception_handlers": parent.get("starlette.exception_handlers"),
+    }
+
+    done = asyncio.Event()
+    received = False
+
+    async def receive():
+        nonlocal received
+        if not received:
+            received = True
+            return {"type": "http.request", "body": body, "more_body": False}
+        await done.wait()
+        return {"type": "http.disconnect"}
+
+    status_code = 500
+    response_headers: List[Tuple[str, str]] = []
+    chunks: List[bytes] = []
+
+    async def send(message):
+        nonlocal status_code, response_headers
+        if message["type"] == "http.response.start":
+            status_code = message["status"]
+            response_headers = [
+                (name.decode("latin-1"), value.decode("latin-1"))
+                for name, value in message.get("headers", [])
+            ]
+        elif message["type"] == "http.response.body":
+            chunks.append(message.get("body", b""))
+
+    try:
+        # The router skips the middleware stack; the outer request already ran it
+        await request.app.router(scope, receive, send)
+    except HTTPException as exc:
+        # Raised by the router itself when no route matches
+        return _error(exc.status_code, exc.detail)
+    except Exception:
+        logger.exception("Batch sub-request %s %s failed", item.method, path)
+        return _error(500, "Internal Server Error")
+    finally:
+        done.set()
+
+    return status_code, response_headers, b"".join(chunks)
+
+def _error(status_code: int, detail: str) -> SubResponse:
+    return (
+        status_code,
+        [("content-type", "application/json")],
+        json.dumps({"detail": detail}).encode()
+    )
+
+def _encode(status_code: int, headers: List[Tuple[str, str]], body: bytes) -> bytes:
+    selected = {name: value for name, value in headers if name in _RESPONSE_HEADERS}
+    content_type: Optional[str] = selected.get("content-type")
+    if not body:
+        body = b"null"
+    elif not (content_type and content_type.startswith("application/json")):
+        body = json.dumps(body.decode("utf-8", "replace")).encode()
+    return b'{"status":%d,"headers":%s,"body":%s}' % (
+        status_code, json.dumps(selected).encode(), body
+    )
@@ -0,0 +1,27 @@
+from fastapi import APIRouter, Depends
+from app.dependencies.rbac import require_permission
+from app.models.user import User
+from app.services.dashboard import DashboardService
+from app.services.rbac import PermissionRequirement
+
+_view_roles = PermissionRequirement(("view_roles",))
+_view_audit_logs = PermissionRequirement(("view_audit_logs",))
+
+router = APIRouter(prefix="/dashboard", tags=["dashboard"])
+
+@router.get("/summary")
+async def get_summary(
+    days: int = 7,
+    limit: int = 10,
+    user: User = Depends(require_permission("view_users"))
+):
+    """Get user, role and audit figures plus recent activity in one call.
+
+    Role and audit sections are only included when the caller may view them.
+    """
+    return await DashboardService.get_summary(
+        include_roles=_view_roles.allows(user.role_id),
+        include_audit=_view_audit_logs.allows(user.role_id),
+        days=max(1, min(days, 90)),
+        activity_limit=max(1, min(limit, 100)),
+    )
@@ -0,0 +1,14 @@
+from fastapi import APIRouter, Response
+from app.config import settings
+from app.services.keyring import key_ring
+
+router = APIRouter(tags=["auth"])
+
+@router.get("/.well-known/jwks.json")
+async def get_jwks():
+    """Public keys for verifying access tokens"""
+    return Response(
+        content=key_ring.jwks(),
+        media_type="application/json",
+        headers={"Cache-Control": f"public, max-age={settings.JWKS_CACHE_SECONDS}"}
+    )
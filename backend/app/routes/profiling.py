@@ -0,0 +1,67 @@
+from typing import Literal
+from fastapi import APIRouter, Depends, Query
+from fastapi.responses import PlainTextResponse
+from app.config import settings
+from app.dependencies.rbac import require_permission
+from app.models.user import User
+from app.services.profiling import allocation_tracer, collapsed, cpu_profiler, flamegraph
+
+router = APIRouter(prefix="/system/profile", tags=["system"])
+
+GroupBy = Literal["lineno", "filename", "traceback"]
+
+@router.get("/cpu")
+async def profile_cpu(
+    seconds: float = Query(5.0, gt=0, le=settings.PROFILE_MAX_SECONDS),
+    interval: float = Query(0.005, ge=0.001, le=1.0),
+    format: Literal["collapsed", "flamegraph"] = "collapsed",
+    idle: bool = False,
+    user: User = Depends(require_permission("manage_settings"))
+):
+    """Sample this worker's threads for ``seconds`` and return the stacks seen.
+
+    ``collapsed`` is the text format read by flamegraph.pl and speedscope;
+    ``flamegraph`` is a JSON tree. Waiting threads are left out unless ``idle``.
+    """
+    samples = await cpu_profiler.profile(seconds, interval, include_idle=idle)
+    if format == "collapsed":
+        return PlainTextResponse(collapsed(samples))
+    return {
+        "seconds": seconds,
+        "interval": interval,
+        "samples": sum(samples.values()),
+        "root": flamegraph(samples),
+    }
+
+@router.post("/memory/start")
+async def start_allocation_tracing(
+    frames: int = Query(1, ge=1, le=64),
+    user: User = Depends(require_permission("manage_settings"))
+):
+    """Start tracing allocations with ``frames`` frames per traceback"""
+    allocation_tracer.start(frames, settings.PROFILE_TRACE_MAX_SECONDS)
+    return allocation_tracer.metrics()
+
+@router.post("/memory/snapshot")
+async def snapshot_allocations(
+    limit: int = Query(25, ge=1, le=500),
+    group_by: GroupBy = "lineno",
+    user: User = Depends(require_permission("manage_settings"))
+):
+    """Take a snapshot, keep it as the diff baseline and return the top sites"""
+    return await allocation_tracer.snapshot(limit, group_by)
+
+@router.get("/memory/diff")
+async def diff_allocations(
+    limit: int = Query(25, ge=1, le=500),
+    group_by: GroupBy = "lineno",
+    user: User = Depends(require_permission("manage_settings"))
+):
+    """Compare a new snapshot with the baseline"""
+    return await allocation_tracer.diff(limit, group_by)
+
+@router.post("/memory/stop")
+async def stop_allocation_tracing(user: User = Depends(require_permission("manage_settings"))):
+    """Stop tracing and drop the baseline"""
+    allocation_tracer.stop()
+    return allocation_tracer.metrics()
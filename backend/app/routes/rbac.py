@@ -1,14 +1,18 @@
 from fastapi import APIRouter, Depends, HTTPException, status
-from typing import List
+from typing import List, Optional
 from app.models.rbac import Role, RoleCreate, RoleUpdate, Permission
 from app.services.rbac import RBACService
+from app.dependencies.caching import conditional
 from app.dependencies.rbac import require_permission, require_role
 from app.models.user import User
 
 router = APIRouter(prefix="/rbac", tags=["rbac"])
 
 @router.get("/roles", response_model=List[Role])
-async def get_roles(user: User = Depends(require_permission("view_roles"))):
+async def get_roles(
+    user: User = Depends(require_permission("view_roles")),
+    etag: Optional[str] = Depends(conditional("roles", "permissions", "role_permissions"))
+):
     """Get all roles"""
     return await RBACService.get_all_roles()
 
@@ -51,7 +55,10 @@ async def assign_user_role(
     return await RBACService.assign_role_to_user(user_id, role_id)
 
 @router.get("/permissions", response_model=List[Permission])
-async def get_permissions(user: User = Depends(require_permission("view_roles"))):
+async def get_permissions(
+    user: User = Depends(require_permission("view_roles")),
+    etag: Optional[str] = Depends(conditional("permissions"))
+):
     """Get all permissions"""
     return await RBACService.get_all_permissions()
 
@@ -0,0 +1,54 @@
+from typing import List
+from fastapi import APIRouter, Depends
+from fastapi.responses import FileResponse
+from app.dependencies.rbac import require_permission
+from app.models.backup import Backup
+from app.models.user import User
+from app.services.backup import backup_store
+
+router = APIRouter(prefix="/settings", tags=["settings"])
+
+@router.post("/backup", response_model=Backup)
+async def create_backup(user: User = Depends(require_permission("manage_settings"))):
+    """Take a compressed online backup of the database"""
+    return await backup_store.create()
+
+@router.get("/backups", response_model=List[Backup])
+async def list_backups(user: User = Depends(require_permission("view_settings"))):
+    """List backups, newest first"""
+    return backup_store.list()
+
+@router.get("/backups/{backup_id}")
+async def download_backup(
+    backup_id: str,
+    user: User = Depends(require_permission("manage_settings"))
+):
+    """Download a backup"""
+    return FileResponse(
+        backup_store.path(backup_id),
+        media_type="application/gzip",
+        filename=f"app-{backup_id}.db.gz"
+    )
+
+@router.delete("/backups/{backup_id}")
+async def delete_backup(
+    backup_id: str,
+    user: User = Depends(require_permission("manage_settings"))
+):
+    """Delete a backup"""
+    backup_store.delete(backup_id)
+    return {"status": "success", "message": "Backup deleted"}
+
+@router.post("/backups/prune")
+async def prune_backups(user: User = Depends(require_permission("manage_settings"))):
+    """Delete all but the newest BACKUP_KEEP backups"""
+    return {"status": "success", "removed": backup_store.prune()}
+
+@router.post("/backups/{backup_id}/restore")
+async def restore_backup(
+    backup_id: str,
+    user: User = Depends(require_permission("manage_settings"))
+):
+    """Replace the database with a backup"""
+    await backup_store.restore(backup_id)
+    return {"status": "success", "message": "Backup restored"}
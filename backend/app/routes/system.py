@@ -0,0 +1,31 @@
+from fastapi import APIRouter, Depends
+from app.db.database import db_writer, read_pool
+from app.db.maintenance import maintenance
+from app.dependencies.rbac import require_permission
+from app.middleware.admission import admission
+from app.services.activity import activity_tracker
+from app.services.backup import backup_store
+from app.services.profiling import allocation_tracer, cpu_profiler
+from app.services.availability import identity_filter
+from app.models.user import User
+
+router = APIRouter(prefix="/system", tags=["system"])
+
+@router.get("/metrics")
+async def get_metrics(user: User = Depends(require_permission("view_settings"))):
+    """Get runtime metrics"""
+    return {
+        "database": {
+            "read_pool": read_pool.metrics(),
+            "writer": db_writer.metrics(),
+            "maintenance": maintenance.metrics(),
+            "backups": backup_store.metrics(),
+        },
+        "activity": activity_tracker.metrics(),
+        "availability": identity_filter.metrics(),
+        "admission": admission.metrics(),
+        "profiling": {
+            "cpu_running": cpu_profiler.running,
+            "allocations": allocation_tracer.metrics(),
+        },
+    }
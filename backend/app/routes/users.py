@@ -1,7 +1,14 @@
+from datetime import datetime
 from fastapi import APIRouter, Depends, HTTPException, status
-from typing import List
+from typing import List, Optional, Tuple
+from fastapi.responses import JSONResponse
+from app.db.changes import ACTIVITY_VERSION
 from app.models.user import User, UserList, UserCreate, UserUpdate
+from app.dependencies.caching import conditional
+from app.dependencies.fields import select_fields, sparse_fields
 from app.dependencies.rbac import require_permission
+from app.services.auth import AuthService
+from app.services.availability import identity_filter
 from app.services.user import UserService
 
 router = APIRouter(prefix="/users", tags=["users"])
@@ -10,11 +17,20 @@ router = APIRouter(prefix="/users", tags=["users"])
 async def get_users(
     page: int = 1,
     page_size: int = 10,
-    user: User = Depends(require_permission("view_users"))
+    inactive_since: Optional[datetime] = None,
+    user: User = Depends(require_permission("view_users")),
+    fields: Optional[Tuple[str, ...]] = Depends(sparse_fields(User))
 ):
-    """Get paginated list of users"""
-    users = await UserService.get_users(page, page_size)
-    total = await UserService.get_total_users()
+    """Get paginated list of users, optionally narrowed to ``fields`` or to
+    users not seen since ``inactive_since``"""
+    if inactive_since is not None:
+        users = await UserService.get_users(page, page_size, fields, inactive_since)
+        total = await UserService.get_inactive_total(inactive_since)
+    else:
+        users = await UserService.get_users(page, page_size, fields)
+        total = await UserService.get_total_users()
+    if fields:
+        return _sparse_page(users, fields, total, page, page_size)
     return {
         "users": users,
         "total": total,
@@ -22,6 +38,21 @@ async def get_users(
         "page_size": page_size
     }
 
+@router.get("/availability")
+async def check_availability(username: Optional[str] = None, email: Optional[str] = None):
+    """Check whether a username and/or email can still be registered"""
+    if username is None and email is None:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Provide a username or an email"
+        )
+    taken = await identity_filter.taken(username=username, email=email)
+    values = {"username": username, "email": email}
+    return {
+        field: {"value": values[field], "available": not in_use}
+        for field, in_use in taken.items()
+    }
+
 @router.post("", response_model=User)
 async def create_user(
     user_data: UserCreate,
@@ -45,13 +76,16 @@ async def search_users(
     q: str,
     page: int = 1,
     page_size: int = 10,
-    current_user: User = Depends(require_permission("view_users"))
+    current_user: User = Depends(require_permission("view_users")),
+    fields: Optional[Tuple[str, ...]] = Depends(sparse_fields(User))
 ):
     """Search users by username, email, or role"""
-    users_data = await UserService.search_users(q, page, page_size)
+    users_data = await UserService.search_users(q, page, page_size, fields)
     total = await UserService.get_search_total(q)
+    if fields:
+        return _sparse_page(users_data, fields, total, page, page_size)
     
-    # Convert the list of dictionaries to list of User models
+    # Convert the user records to User models
     users = [User(**user) for user in users_data]
     
     return UserList(
@@ -64,7 +98,8 @@ async def search_users(
 @router.get("/{user_id}", response_model=User)
 async def get_user(
     user_id: int,
-    current_user: User = Depends(require_permission("view_users"))
+    current_user: User = Depends(require_permission("view_users")),
+    etag: Optional[str] = Depends(conditional("users", "roles", ACTIVITY_VERSION))
 ):
     """Get user by ID"""
     user = await UserService.get_user(user_id)
@@ -88,3 +123,22 @@ async def delete_user(
         )
     await UserService.delete_user(user_id)
     return {"status": "success", "message": "User deleted"}
+
+
+@router.post("/{user_id}/revoke-tokens")
+async def revoke_user_tokens(
+    user_id: int,
+    current_user: User = Depends(require_permission("manage_users"))
+):
+    """Revoke all tokens issued to a user"""
+    await AuthService.revoke_user_tokens(user_id)
+    return {"status": "success", "message": "User tokens revoked"}
+
+def _sparse_page(users, fields: Tuple[str, ...], total: int, page: int, page_size: int):
+    # Partial users do not validate against UserList, so skip the response model
+    return JSONResponse({
+        "users": select_fields(users, fields),
+        "total": total,
+        "page": page,
+        "page_size": page_size
+    })
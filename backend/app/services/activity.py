@@ -0,0 +1,113 @@
+import asyncio
+import logging
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Dict, List
+from app.db.changes import ACTIVITY_VERSION, bump_version
+from app.db.database import write
+
+logger = logging.getLogger(__name__)
+
+def _timestamp(seconds: float) -> str:
+    """Format like SQLite's ``CURRENT_TIMESTAMP`` so stored values compare as text."""
+    return datetime.fromtimestamp(seconds, timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
+
+def stored_timestamp(moment: datetime) -> str:
+    """``moment`` in the stored format; naive values are taken as UTC."""
+    if moment.tzinfo is not None:
+        moment = moment.astimezone(timezone.utc)
+    return moment.strftime("%Y-%m-%d %H:%M:%S")
+
+class ActivityTracker:
+    """Coalesces ``last_login`` / ``last_seen`` updates in memory.
+
+    Recording a timestamp is a dict assignment; only the latest value per
+    user is kept. ``flush`` writes everything pending as one writer job, so
+    a busy worker costs one write per interval instead of one per request.
+    The stored values therefore lag by at most the flush interval. Rows are
+    only updated to newer values, so workers flushing out of order cannot
+    move a timestamp backwards. A flush that moved any row bumps
+    ``ACTIVITY_VERSION`` so ETags over these columns change with it.
+    """
+
+    def __init__(self):
+        self._logins: Dict[int, float] = {}
+        self._seen: Dict[int, float] = {}
+        self._lock = threading.Lock()
+        self._stats = {"recorded": 0, "flushes": 0, "rows": 0, "failures": 0}
+
+    def seen(self, user_id: int):
+        with self._lock:
+            self._seen[user_id] = time.time()
+            self._stats["recorded"] += 1
+
+    def logged_in(self, user_id: int):
+        with self._lock:
+            now = time.time()
+            self._logins[user_id] = now
+            self._seen[user_id] = now
+            self._stats["recorded"] += 1
+
+    def seen_since(self, moment: datetime) -> List[int]:
+        """Users this worker has seen at or after ``moment`` but not flushed yet."""
+        cutoff = stored_timestamp(moment)
+        with self._lock:
+            seen = list(self._seen.items())
+        return [user_id for user_id, at in seen if _timestamp(at) >= cutoff]
+
+    async def flush(self) -> int:
+        """Write pending timestamps and return how many users were updated."""
+        with self._lock:
+            logins, self._logins = self._logins, {}
+            seen, self._seen = self._seen, {}
+        if not logins and not seen:
+            return 0
+
+        login_rows = [(_timestamp(at), user_id, _timestamp(at)) for user_id, at in logins.items()]
+        seen_rows = [(_timestamp(at), user_id, _timestamp(at)) for user_id, at in seen.items()]
+
+        def update(db) -> int:
+            logins_moved = db.executemany("""
+                UPDATE users SET last_login = ?
+                WHERE id = ? AND (last_login IS NULL OR last_login < ?)
+            """, login_rows).rowcount
+            # Every login is also a sighting, so this counts the users updated
+            seen_moved = db.executemany("""
+                UPDATE users SET last_seen = ?
+                WHERE id = ? AND (last_seen IS NULL OR last_seen < ?)
+            """, seen_rows).rowcount
+            if logins_moved or seen_moved:
+                bump_version(db, ACTIVITY_VERSION)
+            return seen_moved
+
+        try:
+            updated = await write(update)
+        except Exception:
+            # Put the batch back unless newer values arrived meanwhile
+            with self._lock:
+                for pending, batch in ((self._logins, logins), (self._seen, seen)):
+                    for user_id, at in batch.items():
+                        pending[user_id] = max(at, pending.get(user_id, at))
+                self._stats["failures"] += 1
+            raise
+        with self._lock:
+            self._stats["flushes"] += 1
+            self._stats["rows"] += updated
+        return updated
+
+    async def run(self, interval: float):
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await self.flush()
+            except Exception:
+                # Keep the loop alive; the batch was put back for the next try
+                logger.exception("Activity flush failed")
+
+    def metrics(self) -> dict:
+        with self._lock:
+            pending = len(self._seen)
+        return {"pending": pending, **self._stats}
+
+activity_tracker = ActivityTracker()
@@ -1,35 +1,37 @@
+import sqlite3
 from fastapi import HTTPException, status
 from typing import Optional
 from app.models.user import User, UserCreate
-from app.db.database import get_db, get_user_by_username, get_user_by_email, create_user
+from app.db.database import (
+    get_db, create_user, get_read_db, read_only, release_session, write_together,
+)
+from app.db.records import USER_FROM, USER_PROJECTION, user_mapper
+from app.services.activity import activity_tracker
+from app.services.availability import duplicate_error, identity_filter
+from app.services.revocation import deny_list
+from app.services.session import session_store
 from app.utils.security import verify_password, get_password_hash
 
 class AuthService:
     @staticmethod
     async def register(user_data: UserCreate) -> User:
-        # Check if username exists
-        if get_user_by_username(user_data.username):
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Username already registered"
-            )
-        
-        # Check if email exists
-        if get_user_by_email(user_data.email):
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Email already registered"
-            )
+        # Check if username or email exists; a miss in the filter needs no query
+        await identity_filter.ensure_available(user_data.username, user_data.email)
         
         # Hash password
+        release_session()
         hashed_password = get_password_hash(user_data.password)
         
-        # Create user
-        user_id = create_user(
-            username=user_data.username,
-            email=user_data.email,
-            hashed_password=hashed_password
-        )
+        # Create user; the UNIQUE constraints settle concurrent registrations
+        try:
+            user_id = await create_user(
+                username=user_data.username,
+                email=user_data.email,
+                hashed_password=hashed_password
+            )
+        except sqlite3.IntegrityError as exc:
+            raise duplicate_error(exc) or exc
+        identity_filter.add(user_data.username, user_data.email)
         
         return User(
             id=user_id,
@@ -39,33 +41,32 @@ class AuthService:
         )
 
     @staticmethod
+    @read_only
     async def authenticate(username: str, password: str) -> Optional[User]:
         """
         Authenticate user and return User object if successful.
         """
         with get_db() as db:
-            cursor = db.execute("""
-                SELECT u.id, u.username, u.email, u.hashed_password, u.role_id, u.is_active
-                FROM users u
+            cursor = db.execute(f"""
+                SELECT {USER_PROJECTION}, u.hashed_password
+                {USER_FROM}
                 WHERE u.username = ?
             """, (username,))
-            user = cursor.fetchone()
+            row = cursor.fetchone()
 
-            if not user:
-                return None
-            
-            if not verify_password(password, user["hashed_password"]):
-                return None
-            
-            return User(
-                id=user["id"],
-                username=user["username"],
-                email=user["email"],
-                role_id=user["role_id"],
-                is_active=user["is_active"]
-            )
+        if not row:
+            return None
+        
+        # Verify after releasing the connection; bcrypt is slow
+        release_session()
+        if not verify_password(password, row["hashed_password"]):
+            return None
+
+        activity_tracker.logged_in(row["id"])
+        return User.model_validate(user_mapper(row))
 
     @staticmethod
+    @read_only
     async def is_admin(user_id: int) -> bool:
         with get_db() as db:
             cursor = db.execute("""
@@ -76,4 +77,20 @@ class AuthService:
             """, (user_id,))
             result = cursor.fetchone()
             
-            return result and result['role_name'] == 'admin'
\ No newline at end of file
+            return result and result['role_name'] == 'admin'
+
+    @staticmethod
+    async def revoke_user_tokens(user_id: int):
+        """Revoke all access and refresh tokens issued to a user."""
+        with get_read_db() as db:
+            cursor = db.execute("SELECT id FROM users WHERE id = ?", (user_id,))
+            if not cursor.fetchone():
+                raise HTTPException(
+                    status_code=status.HTTP_404_NOT_FOUND,
+                    detail="User not found"
+                )
+        # One writer job: access and refresh tokens are cut off together or not at all
+        await write_together([
+            deny_list.user_revocation(user_id),
+            session_store.user_revocation(user_id),
+        ])
\ No newline at end of file
@@ -0,0 +1,130 @@
+import sqlite3
+import threading
+from typing import Dict, Optional
+from fastapi import HTTPException, status
+from app.db.changes import ChangeFeed, change_feed
+from app.db.database import get_db, get_read_db, read_only
+from app.utils.bloom import BloomFilter
+
+# Unique columns of users and the error reported when a value is taken
+UNIQUE_FIELDS = {
+    "username": "Username already registered",
+    "email": "Email already registered",
+}
+
+def duplicate_error(exc: sqlite3.IntegrityError) -> Optional[HTTPException]:
+    """Map a UNIQUE violation on users to the matching 400, if it is one."""
+    message = str(exc)
+    for field, detail in UNIQUE_FIELDS.items():
+        if f"users.{field}" in message:
+            return HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=detail)
+    return None
+
+class IdentityFilter:
+    """Bloom filters of every username and email in ``users``.
+
+    A negative answer is final and costs no query; a positive one is
+    confirmed against the unique index. New and updated users are added as
+    the change feed reports them. Deleted users stay in the filter until
+    enough of them pile up, or the filter fills past its capacity, and the
+    filters are rebuilt.
+    """
+
+    def __init__(self, feed: ChangeFeed, error_rate: float = 0.01):
+        self._error_rate = error_rate
+        self._filters: Optional[Dict[str, BloomFilter]] = None
+        self._stale = 0
+        self._lock = threading.Lock()
+        self._stats = {"probes": 0, "negatives": 0, "false_positives": 0, "rebuilds": 0}
+        feed.subscribe(("users",), self.on_change)
+
+    def load(self):
+        with get_read_db() as db:
+            count = db.execute("SELECT COUNT(*) FROM users").fetchone()[0]
+            capacity = max(1024, count * 2)
+            filters = {
+                field: BloomFilter(capacity, self._error_rate) for field in UNIQUE_FIELDS
+            }
+            for username, email in db.execute("SELECT username, email FROM users"):
+                filters["username"].add(username)
+                filters["email"].add(email)
+        with self._lock:
+            self._filters = filters
+            self._stale = 0
+            self._stats["rebuilds"] += 1
+
+    def add(self, username: str, email: str):
+        filters = self._filters
+        if filters is None:
+            return
+        if filters["username"].count >= filters["username"].capacity:
+            self.load()
+            return
+        filters["username"].add(username)
+        filters["email"].add(email)
+
+    def on_change(self, entity: str, entity_id: Optional[str]):
+        if self._filters is None:
+            return
+        if entity_id is None:
+            self.load()
+            return
+        with get_read_db() as db:
+            row = db.execute(
+                "SELECT username, email FROM users WHERE id = ?", (int(entity_id),)
+            ).fetchone()
+        if row is not None:
+            self.add(row[0], row[1])
+            return
+        self._stale += 1
+        if self._stale > self._filters["username"].capacity // 4:
+            self.load()
+
+    def might_exist(self, field: str, value: str) -> bool:
+        if self._filters is None:
+            self.load()
+        return value in self._filters[field]
+
+    @read_only
+    async def taken(self, **values: Optional[str]) -> Dict[str, bool]:
+        """Which of the given ``username``/``email`` values are in use."""
+        change_feed.sync()
+        result = {}
+        for field, value in values.items():
+            if value is None:
+                continue
+            self._stats["probes"] += 1
+            if not self.might_exist(field, value):
+                self._stats["negatives"] += 1
+                result[field] = False
+                continue
+            with get_db() as db:
+                result[field] = db.execute(
+                    f"SELECT 1 FROM users WHERE {field} = ?", (value,)
+                ).fetchone() is not None
+            if not result[field]:
+                self._stats["false_positives"] += 1
+        return result
+
+    async def ensure_available(self, username: str, email: str):
+        """Raise the usual 400 when the username or email is already taken.
+
+        Only a pre-check that spares the password hash; the insert itself
+        still relies on the UNIQUE constraints.
+        """
+        taken = await self.taken(username=username, email=email)
+        for field, detail in UNIQUE_FIELDS.items():
+            if taken.get(field):
+                raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=detail)
+
+    def metrics(self) -> dict:
+        filters = self._filters or {}
+        return {
+            **self._stats,
+            "entries": filters["username"].count if filters else 0,
+            "capacity": filters["username"].capacity if filters else 0,
+            "stale": self._stale,
+            "bytes": sum(f.size_bytes for f in filters.values()),
+        }
+
+identity_filter = IdentityFilter(change_feed)
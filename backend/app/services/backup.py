@@ -0,0 +1,242 @@
+import asyncio
+import gzip
+import os
+import re
+import secrets
+import shutil
+import sqlite3
+import time
+from datetime import datetime, timezone
+from typing import Dict, List
+from fastapi import HTTPException, status
+from app.config import settings
+from app.db.changes import change_feed, reset_change_tracking
+from app.db.database import (
+    DATABASE_URL, SCHEMA_FINGERPRINT_KEY, release_session, schema_fingerprint, write,
+)
+
+SUFFIX = ".db.gz"
+BACKUP_ID = re.compile(r"^\d{8}T\d{6}Z-[0-9a-f]{6}$")
+
+# Security state a restore keeps from the live database (attached as
+# ``live``). Revocations are unioned; signing keys and refresh token
+# sessions are taken as they are now. A restore must never revive a revoked
+# token or drop a key that current tokens are signed with.
+CARRY_OVER = """
+    INSERT OR REPLACE INTO revoked_tokens (jti, user_id, expires_at)
+    SELECT jti, user_id, expires_at FROM live.revoked_tokens;
+
+    INSERT INTO revoked_user_tokens (user_id, revoked_before, expires_at)
+    SELECT user_id, revoked_before, expires_at FROM live.revoked_user_tokens WHERE true
+    ON CONFLICT (user_id) DO UPDATE SET
+        revoked_before = MAX(revoked_before, excluded.revoked_before),
+        expires_at = MAX(expires_at, excluded.expires_at);
+
+    DELETE FROM signing_keys;
+    INSERT INTO signing_keys (kid, private_pem, public_pem, created_at, activates_at, retires_at)
+    SELECT kid, private_pem, public_pem, created_at, activates_at, retires_at
+    FROM live.signing_keys;
+
+    DELETE FROM refresh_tokens;
+    INSERT INTO refresh_tokens
+        (token_hash, family_id, user_id, expires_at, used_at, revoked, created_at)
+    SELECT token_hash, family_id, user_id, expires_at, used_at, revoked, created_at
+    FROM live.refresh_tokens;
+"""
+
+class BackupStore:
+    """Gzip-compressed snapshots of the database in ``directory``.
+
+    Backups copy the database with SQLite's online backup API, a few pages
+    per step, from a connection that holds one read transaction for the
+    whole copy. In WAL mode that snapshot never blocks the writer and the
+    copy is never restarted by concurrent commits. Restores copy a verified
+    backup back over the live database in a single backup step, which
+    readers see as one atomic transaction, then tell every worker to drop
+    its caches. Revocations, signing keys and refresh tokens are first
+    carried over from the live database (see ``CARRY_OVER``). One backup or restore runs at a time per worker.
+    """
+
+    def __init__(self, database: str, directory: str, keep: int,
+                 step_pages: int, step_sleep: float):
+        self._database = database
+        self.directory = directory
+        self.keep = keep
+        self.step_pages = step_pages
+        self.step_sleep = step_sleep
+        self._lock = asyncio.Lock()
+        self._stats = {"backups": 0, "restores": 0, "last_backup_ms": None, "last_restore_ms": None}
+
+    def list(self) -> List[Dict]:
+        """Backups, newest first."""
+        if not os.path.isdir(self.directory):
+            return []
+        backups = []
+        for name in os.listdir(self.directory):
+            backup_id = name[:-len(SUFFIX)]
+            if name.endswith(SUFFIX) and BACKUP_ID.match(backup_id):
+                backups.append(self._describe(backup_id))
+        return sorted(backups, key=lambda backup: backup["id"], reverse=True)
+
+    def path(self, backup_id: str) -> str:
+        """File of ``backup_id``; 404 for unknown or malformed ids."""
+        path = os.path.join(self.directory, backup_id + SUFFIX)
+        if not BACKUP_ID.match(backup_id) or not os.path.isfile(path):
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Backup not found"
+            )
+        return path
+
+    async def create(self) -> Dict:
+        async with self._exclusive():
+            release_session()
+            started = time.perf_counter()
+            stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+            backup_id = f"{stamp}-{secrets.token_hex(3)}"
+            await asyncio.to_thread(self._backup, backup_id)
+            self._stats["backups"] += 1
+            self._stats["last_backup_ms"] = round((time.perf_counter() - started) * 1000, 1)
+            self.prune()
+            return self._describe(backup_id)
+
+    def delete(self, backup_id: str):
+        os.remove(self.path(backup_id))
+
+    def prune(self) -> List[str]:
+        """Delete all but the newest ``keep`` backups and return their ids."""
+        removed = [backup["id"] for backup in self.list()[self.keep:]]
+        for backup_id in removed:
+            os.remove(self.path(backup_id))
+        return removed
+
+    async def restore(self, backup_id: str):
+        path = self.path(backup_id)
+        async with self._exclusive():
+            release_session()
+            started = time.perf_counter()
+            last_seq, versions = await asyncio.to_thread(self._restore, path)
+            # The restored change tables are older than what the workers have
+            # seen; continue numbering well past it and make everyone reload
+            await write(lambda db: reset_change_tracking(db, last_seq, versions))
+            change_feed.sync()
+            self._stats["restores"] += 1
+            self._stats["last_restore_ms"] = round((time.perf_counter() - started) * 1000, 1)
+
+    def metrics(self) -> dict:
+        return {"running": self._lock.locked(), "keep": self.keep, **self._stats}
+
+    def _exclusive(self) -> asyncio.Lock:
+        if self._lock.locked():
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail="A backup or restore is already running"
+            )
+        return self._lock
+
+    def _describe(self, backup_id: str) -> Dict:
+        created_at = datetime.strptime(backup_id[:16], "%Y%m%dT%H%M%SZ").replace(tzinfo=timezone.utc)
+        return {
+            "id": backup_id,
+            "created_at": created_at,
+            "size": os.path.getsize(os.path.join(self.directory, backup_id + SUFFIX)),
+        }
+
+    def _backup(self, backup_id: str):
+        os.makedirs(self.directory, exist_ok=True)
+        target = os.path.join(self.directory, backup_id + SUFFIX)
+        copy = target + ".tmp.db"
+        try:
+            source = sqlite3.connect(self._database, isolation_level=None)
+            destination = sqlite3.connect(copy)
+            try:
+                # Pin one snapshot so concurrent commits cannot restart the copy
+                source.execute("BEGIN")
+                source.execute("SELECT COUNT(*) FROM sqlite_master").fetchone()
+                source.backup(destination, pages=self.step_pages, sleep=self.step_sleep)
+                source.execute("COMMIT")
+            finally:
+                destination.close()
+                source.close()
+            with open(copy, "rb") as raw, gzip.open(target + ".tmp", "wb", compresslevel=6) as packed:
+                shutil.copyfileobj(raw, packed, 1024 * 1024)
+            # Only complete files ever carry the backup suffix
+            os.replace(target + ".tmp", target)
+        finally:
+            for leftover in (copy, target + ".tmp"):
+                if os.path.exists(leftover):
+                    os.remove(leftover)
+
+    def _restore(self, path: str):
+        copy = path + ".restore.db"
+        try:
+            try:
+                with gzip.open(path, "rb") as packed, open(copy, "wb") as raw:
+                    shutil.copyfileobj(packed, raw, 1024 * 1024)
+            except (OSError, EOFError):
+                raise _corrupt() from None
+            source = sqlite3.connect(copy, isolation_level=None)
+            try:
+                _verify(source)
+                _carry_over(source, self._database)
+                live = sqlite3.connect(self._database, timeout=30, isolation_level=None)
+                try:
+                    # Commits after this read are covered by the reset's gap
+                    last_seq, versions = _change_state(live)
+                    # One step: the whole database is replaced in one transaction
+                    source.backup(live, pages=-1)
+                finally:
+                    live.close()
+            finally:
+                source.close()
+            return last_seq, versions
+        finally:
+            if os.path.exists(copy):
+                os.remove(copy)
+
+def _corrupt() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_400_BAD_REQUEST,
+        detail="Backup is corrupt"
+    )
+
+def _verify(db: sqlite3.Connection):
+    try:
+        ok = db.execute("PRAGMA quick_check").fetchone()[0] == "ok"
+    except sqlite3.DatabaseError:
+        ok = False
+    if not ok:
+        raise _corrupt()
+    try:
+        row = db.execute(
+            "SELECT value FROM schema_meta WHERE key = ?", (SCHEMA_FINGERPRINT_KEY,)
+        ).fetchone()
+    except sqlite3.DatabaseError:
+        row = None
+    if row is None or row[0] != schema_fingerprint():
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Backup was taken with a different schema version"
+        )
+
+def _carry_over(db: sqlite3.Connection, database: str):
+    db.execute("ATTACH DATABASE ? AS live", (database,))
+    try:
+        db.executescript(f"BEGIN; {CARRY_OVER} COMMIT;")
+    finally:
+        if db.in_transaction:
+            db.execute("ROLLBACK")
+        db.execute("DETACH DATABASE live")
+
+def _change_state(db: sqlite3.Connection):
+    row = db.execute("SELECT seq FROM sqlite_sequence WHERE name = 'change_log'").fetchone()
+    versions = dict(db.execute("SELECT entity, version FROM change_versions").fetchall())
+    return (row[0] if row else 0), versions
+
+backup_store = BackupStore(
+    DATABASE_URL,
+    settings.BACKUP_DIR,
+    keep=settings.BACKUP_KEEP,
+    step_pages=settings.BACKUP_STEP_PAGES,
+    step_sleep=settings.BACKUP_STEP_SLEEP,
+)
@@ -0,0 +1,60 @@
+from datetime import datetime, timedelta
+from app.db.counters import ACTIVE_USERS, AUDIT_EVENTS, ROLE_USERS, ROLES, USERS
+from app.db.database import get_db, read_only
+from app.db.records import ACTIVITY_PROJECTION, activity_mapper
+
+class DashboardService:
+    @staticmethod
+    @read_only
+    async def get_summary(include_roles: bool = True, include_audit: bool = True,
+                          days: int = 7, activity_limit: int = 10) -> dict:
+        """Dashboard figures read from the trigger-maintained counters"""
+        today = datetime.utcnow().date()
+        day_names = [
+            f"{AUDIT_EVENTS}{today - timedelta(days=offset)}" for offset in range(days)
+        ]
+        names = [USERS, ACTIVE_USERS, ROLES, *day_names]
+
+        with get_db() as db:
+            cursor = db.execute(f"""
+                SELECT name, value FROM counters
+                WHERE name IN ({', '.join('?' * len(names))})
+            """, names)
+            counters = dict(cursor.fetchall())
+
+            summary = {
+                "users": {
+                    "total": counters.get(USERS, 0),
+                    "active": counters.get(ACTIVE_USERS, 0),
+                }
+            }
+
+            if include_roles:
+                cursor = db.execute(f"""
+                    SELECT r.id, r.name, IFNULL(c.value, 0)
+                    FROM roles r
+                    LEFT JOIN counters c ON c.name = '{ROLE_USERS}' || r.id
+                    ORDER BY r.id
+                """)
+                summary["users"]["by_role"] = [
+                    {"role_id": role_id, "role": name, "count": count}
+                    for role_id, name, count in cursor
+                ]
+                summary["roles"] = {"total": counters.get(ROLES, 0)}
+
+            if include_audit:
+                by_day = [
+                    {"date": name[len(AUDIT_EVENTS):], "count": counters.get(name, 0)}
+                    for name in day_names
+                ]
+                cursor = db.execute(f"""
+                    SELECT {ACTIVITY_PROJECTION}
+                    FROM audit_logs al
+                    LEFT JOIN users u ON al.user_id = u.id
+                    ORDER BY al.created_at DESC
+                    LIMIT ?
+                """, (activity_limit,))
+                summary["audit_events"] = {"today": by_day[0]["count"], "by_day": by_day}
+                summary["recent_activity"] = activity_mapper.all(cursor.fetchall())
+
+            return summary
@@ -0,0 +1,170 @@
+import json
+import secrets
+import threading
+import time
+from concurrent.futures import Future
+from typing import Dict, List, Optional
+from app.config import settings
+from app.db.changes import change_feed
+from app.db.database import db_writer, get_read_db
+
+class SigningKey:
+    """One key pair of the ring with its jose key objects prebuilt."""
+    __slots__ = ("kid", "activates_at", "retires_at", "created_at", "signer", "verifier", "public_jwk")
+
+    def __init__(self, kid: str, private_pem: str, public_pem: str,
+                 created_at: float, activates_at: float, retires_at: Optional[float]):
+        from jose import jwk
+        self.kid = kid
+        self.created_at = created_at
+        self.activates_at = activates_at
+        self.retires_at = retires_at
+        self.signer = jwk.construct(private_pem, settings.ALGORITHM)
+        self.verifier = jwk.construct(public_pem, settings.ALGORITHM)
+        self.public_jwk = {
+            **self.verifier.to_dict(),
+            "kid": kid,
+            "use": "sig",
+        }
+
+    def is_active(self, now: float) -> bool:
+        return self.activates_at <= now and not self.is_retired(now)
+
+    def is_retired(self, now: float) -> bool:
+        return self.retires_at is not None and self.retires_at <= now
+
+class KeyRing:
+    """Asymmetric JWT signing keys stored in the ``signing_keys`` table.
+
+    The newest active key signs; every unretired key verifies and is
+    published through JWKS. ``rotate`` adds a key that only starts signing
+    after ``JWKS_CACHE_SECONDS``, so verifiers holding a cached JWKS see it
+    before the first token carries its ``kid``. The previous key keeps
+    verifying until the last token it signed has expired.
+    """
+
+    def __init__(self):
+        self._keys: Dict[str, SigningKey] = {}
+        self._jwks: Optional[bytes] = None
+        self._jwks_valid_until = 0.0
+        self._loaded_at = 0.0
+        self._rotating = False
+        self._lock = threading.Lock()
+
+    @property
+    def token_lifetime(self) -> float:
+        return settings.ACCESS_TOKEN_EXPIRE_MINUTES * 60
+
+    async def ensure_key(self):
+        """Drop retired keys and create the first key if the ring is empty."""
+        now = time.time()
+
+        def prepare(db):
+            db.execute("DELETE FROM signing_keys WHERE retires_at <= ?", (now,))
+            if db.execute("SELECT COUNT(*) FROM signing_keys").fetchone()[0] == 0:
+                self._insert_key(db, activates_at=now)
+
+        # Keys are parsed lazily by the first current() or verifier() call
+        await db_writer.write(prepare)
+
+    def load(self):
+        """Load keys from the database."""
+        now = time.time()
+        with get_read_db() as db:
+            rows = db.execute("""
+                SELECT kid, private_pem, public_pem, created_at, activates_at, retires_at
+                FROM signing_keys
+            """).fetchall()
+
+        keys = {row["kid"]: SigningKey(*row) for row in rows}
+        with self._lock:
+            self._keys = keys
+            self._jwks = None
+            self._loaded_at = now
+            self._rotating = False
+
+    def current(self) -> SigningKey:
+        """Return the signing key, scheduling a rotation when it is due."""
+        now = time.time()
+        active = self._active(now)
+        if active is None:
+            self.load()
+            active = self._active(now)
+        rotation_due = active.created_at + settings.SIGNING_KEY_ROTATION_DAYS * 86400 <= now
+        if rotation_due and not self._rotating and not self._pending(now):
+            # Runs in the background; the change feed reloads the ring
+            self._rotating = True
+            self.rotate()
+        return active
+
+    def rotate(self) -> Future:
+        """Add a new key and schedule the retirement of the current ones."""
+        now = time.time()
+        activates_at = now + settings.JWKS_CACHE_SECONDS
+
+        def add_key(db):
+            pending = db.execute(
+                "SELECT 1 FROM signing_keys WHERE activates_at > ?", (now,)
+            ).fetchone()
+            if not pending:
+                db.execute("""
+                    UPDATE signing_keys SET retires_at = ?
+                    WHERE retires_at IS NULL
+                """, (activates_at + self.token_lifetime,))
+                self._insert_key(db, activates_at=activates_at)
+
+        return db_writer.submit(add_key)
+
+    def verifier(self, kid: Optional[str]):
+        """Verification key for ``kid``, or ``None`` if unknown or retired."""
+        key = self._keys.get(kid)
+        if key is None and kid and time.time() - self._loaded_at > 5:
+            # Another worker may have rotated; reload at most every few seconds
+            self.load()
+            key = self._keys.get(kid)
+        if key is None or key.is_retired(time.time()):
+            return None
+        return key.verifier
+
+    def jwks(self) -> bytes:
+        """Serialized JWK Set of all unretired public keys."""
+        if not self._loaded_at:
+            self.load()
+        now = time.time()
+        if self._jwks is None or now >= self._jwks_valid_until:
+            live = [key for key in self._keys.values() if not key.is_retired(now)]
+            keys: List[dict] = [key.public_jwk for key in live]
+            self._jwks = json.dumps({"keys": keys}).encode()
+            self._jwks_valid_until = min(
+                (key.retires_at for key in live if key.retires_at), default=float("inf")
+            )
+        return self._jwks
+
+    def _active(self, now: float) -> Optional[SigningKey]:
+        active = [key for key in self._keys.values() if key.is_active(now)]
+        return max(active, key=lambda key: key.activates_at, default=None)
+
+    def _pending(self, now: float) -> bool:
+        return any(key.activates_at > now for key in self._keys.values())
+
+    @staticmethod
+    def _insert_key(db, activates_at: float):
+        from cryptography.hazmat.primitives import serialization
+        from cryptography.hazmat.primitives.asymmetric import rsa
+        private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+        private_pem = private_key.private_bytes(
+            serialization.Encoding.PEM,
+            serialization.PrivateFormat.PKCS8,
+            serialization.NoEncryption(),
+        ).decode()
+        public_pem = private_key.public_key().public_bytes(
+            serialization.Encoding.PEM,
+            serialization.PublicFormat.SubjectPublicKeyInfo,
+        ).decode()
+        db.execute("""
+            INSERT INTO signing_keys (kid, private_pem, public_pem, created_at, activates_at)
+            VALUES (?, ?, ?, ?, ?)
+        """, (secrets.token_urlsafe(12), private_pem, public_pem, time.time(), activates_at))
+
+key_ring = KeyRing()
+change_feed.subscribe(("signing_keys",), lambda entity, entity_id: key_ring.load())
@@ -0,0 +1,177 @@
+import asyncio
+import sys
+import threading
+import tracemalloc
+from collections import Counter
+from typing import Dict, List, Optional
+from fastapi import HTTPException, status
+
+# Leaf frames of threads that are waiting rather than working. C calls have
+# no frame of their own, so a thread blocked in ``SimpleQueue.get`` shows
+# the Python function that called it.
+IDLE_FRAMES = {
+    "selectors:select",
+    "threading:wait",
+    "queue:get",
+    "concurrent.futures.thread:_worker",
+    "app.db.writer:_run",
+}
+
+def _busy(detail: str) -> HTTPException:
+    return HTTPException(status_code=status.HTTP_409_CONFLICT, detail=detail)
+
+def _label(frame) -> str:
+    return f"{frame.f_globals.get('__name__', '?')}:{frame.f_code.co_name}"
+
+class CpuProfiler:
+    """Time-boxed sampling profiler over ``sys._current_frames``.
+
+    While a profile runs, a sampler thread records the stack of every other
+    thread each ``interval`` seconds and counts identical stacks, rooted at
+    the thread name. Nothing is installed between profiles, so the cost when
+    idle is nil. Only the worker that serves the request is profiled.
+    """
+
+    def __init__(self):
+        self.running = False
+
+    async def profile(self, seconds: float, interval: float, include_idle: bool = False) -> Counter:
+        """Collapsed stacks (``root;caller;callee``) with their sample counts."""
+        if self.running:
+            raise _busy("A CPU profile is already running")
+        self.running = True
+        samples: Counter = Counter()
+        stop = threading.Event()
+        sampler = threading.Thread(
+            target=self._sample, args=(stop, interval, include_idle, samples),
+            name="cpu-profiler", daemon=True
+        )
+        sampler.start()
+        try:
+            await asyncio.sleep(seconds)
+        finally:
+            stop.set()
+            await asyncio.to_thread(sampler.join)
+            self.running = False
+        return samples
+
+    @staticmethod
+    def _sample(stop: threading.Event, interval: float, include_idle: bool, samples: Counter):
+        own = threading.get_ident()
+        while not stop.wait(interval):
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                stack = []
+                while frame is not None:
+                    stack.append(_label(frame))
+                    frame = frame.f_back
+                if not include_idle and stack and stack[0] in IDLE_FRAMES:
+                    continue
+                stack.append(names.get(ident, str(ident)))
+                samples[";".join(reversed(stack))] += 1
+
+def collapsed(samples: Counter) -> str:
+    """Brendan Gregg's collapsed format, one ``stack count`` line per stack."""
+    return "".join(f"{stack} {count}\n" for stack, count in samples.most_common())
+
+def flamegraph(samples: Counter) -> Dict:
+    """Nested ``{name, value, children}`` nodes as used by d3-flame-graph."""
+    root = {"name": "all", "value": 0, "children": {}}
+    for stack, count in samples.items():
+        root["value"] += count
+        node = root
+        for name in stack.split(";"):
+            node = node["children"].setdefault(name, {"name": name, "value": 0, "children": {}})
+            node["value"] += count
+
+    def finish(node: Dict) -> Dict:
+        children = sorted(node["children"].values(), key=lambda child: -child["value"])
+        return {**node, "children": [finish(child) for child in children]}
+
+    return finish(root)
+
+class AllocationTracer:
+    """``tracemalloc`` snapshots and diffs against a baseline.
+
+    Tracing only runs between ``start`` and ``stop`` and stops by itself
+    after ``max_seconds``, so the interpreter never keeps paying for it
+    because someone forgot to turn it off.
+    """
+
+    def __init__(self):
+        self._baseline: Optional[tracemalloc.Snapshot] = None
+        self._timer: Optional[asyncio.TimerHandle] = None
+
+    def start(self, frames: int, max_seconds: float):
+        if tracemalloc.is_tracing():
+            raise _busy("Allocation tracing is already running")
+        tracemalloc.start(frames)
+        self._timer = asyncio.get_running_loop().call_later(max_seconds, self.stop)
+
+    def stop(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        self._baseline = None
+        tracemalloc.stop()
+
+    async def snapshot(self, limit: int, group_by: str) -> Dict:
+        """Take a new baseline and return its largest allocation sites."""
+        snapshot = await self._take()
+        self._baseline = snapshot
+        stats = snapshot.statistics(group_by)[:limit]
+        return {
+            **self.metrics(),
+            "top": [
+                {"traceback": _traceback(stat), "size": stat.size, "count": stat.count}
+                for stat in stats
+            ],
+        }
+
+    async def diff(self, limit: int, group_by: str) -> Dict:
+        """Allocation sites that grew or shrank most since the baseline."""
+        if self._baseline is None:
+            raise _busy("Take a snapshot first")
+        snapshot = await self._take()
+        stats = snapshot.compare_to(self._baseline, group_by)[:limit]
+        return {
+            **self.metrics(),
+            "diff": [
+                {
+                    "traceback": _traceback(stat),
+                    "size": stat.size, "size_diff": stat.size_diff,
+                    "count": stat.count, "count_diff": stat.count_diff,
+                }
+                for stat in stats
+            ],
+        }
+
+    def metrics(self) -> Dict:
+        if not tracemalloc.is_tracing():
+            return {"tracing": False}
+        current, peak = tracemalloc.get_traced_memory()
+        return {
+            "tracing": True,
+            "frames": tracemalloc.get_traceback_limit(),
+            "traced_bytes": current,
+            "peak_bytes": peak,
+            "overhead_bytes": tracemalloc.get_tracemalloc_memory(),
+        }
+
+    async def _take(self) -> tracemalloc.Snapshot:
+        if not tracemalloc.is_tracing():
+            raise _busy("Allocation tracing is not running")
+        snapshot = await asyncio.to_thread(tracemalloc.take_snapshot)
+        return snapshot.filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+            tracemalloc.Filter(False, "<unknown>"),
+        ))
+
+def _traceback(stat) -> List[str]:
+    return [f"{frame.filename}:{frame.lineno}" for frame in stat.traceback]
+
+cpu_profiler = CpuProfiler()
+allocation_tracer = AllocationTracer()
@@ -1,70 +1,202 @@
+import sqlite3
 from fastapi import HTTPException, status
-from typing import List, Optional
+from typing import Dict, Iterable, List, Optional, Tuple
 from app.models.rbac import Role, Permission, RoleCreate, RoleUpdate
-from app.db.database import get_db
+from app.db.changes import ChangeFeed, EntityCache, change_feed
+from app.db.counters import ROLE_USERS, ROLES, USERS, read_counter
+from app.db.database import get_db, get_read_db, read_only, write
+from app.db.hierarchy import CYCLE_ERROR, PARENT_ERROR
+from app.db.records import (
+    PERMISSION_PROJECTION, ROLE_PROJECTION, ROLE_RETURNING, PermissionRecord, RoleRecord,
+    permission_mapper, role_mapper,
+)
+
+# Per-user role name and permission names, dropped when the user, any role
+# or any permission assignment changes in any worker
+_user_access = EntityCache(change_feed, "users", ("roles", "permissions", "role_permissions"))
+
+# Hierarchy trigger errors and the 400 each one is reported as
+HIERARCHY_ERRORS = {
+    CYCLE_ERROR: "Role cannot inherit from itself or its descendants",
+    PARENT_ERROR: "Parent role not found",
+}
+
+def hierarchy_error(exc: sqlite3.IntegrityError) -> Optional[HTTPException]:
+    """Map a hierarchy trigger failure to the matching 400, if it is one."""
+    message = str(exc)
+    for error, detail in HIERARCHY_ERRORS.items():
+        if error in message:
+            return HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=detail)
+    return None
+
+class PermissionMasks:
+    """Permissions compiled into integer bitsets.
+
+    Every permission owns bit ``id`` (ids are never reused), so a role's
+    effective permissions, inherited ones included, fold into one integer
+    and any requirement into another; a check is then a single ``&``. Masks
+    and role ranks come from the materialized closure tables (see
+    ``app.db.hierarchy``), so no hierarchy is walked at request time. The
+    tables are loaded on first use and
+    reloaded after any worker changes roles, permissions or assignments;
+    ``generation`` moves on each reload so compiled requirements know to
+    recompile.
+    """
+
+    def __init__(self, feed: ChangeFeed):
+        self._feed = feed
+        self._bits: Optional[Dict[str, int]] = None
+        self._role_masks: Dict[int, int] = {}
+        self._role_ids: Dict[str, int] = {}
+        self._at_least: Dict[int, frozenset] = {}
+        self.generation = 0
+        feed.subscribe(("roles", "permissions", "role_permissions"), self.invalidate)
+
+    def invalidate(self, entity: str = None, entity_id: Optional[str] = None):
+        self._bits = None
+
+    def bits(self) -> Dict[str, int]:
+        self._feed.sync()
+        if self._bits is None:
+            self._load()
+        return self._bits
+
+    def role_mask(self, role_id: Optional[int]) -> int:
+        self.bits()
+        return self._role_masks.get(role_id, 0)
+
+    def role_id(self, name: str) -> Optional[int]:
+        self.bits()
+        return self._role_ids.get(name)
+
+    def is_at_least(self, role_id: Optional[int], name: str) -> bool:
+        """Whether ``role_id`` is the role ``name`` or one of its ancestors."""
+        self.bits()
+        return role_id in self._at_least.get(self._role_ids.get(name), ())
+
+    def compile(self, names: Iterable[str]) -> Tuple[int, bool]:
+        """Fold ``names`` into a mask; also report whether all were known."""
+        bits = self.bits()
+        mask = 0
+        complete = True
+        for name in names:
+            bit = bits.get(name)
+            if bit is None:
+                complete = False
+            else:
+                mask |= bit
+        return mask, complete
+
+    def _load(self):
+        with get_read_db() as db:
+            bits = {
+                name: 1 << permission_id
+                for permission_id, name in db.execute("SELECT id, name FROM permissions")
+            }
+            role_ids = dict(db.execute("SELECT name, id FROM roles").fetchall())
+            role_masks = dict.fromkeys(role_ids.values(), 0)
+            for role_id, permission_id in db.execute(
+                "SELECT role_id, permission_id FROM role_effective_permissions"
+            ):
+                role_masks[role_id] = role_masks.get(role_id, 0) | (1 << permission_id)
+            at_least: Dict[int, set] = {}
+            for ancestor_id, descendant_id in db.execute(
+                "SELECT ancestor_id, descendant_id FROM role_closure"
+            ):
+                at_least.setdefault(descendant_id, set()).add(ancestor_id)
+        self._role_masks = role_masks
+        self._role_ids = role_ids
+        self._at_least = {role_id: frozenset(ids) for role_id, ids in at_least.items()}
+        self._bits = bits
+        self.generation += 1
+
+permission_masks = PermissionMasks(change_feed)
+
+class PermissionRequirement:
+    """A permission requirement compiled once into a mask test.
+
+    ``match_all`` requires every named permission, otherwise any one of them
+    suffices. The mask is recompiled only when the permission tables change.
+    """
+
+    def __init__(self, names: Iterable[str], match_all: bool = True,
+                 masks: PermissionMasks = permission_masks):
+        self.names = tuple(names)
+        self.match_all = match_all
+        self._masks = masks
+        self._generation = -1
+        self._mask = 0
+        self._satisfiable = True
+
+    def mask(self) -> int:
+        self._masks.bits()
+        if self._generation != self._masks.generation:
+            self._mask, complete = self._masks.compile(self.names)
+            # A required permission that does not exist can never be held
+            self._satisfiable = complete or not self.match_all
+            self._generation = self._masks.generation
+        return self._mask
+
+    def test(self, granted: int) -> bool:
+        mask = self.mask()
+        if self.match_all:
+            return self._satisfiable and granted & mask == mask
+        return granted & mask != 0
+
+    def allows(self, role_id: Optional[int]) -> bool:
+        return self.test(self._masks.role_mask(role_id))
 
 class RBACService:
     @staticmethod
-    async def get_all_roles() -> List[Role]:
+    @read_only
+    async def get_all_roles() -> List[RoleRecord]:
         """Get all roles with their permissions"""
         with get_db() as db:
             # Get roles
-            cursor = db.execute('''
-                SELECT r.*, COUNT(u.id) as user_count
+            cursor = db.execute(f'''
+                SELECT {ROLE_PROJECTION}, IFNULL(c.value, 0) as user_count
                 FROM roles r
-                LEFT JOIN users u ON r.id = u.role_id
-                GROUP BY r.id
+                LEFT JOIN counters c ON c.name = '{ROLE_USERS}' || r.id
+                ORDER BY r.id
             ''')
-            roles = cursor.fetchall()
-            
-            result = []
-            for role in roles:
-                # Get permissions for each role
-                cursor = db.execute('''
-                    SELECT p.*
-                    FROM permissions p
-                    JOIN role_permissions rp ON p.id = rp.permission_id
-                    WHERE rp.role_id = ?
-                ''', (role['id'],))
-                permissions = cursor.fetchall()
-                
-                result.append({
-                    "id": role['id'],
-                    "name": role['name'],
-                    "description": role['description'],
-                    "created_at": role['created_at'],
-                    "user_count": role['user_count'],
-                    "permissions": [
-                        {
-                            "id": perm['id'],
-                            "name": perm['name'],
-                            "description": perm['description'],
-                            "category": perm['category']
-                        }
-                        for perm in permissions
-                    ]
-                })
-            
-            return result
+            roles = {}
+            for row in cursor:
+                role = role_mapper(row)
+                role.user_count = row[-1]
+                role.permissions = []
+                roles[role.id] = role
+
+            # Get permissions for all roles in one pass
+            cursor = db.execute(f'''
+                SELECT {PERMISSION_PROJECTION}, rp.role_id
+                FROM permissions p
+                JOIN role_permissions rp ON p.id = rp.permission_id
+            ''')
+            for row in cursor:
+                role = roles.get(row[-1])
+                if role is not None:
+                    role.permissions.append(permission_mapper(row))
+
+            return list(roles.values())
 
     @staticmethod
-    async def get_all_permissions() -> List[Permission]:
+    @read_only
+    async def get_all_permissions() -> List[PermissionRecord]:
         """Get all available permissions"""
         with get_db() as db:
-            cursor = db.execute('SELECT * FROM permissions ORDER BY category, name')
-            permissions = cursor.fetchall()
-            return [
-                {
-                    "id": perm['id'],
-                    "name": perm['name'],
-                    "description": perm['description'],
-                    "category": perm['category']
-                }
-                for perm in permissions
-            ]
+            cursor = db.execute(f'''
+                SELECT {PERMISSION_PROJECTION}
+                FROM permissions p
+                ORDER BY p.category, p.name
+            ''')
+            return permission_mapper.all(cursor.fetchall())
 
     @staticmethod
+    @read_only
     async def get_user_role(user_id: int) -> str:
+        cached = _user_access.get(("role", user_id))
+        if cached is not None:
+            return cached
         with get_db() as db:
             cursor = db.execute('''
                 SELECT r.name 
@@ -73,36 +205,55 @@ class RBACService:
                 WHERE u.id = ?
             ''', (user_id,))
             result = cursor.fetchone()
-            return result[0] if result else None
+            role = result[0] if result else None
+        if role is not None:
+            _user_access.put(("role", user_id), role, user_id)
+        return role
 
     @staticmethod
+    @read_only
     async def get_user_permissions(user_id: int) -> List[str]:
+        cached = _user_access.get(("permissions", user_id))
+        if cached is not None:
+            return list(cached)
         with get_db() as db:
             cursor = db.execute('''
-                SELECT DISTINCT p.name 
+                SELECT p.name
                 FROM permissions p
-                JOIN role_permissions rp ON p.id = rp.permission_id
+                JOIN role_effective_permissions rp ON p.id = rp.permission_id
                 JOIN users u ON u.role_id = rp.role_id
                 WHERE u.id = ?
             ''', (user_id,))
-            return [row[0] for row in cursor.fetchall()]
+            permissions = [row[0] for row in cursor.fetchall()]
+        _user_access.put(("permissions", user_id), frozenset(permissions), user_id)
+        return permissions
 
     @staticmethod
     async def create_role(role_data: RoleCreate) -> Role:
-        with get_db() as db:
-            cursor = db.execute(
-                "INSERT INTO roles (name, description) VALUES (?, ?)",
-                (role_data.name, role_data.description)
-            )
-            db.commit()
-            return await RBACService.get_role(cursor.lastrowid)
+        def insert(db):
+            try:
+                cursor = db.execute(
+                    f"INSERT INTO roles (name, description, parent_id) VALUES (?, ?, ?) RETURNING {ROLE_RETURNING}",
+                    (role_data.name, role_data.description, role_data.parent_id)
+                )
+            except sqlite3.IntegrityError as exc:
+                raise hierarchy_error(exc) or exc
+            role = role_mapper(cursor.fetchone())
+            role.permissions = []
+            return role
+
+        return await write(insert)
 
     @staticmethod
-    async def get_role(role_id: int) -> Role:
+    @read_only
+    async def get_role(role_id: int) -> RoleRecord:
         """Get a single role by ID"""
         with get_db() as db:
-            cursor = db.execute('SELECT * FROM roles WHERE id = ?', (role_id,))
-            role = cursor.fetchone()
+            cursor = db.execute(
+                f'SELECT {ROLE_PROJECTION} FROM roles r WHERE r.id = ?',
+                (role_id,)
+            )
+            role = role_mapper.one(cursor.fetchone())
             
             if not role:
                 raise HTTPException(
@@ -110,30 +261,8 @@ class RBACService:
                     detail="Role not found"
                 )
             
-            # Get permissions for the role
-            cursor = db.execute('''
-                SELECT p.*
-                FROM permissions p
-                JOIN role_permissions rp ON p.id = rp.permission_id
-                WHERE rp.role_id = ?
-            ''', (role_id,))
-            permissions = cursor.fetchall()
-            
-            return {
-                "id": role['id'],
-                "name": role['name'],
-                "description": role['description'],
-                "created_at": role['created_at'],
-                "permissions": [
-                    {
-                        "id": perm['id'],
-                        "name": perm['name'],
-                        "description": perm['description'],
-                        "category": perm['category']
-                    }
-                    for perm in permissions
-                ]
-            }
+            role.permissions = _role_permissions(db, role_id)
+            return role
 
     @staticmethod
     async def update_role(role_id: int, role_data: RoleUpdate) -> Role:
@@ -145,6 +274,9 @@ class RBACService:
         if role_data.description is not None:
             updates.append("description = ?")
             values.append(role_data.description)
+        if "parent_id" in role_data.model_fields_set:
+            updates.append("parent_id = ?")
+            values.append(role_data.parent_id)
         
         if not updates:
             raise HTTPException(
@@ -152,39 +284,77 @@ class RBACService:
                 detail="No fields to update"
             )
 
-        with get_db() as db:
-            values.append(role_id)
-            db.execute(
-                f"UPDATE roles SET {', '.join(updates)} WHERE id = ?",
-                values
-            )
-            db.commit()
-            return await RBACService.get_role(role_id)
+        values.append(role_id)
+
+        def update(db):
+            try:
+                cursor = db.execute(
+                    f"UPDATE roles SET {', '.join(updates)} WHERE id = ? RETURNING {ROLE_RETURNING}",
+                    values
+                )
+                row = cursor.fetchone()
+            except sqlite3.IntegrityError as exc:
+                raise hierarchy_error(exc) or exc
+            if row is None:
+                raise HTTPException(
+                    status_code=status.HTTP_404_NOT_FOUND,
+                    detail="Role not found"
+                )
+            role = role_mapper(row)
+            role.permissions = _role_permissions(db, role_id)
+            return role
+
+        return await write(update)
 
     @staticmethod
     async def assign_role_to_user(user_id: int, role_id: int):
+        await write(lambda db: db.execute(
+            "UPDATE users SET role_id = ? WHERE id = ?",
+            (role_id, user_id)
+        ))
+
+    @staticmethod
+    @read_only
+    async def get_user_role_id(user_id: int) -> Optional[int]:
+        cached = _user_access.get(("role_id", user_id))
+        if cached is not None:
+            return cached
         with get_db() as db:
-            db.execute(
-                "UPDATE users SET role_id = ? WHERE id = ?",
-                (role_id, user_id)
-            )
-            db.commit()
+            row = db.execute("SELECT role_id FROM users WHERE id = ?", (user_id,)).fetchone()
+        role_id = row[0] if row else None
+        if role_id is not None:
+            _user_access.put(("role_id", user_id), role_id, user_id)
+        return role_id
+
+    @staticmethod
+    def get_permission_mask(role_id: Optional[int]) -> int:
+        """Bitset of the permissions granted to ``role_id``"""
+        return permission_masks.role_mask(role_id)
 
     @staticmethod
     async def check_permission(user_id: int, required_permission: str) -> bool:
-        permissions = await RBACService.get_user_permissions(user_id)
-        return required_permission in permissions
+        role_id = await RBACService.get_user_role_id(user_id)
+        mask, known = permission_masks.compile((required_permission,))
+        return known and RBACService.get_permission_mask(role_id) & mask == mask
     
     @staticmethod
+    @read_only
     async def get_roles_count():
         with get_db() as db:
-            cursor = db.execute("SELECT COUNT(*) as count FROM roles")
-            result = cursor.fetchone()
-            return result['count']
+            return read_counter(db, ROLES)
 
     @staticmethod
+    @read_only
     async def get_users_count():
         with get_db() as db:
-            cursor = db.execute("SELECT COUNT(*) as count FROM users")
-            result = cursor.fetchone()
-            return result['count']
\ No newline at end of file
+            return read_counter(db, USERS)
+
+def _role_permissions(db, role_id: int) -> List[PermissionRecord]:
+    """Permissions assigned directly to a role"""
+    cursor = db.execute(f'''
+        SELECT {PERMISSION_PROJECTION}
+        FROM permissions p
+        JOIN role_permissions rp ON p.id = rp.permission_id
+        WHERE rp.role_id = ?
+    ''', (role_id,))
+    return permission_mapper.all(cursor.fetchall())
@@ -0,0 +1,157 @@
+import heapq
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+from app.config import settings
+from app.db.changes import change_feed
+from app.db.database import Change, get_read_db, write, write_together
+
+TOKEN = "token"
+USER = "user"
+
+class DenyList:
+    """In-memory deny list for access tokens, persisted to SQLite.
+
+    Two kinds of entries are kept: revoked token IDs (``jti``) and per-user
+    cutoffs that revoke every token issued before a point in time. Lookups are
+    plain dict hits. Each entry also sits in an expiry heap and is dropped once
+    the tokens it covers would have expired anyway, so memory stays bounded by
+    the number of revocations within one token lifetime.
+    """
+
+    def __init__(self):
+        self._tokens: Dict[str, float] = {}
+        self._users: Dict[int, Tuple[float, float]] = {}
+        self._heap: List[Tuple[float, str, object]] = []
+        self._lock = threading.Lock()
+
+    @property
+    def token_lifetime(self) -> float:
+        return settings.ACCESS_TOKEN_EXPIRE_MINUTES * 60
+
+    async def purge_expired(self):
+        now = time.time()
+
+        def delete(db):
+            db.execute("DELETE FROM revoked_tokens WHERE expires_at <= ?", (now,))
+            db.execute("DELETE FROM revoked_user_tokens WHERE expires_at <= ?", (now,))
+
+        await write(delete)
+
+    def load(self):
+        """Rebuild the in-memory structures from the tables."""
+        with get_read_db() as db:
+            tokens = db.execute("SELECT jti, expires_at FROM revoked_tokens").fetchall()
+            users = db.execute(
+                "SELECT user_id, revoked_before, expires_at FROM revoked_user_tokens"
+            ).fetchall()
+
+        with self._lock:
+            self._tokens.clear()
+            self._users.clear()
+            self._heap = []
+            for jti, expires_at in tokens:
+                self._add(TOKEN, jti, expires_at)
+            for user_id, revoked_before, expires_at in users:
+                self._add(USER, user_id, expires_at, revoked_before)
+
+    async def revoke_token(self, jti: str, user_id: int, expires_at: float):
+        """Revoke a single access token until its own expiry."""
+        change = self.token_revocation(jti, user_id, expires_at)
+        if change is not None:
+            await write_together([change])
+
+    async def revoke_user(self, user_id: int):
+        """Revoke every access token issued to ``user_id`` so far."""
+        await write_together([self.user_revocation(user_id)])
+
+    def token_revocation(self, jti: str, user_id: int, expires_at: float) -> Optional[Change]:
+        """The change behind ``revoke_token``; ``None`` if the token has expired."""
+        if expires_at <= time.time():
+            return None
+
+        def apply():
+            with self._lock:
+                self._add(TOKEN, jti, expires_at)
+
+        return (lambda db: db.execute("""
+            INSERT OR REPLACE INTO revoked_tokens (jti, user_id, expires_at)
+            VALUES (?, ?, ?)
+        """, (jti, user_id, expires_at))), apply
+
+    def user_revocation(self, user_id: int) -> Change:
+        """The change behind ``revoke_user``."""
+        revoked_before = time.time()
+        expires_at = revoked_before + self.token_lifetime
+
+        def apply():
+            with self._lock:
+                self._add(USER, user_id, expires_at, revoked_before)
+
+        return (lambda db: db.execute("""
+            INSERT OR REPLACE INTO revoked_user_tokens (user_id, revoked_before, expires_at)
+            VALUES (?, ?, ?)
+        """, (user_id, revoked_before, expires_at))), apply
+
+    def is_token_revoked(self, jti: Optional[str]) -> bool:
+        self._expire()
+        return jti is not None and jti in self._tokens
+
+    def is_user_revoked(self, user_id: int, issued_at: Optional[float]) -> bool:
+        self._expire()
+        entry = self._users.get(user_id)
+        if entry is None:
+            return False
+        return issued_at is None or issued_at < entry[0]
+
+    def on_change(self, entity: str, entity_id: Optional[str]):
+        """Pick up a revocation written by another worker."""
+        if entity_id is None:
+            self.load()
+            return
+        with get_read_db() as db:
+            if entity == "revoked_tokens":
+                row = db.execute(
+                    "SELECT jti, expires_at FROM revoked_tokens WHERE jti = ?",
+                    (entity_id,)
+                ).fetchone()
+            else:
+                row = db.execute(
+                    "SELECT revoked_before, expires_at FROM revoked_user_tokens WHERE user_id = ?",
+                    (int(entity_id),)
+                ).fetchone()
+        if row is None:
+            return
+        with self._lock:
+            if entity == "revoked_tokens":
+                self._add(TOKEN, row[0], row[1])
+            else:
+                self._add(USER, int(entity_id), row[1], row[0])
+
+    def __len__(self):
+        return len(self._tokens) + len(self._users)
+
+    def _add(self, kind: str, key, expires_at: float, revoked_before: float = None):
+        if kind == TOKEN:
+            self._tokens[key] = expires_at
+        else:
+            self._users[key] = (revoked_before, expires_at)
+        heapq.heappush(self._heap, (expires_at, kind, key))
+
+    def _expire(self):
+        heap = self._heap
+        now = time.time()
+        if not heap or heap[0][0] > now:
+            return
+        with self._lock:
+            while heap and heap[0][0] <= now:
+                expires_at, kind, key = heapq.heappop(heap)
+                # A later revocation may have replaced this entry
+                if kind == TOKEN:
+                    if self._tokens.get(key) == expires_at:
+                        del self._tokens[key]
+                elif key in self._users and self._users[key][1] == expires_at:
+                    del self._users[key]
+
+deny_list = DenyList()
+change_feed.subscribe(("revoked_tokens", "revoked_user_tokens"), deny_list.on_change)
@@ -0,0 +1,203 @@
+import hashlib
+import secrets
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Dict, Optional, Tuple
+from fastapi import HTTPException, status
+from app.config import settings
+from app.db.changes import change_feed
+from app.db.database import Change, get_read_db, write, write_together
+
+class Session:
+    """In-memory view of one refresh token row."""
+    __slots__ = ("family_id", "user_id", "username", "expires_at", "used")
+
+    def __init__(self, family_id: str, user_id: int, username: str,
+                 expires_at: float, used: bool = False):
+        self.family_id = family_id
+        self.user_id = user_id
+        self.username = username
+        self.expires_at = expires_at
+        self.used = used
+
+def hash_token(token: str) -> str:
+    return hashlib.sha256(token.encode()).hexdigest()
+
+class SessionStore:
+    """Refresh token sessions backed by the ``refresh_tokens`` table.
+
+    Tokens are opaque random strings; only their SHA-256 is stored. Every
+    refresh rotates the token within its family, and presenting a token that
+    was already rotated revokes the whole family (reuse detection).
+
+    The in-memory index is write-through and lets known-bad tokens fail
+    without touching the database. The conditional ``UPDATE`` in ``rotate``
+    stays the authority, so several workers can share one database.
+    """
+
+    def __init__(self, max_entries: int = 100_000):
+        self._index: Dict[str, Session] = {}
+        self._lock = threading.Lock()
+        self._max_entries = max_entries
+
+    @property
+    def ttl(self) -> timedelta:
+        return timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS)
+
+    async def issue(self, user_id: int, username: str) -> str:
+        """Create a refresh token starting a new session family."""
+        token, token_hash, family_id, row = self._new_token(user_id)
+        await write(lambda db: self._insert(db, row))
+        self._remember(token_hash, Session(family_id, user_id, username, row[3]))
+        return token
+
+    async def rotate(self, token: str) -> Tuple[Session, str]:
+        """Consume ``token`` and return its session plus the replacement token."""
+        token_hash = hash_token(token)
+        session = self._index.get(token_hash) or self._load(token_hash)
+
+        if session is None or session.expires_at <= time.time():
+            raise self._invalid()
+        if session.used:
+            await self.revoke_family(session.family_id)
+            raise self._invalid()
+
+        new_token, new_hash, _, row = self._new_token(session.user_id, session.family_id)
+        revoke_family, forget_family = self.family_revocation(session.family_id)
+
+        def consume(db):
+            cursor = db.execute("""
+                UPDATE refresh_tokens SET used_at = ?
+                WHERE token_hash = ? AND used_at IS NULL AND revoked = 0
+            """, (datetime.utcnow(), token_hash))
+            if cursor.rowcount != 1:
+                # Rotated or revoked elsewhere: treat as reuse, in the same job
+                revoke_family(db)
+                return False
+            self._insert(db, row)
+            return True
+
+        consumed = await write(consume)
+        session.used = True
+        if not consumed:
+            forget_family()
+            raise self._invalid()
+
+        self._remember(new_hash, Session(
+            session.family_id, session.user_id, session.username, row[3]
+        ))
+        return session, new_token
+
+    async def revoke(self, token: str):
+        """Revoke the family that ``token`` belongs to."""
+        change = self.token_revocation(token)
+        if change is not None:
+            await write_together([change])
+
+    async def revoke_family(self, family_id: str):
+        await write_together([self.family_revocation(family_id)])
+
+    async def revoke_user(self, user_id: int):
+        await write_together([self.user_revocation(user_id)])
+
+    def token_revocation(self, token: str) -> Optional[Change]:
+        """The change behind ``revoke``; ``None`` for unknown tokens."""
+        token_hash = hash_token(token)
+        session = self._index.get(token_hash) or self._load(token_hash)
+        if session is None:
+            return None
+        return self.family_revocation(session.family_id)
+
+    def family_revocation(self, family_id: str) -> Change:
+        return (lambda db: db.execute(
+            "UPDATE refresh_tokens SET revoked = 1 WHERE family_id = ?",
+            (family_id,)
+        )), self._forget(lambda session: session.family_id == family_id)
+
+    def user_revocation(self, user_id: int) -> Change:
+        return (lambda db: db.execute(
+            "UPDATE refresh_tokens SET revoked = 1 WHERE user_id = ?",
+            (user_id,)
+        )), self._forget(lambda session: session.user_id == user_id)
+
+    async def purge_expired(self):
+        now = time.time()
+        with self._lock:
+            expired = [h for h, s in self._index.items() if s.expires_at <= now]
+            for token_hash in expired:
+                del self._index[token_hash]
+        await write(lambda db: db.execute(
+            "DELETE FROM refresh_tokens WHERE expires_at <= ?",
+            (datetime.utcnow(),)
+        ))
+
+    def _forget(self, matches: Callable[[Session], bool]) -> Callable[[], None]:
+        """Mark the sessions that ``matches`` accepts as used."""
+        def apply():
+            with self._lock:
+                for session in self._index.values():
+                    if matches(session):
+                        session.used = True
+        return apply
+
+    def _new_token(self, user_id: int, family_id: Optional[str] = None):
+        token = secrets.token_urlsafe(32)
+        token_hash = hash_token(token)
+        family_id = family_id or secrets.token_hex(16)
+        expires_at = time.time() + self.ttl.total_seconds()
+        row = (token_hash, family_id, user_id, expires_at)
+        return token, token_hash, family_id, row
+
+    @staticmethod
+    def _insert(db, row):
+        token_hash, family_id, user_id, expires_at = row
+        db.execute("""
+            INSERT INTO refresh_tokens (token_hash, family_id, user_id, expires_at)
+            VALUES (?, ?, ?, ?)
+        """, (token_hash, family_id, user_id, datetime.utcfromtimestamp(expires_at)))
+
+    def on_change(self, entity: str, entity_id: Optional[str]):
+        """Forget a session another worker rotated or revoked."""
+        with self._lock:
+            if entity_id is None:
+                self._index.clear()
+            else:
+                self._index.pop(entity_id, None)
+
+    def _load(self, token_hash: str) -> Optional[Session]:
+        with get_read_db() as db:
+            cursor = db.execute("""
+                SELECT rt.family_id, rt.user_id, u.username, rt.expires_at,
+                       rt.used_at IS NOT NULL OR rt.revoked AS used
+                FROM refresh_tokens rt
+                JOIN users u ON u.id = rt.user_id
+                WHERE rt.token_hash = ?
+            """, (token_hash,))
+            row = cursor.fetchone()
+        if row is None:
+            return None
+        expires_at = datetime.fromisoformat(row["expires_at"]).replace(tzinfo=timezone.utc).timestamp()
+        session = Session(row["family_id"], row["user_id"], row["username"],
+                          expires_at, bool(row["used"]))
+        self._remember(token_hash, session)
+        return session
+
+    def _remember(self, token_hash: str, session: Session):
+        with self._lock:
+            if len(self._index) >= self._max_entries:
+                # Drop the oldest half; evicted entries reload from the table
+                for key in list(self._index)[: self._max_entries // 2]:
+                    del self._index[key]
+            self._index[token_hash] = session
+
+    @staticmethod
+    def _invalid() -> HTTPException:
+        return HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid refresh token",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+
+session_store = SessionStore()
+change_feed.subscribe(("refresh_tokens",), session_store.on_change)
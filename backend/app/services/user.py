@@ -1,83 +1,72 @@
-from typing import List, Optional
+import json
+import sqlite3
+from datetime import datetime
+from typing import Optional, Sequence, Tuple
 from fastapi import HTTPException, status
-from app.db.database import get_db
+from app.db.changes import EntityCache, change_feed
+from app.db.counters import USERS, read_counter
+from app.db.database import get_db, read_only, release_session, write
+from app.db.records import (
+    USER_FROM, USER_PROJECTION, USER_RETURNING, UserRecord, user_fields, user_mapper,
+)
 from app.models.user import UserCreate, UserUpdate, User
+from app.services.activity import activity_tracker, stored_timestamp
+from app.services.availability import duplicate_error, identity_filter
 from app.utils.security import get_password_hash
 
+# Users by username for token resolution; role changes alter role_name
+_users_by_username = EntityCache(change_feed, "users", ("roles",))
+
 class UserService:
     @staticmethod
-    async def get_users(page: int = 1, page_size: int = 10) -> List[dict]:
+    @read_only
+    async def get_users(page: int = 1, page_size: int = 10,
+                        fields: Optional[Tuple[str, ...]] = None,
+                        inactive_since: Optional[datetime] = None) -> Sequence[UserRecord]:
+        """Users by id; with ``inactive_since``, only those not seen since then."""
         offset = (page - 1) * page_size
+        projection, mapper = user_fields(fields) if fields else (USER_PROJECTION, user_mapper)
+        where, params = _inactive_filter(inactive_since)
         with get_db() as db:
-            cursor = db.execute("""
-                SELECT 
-                    u.id,
-                    u.username,
-                    u.email,
-                    u.role_id,
-                    u.is_active,
-                    u.created_at,
-                    r.name as role_name
-                FROM users u
-                LEFT JOIN roles r ON u.role_id = r.id
+            cursor = db.execute(f"""
+                SELECT {projection}
+                {USER_FROM}
+                {where}
                 ORDER BY u.id
                 LIMIT ? OFFSET ?
-            """, (page_size, offset))
-            
-            users = cursor.fetchall()
-            # Convert SQLite Row objects to proper dictionaries
-            return [
-                {
-                    "id": user["id"],
-                    "username": user["username"],
-                    "email": user["email"],
-                    "role_id": user["role_id"],
-                    "is_active": bool(user["is_active"]),  # Convert to boolean
-                    "created_at": user["created_at"],
-                    "role_name": user["role_name"]
-                }
-                for user in users
-            ]
+            """, (*params, page_size, offset))
+            return mapper.lazy(cursor.fetchall())
         
     @staticmethod
     async def create_user(user_data: UserCreate) -> User:
-        with get_db() as db:
-            # Check if username exists
-            cursor = db.execute(
-                "SELECT id FROM users WHERE username = ?",
-                (user_data.username,)
-            )
-            if cursor.fetchone():
-                raise HTTPException(
-                    status_code=status.HTTP_400_BAD_REQUEST,
-                    detail="Username already registered"
-                )
-            
-            # Check if email exists
-            cursor = db.execute(
-                "SELECT id FROM users WHERE email = ?",
-                (user_data.email,)
-            )
-            if cursor.fetchone():
-                raise HTTPException(
-                    status_code=status.HTTP_400_BAD_REQUEST,
-                    detail="Email already registered"
-                )
-            
-            # Create user
-            cursor = db.execute("""
-                INSERT INTO users (username, email, hashed_password, role_id, is_active)
-                VALUES (?, ?, ?, ?, ?)
-            """, (
-                user_data.username,
-                user_data.email,
-                get_password_hash(user_data.password),
-                user_data.role_id,
-                user_data.is_active
-            ))
-            db.commit()
-            
-            return await UserService.get_user(cursor.lastrowid)
+        # Fail fast on taken names before paying for the hash
+        await identity_filter.ensure_available(user_data.username, user_data.email)
+
+        # Hash before queueing so bcrypt never runs on the writer thread
+        release_session()
+        hashed_password = get_password_hash(user_data.password)
+
+        def insert(db):
+            # The UNIQUE constraints settle races with concurrent inserts
+            try:
+                cursor = db.execute(f"""
+                    INSERT INTO users (username, email, hashed_password, role_id, is_active)
+                    VALUES (?, ?, ?, ?, ?)
+                    RETURNING {USER_RETURNING}
+                """, (
+                    user_data.username,
+                    user_data.email,
+                    hashed_password,
+                    user_data.role_id,
+                    user_data.is_active
+                ))
+                return user_mapper(cursor.fetchone())
+            except sqlite3.IntegrityError as exc:
+                raise duplicate_error(exc) or exc
+
+        user = await write(insert)
+        identity_filter.add(user.username, user.email)
+        return user
         
     @staticmethod
     async def update_user(user_id: int, user_data: UserUpdate) -> User:
@@ -89,6 +78,7 @@ class UserService:
             values.append(user_data.email)
         
         if user_data.password is not None:
+            release_session()
             updates.append("hashed_password = ?")
             values.append(get_password_hash(user_data.password))
         
@@ -106,120 +96,102 @@ class UserService:
                 detail="No fields to update"
             )
 
-        with get_db() as db:
-            # Check if user exists
-            cursor = db.execute(
-                "SELECT id FROM users WHERE id = ?",
-                (user_id,)
-            )
-            if not cursor.fetchone():
+        values.append(user_id)
+
+        def update(db):
+            try:
+                cursor = db.execute(
+                    f"UPDATE users SET {', '.join(updates)} WHERE id = ? RETURNING {USER_RETURNING}",
+                    values
+                )
+                row = cursor.fetchone()
+            except sqlite3.IntegrityError as exc:
+                raise duplicate_error(exc) or exc
+            if row is None:
                 raise HTTPException(
                     status_code=status.HTTP_404_NOT_FOUND,
                     detail="User not found"
                 )
-            
-            values.append(user_id)
-            db.execute(
-                f"UPDATE users SET {', '.join(updates)} WHERE id = ?",
-                values
-            )
-            db.commit()
-            
-            return await UserService.get_user(user_id)
+            return user_mapper(row)
+
+        return await write(update)
         
     @staticmethod
     async def delete_user(user_id: int):
-        with get_db() as db:
-            cursor = db.execute(
-                "SELECT id FROM users WHERE id = ?",
-                (user_id,)
-            )
-            if not cursor.fetchone():
+        def delete(db):
+            cursor = db.execute("DELETE FROM users WHERE id = ?", (user_id,))
+            if cursor.rowcount == 0:
                 raise HTTPException(
                     status_code=status.HTTP_404_NOT_FOUND,
                     detail="User not found"
                 )
-            
-            db.execute("DELETE FROM users WHERE id = ?", (user_id,))
-            db.commit()
+
+        await write(delete)
 
     @staticmethod
-    async def get_user(user_id: int) -> Optional[dict]:
+    @read_only
+    async def get_user(user_id: int) -> Optional[UserRecord]:
         with get_db() as db:
-            cursor = db.execute("""
-                SELECT 
-                    u.id,
-                    u.username,
-                    u.email,
-                    u.role_id,
-                    u.is_active,
-                    u.created_at,
-                    r.name as role_name
-                FROM users u
-                LEFT JOIN roles r ON u.role_id = r.id
+            cursor = db.execute(f"""
+                SELECT {USER_PROJECTION}
+                {USER_FROM}
                 WHERE u.id = ?
             """, (user_id,))
+            return user_mapper.one(cursor.fetchone())
             
-            user = cursor.fetchone()
-            if not user:
-                return None
-                
-            return {
-                "id": user["id"],
-                "username": user["username"],
-                "email": user["email"],
-                "role_id": user["role_id"],
-                "is_active": bool(user["is_active"]),
-                "created_at": user["created_at"],
-                "role_name": user["role_name"]
-            }
-            
     @staticmethod
+    @read_only
+    async def get_user_by_username(username: str) -> Optional[UserRecord]:
+        user = _users_by_username.get(username)
+        if user is not None:
+            return user
+        with get_db() as db:
+            cursor = db.execute(f"""
+                SELECT {USER_PROJECTION}
+                {USER_FROM}
+                WHERE u.username = ?
+            """, (username,))
+            user = user_mapper.one(cursor.fetchone())
+        if user is not None:
+            _users_by_username.put(username, user, user.id)
+        return user
+
+    @staticmethod
+    @read_only
     async def get_total_users():
         with get_db() as db:
-            cursor = db.execute("SELECT COUNT(*) as count FROM users")
-            result = cursor.fetchone()
-            return result["count"]
+            return read_counter(db, USERS)
+
+    @staticmethod
+    @read_only
+    async def get_inactive_total(inactive_since: datetime) -> int:
+        where, params = _inactive_filter(inactive_since)
+        with get_db() as db:
+            cursor = db.execute(f"SELECT COUNT(*) FROM users u {where}", params)
+            return cursor.fetchone()[0]
 
     @staticmethod
-    async def search_users(query: str, page: int = 1, page_size: int = 10) -> List[dict]:
+    @read_only
+    async def search_users(query: str, page: int = 1, page_size: int = 10,
+                           fields: Optional[Tuple[str, ...]] = None) -> Sequence[UserRecord]:
         offset = (page - 1) * page_size
         search_term = f"%{query}%"
+        projection, mapper = user_fields(fields) if fields else (USER_PROJECTION, user_mapper)
         
         with get_db() as db:
-            cursor = db.execute("""
-                SELECT 
-                    u.id,
-                    u.username,
-                    u.email,
-                    u.role_id,
-                    u.is_active,
-                    u.created_at,
-                    r.name as role_name
-                FROM users u
-                LEFT JOIN roles r ON u.role_id = r.id
+            cursor = db.execute(f"""
+                SELECT {projection}
+                {USER_FROM}
                 WHERE u.username LIKE ? 
                    OR u.email LIKE ? 
                    OR r.name LIKE ?
                 ORDER BY u.username
                 LIMIT ? OFFSET ?
             """, (search_term, search_term, search_term, page_size, offset))
-            
-            users = cursor.fetchall()
-            return [
-                {
-                    "id": user["id"],
-                    "username": user["username"],
-                    "email": user["email"],
-                    "role_id": user["role_id"],
-                    "is_active": bool(user["is_active"]),
-                    "created_at": user["created_at"],
-                    "role_name": user["role_name"]
-                }
-                for user in users
-            ]
+            return mapper.lazy(cursor.fetchall())
 
     @staticmethod
+    @read_only
     async def get_search_total(query: str) -> int:
         search_term = f"%{query}%"
         with get_db() as db:
@@ -232,4 +204,17 @@ class UserService:
                    OR r.name LIKE ?
             """, (search_term, search_term, search_term))
             result = cursor.fetchone()
-            return result["count"]
\ No newline at end of file
+            return result["count"]
+
+def _inactive_filter(inactive_since: Optional[datetime]) -> Tuple[str, tuple]:
+    if inactive_since is None:
+        return "", ()
+    # Sightings this worker has not flushed yet still count; one JSON array
+    # keeps the statement text fixed however many there are
+    return """
+        WHERE (u.last_seen IS NULL OR u.last_seen < ?)
+          AND u.id NOT IN (SELECT value FROM json_each(?))
+    """, (
+        stored_timestamp(inactive_since),
+        json.dumps(activity_tracker.seen_since(inactive_since)),
+    )
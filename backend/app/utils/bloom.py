@@ -0,0 +1,40 @@
+import hashlib
+import math
+
+class BloomFilter:
+    """Fixed-size Bloom filter over strings.
+
+    Sized for ``capacity`` entries at ``error_rate`` false positives. Bit
+    positions come from one 128-bit BLAKE2b digest split into two halves and
+    combined by double hashing. Entries cannot be removed; callers rebuild
+    the filter instead.
+    """
+
+    def __init__(self, capacity: int, error_rate: float = 0.01):
+        capacity = max(1, capacity)
+        self.capacity = capacity
+        self._size = max(8, math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self._hashes = max(1, round(self._size / capacity * math.log(2)))
+        self._bits = bytearray((self._size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, value: str):
+        digest = hashlib.blake2b(value.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        size = self._size
+        return [(h1 + i * h2) % size for i in range(self._hashes)]
+
+    def add(self, value: str):
+        bits = self._bits
+        for position in self._positions(value):
+            bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, value: str) -> bool:
+        bits = self._bits
+        return all(bits[position >> 3] & (1 << (position & 7)) for position in self._positions(value))
+
+    @property
+    def size_bytes(self) -> int:
+        return len(self._bits)
@@ -1,20 +1,31 @@
+import secrets
+import time
 from datetime import datetime, timedelta
+from functools import lru_cache
 from typing import Optional
-from jose import JWTError, jwt
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, HTTPException, Request, status
 from fastapi.security import OAuth2PasswordBearer
-from passlib.context import CryptContext
 from app.config import settings
 from app.models.user import TokenData, User
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# jose and passlib (with its crypto backends) are imported on first use so that
+# importing the app, and starting a worker, does not pay for them up front.
+
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
 
+# Request state key holding a (token, user) pair resolved ahead of the route
+CURRENT_USER_STATE = "current_user"
+
+@lru_cache(maxsize=None)
+def _pwd_context():
+    from passlib.context import CryptContext
+    return CryptContext(schemes=["bcrypt"], deprecated="auto")
+
 def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return pwd_context.verify(plain_password, hashed_password)
+    return _pwd_context().verify(plain_password, hashed_password)
 
 def get_password_hash(password: str) -> str:
-    return pwd_context.hash(password)
+    return _pwd_context().hash(password)
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
     to_encode = data.copy()
@@ -23,63 +34,74 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
     else:
         expire = datetime.utcnow() + timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
     
-    to_encode.update({"exp": expire})
+    to_encode.update({
+        "exp": expire,
+        "iat": time.time(),
+        "jti": secrets.token_hex(16)
+    })
+    from jose import jwt
+    if settings.ALGORITHM.startswith("HS"):
+        return jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
+
+    from app.services.keyring import key_ring
+    key = key_ring.current()
     encoded_jwt = jwt.encode(
         to_encode,
-        settings.SECRET_KEY,
-        algorithm=settings.ALGORITHM
+        key.signer,
+        algorithm=settings.ALGORITHM,
+        headers={"kid": key.kid}
     )
     return encoded_jwt
 
-def verify_token(token: str) -> Optional[TokenData]:
+def decode_token(token: str) -> Optional[dict]:
+    from jose import JWTError, jwt
     try:
-        payload = jwt.decode(
-            token,
-            settings.SECRET_KEY,
-            algorithms=[settings.ALGORITHM]
-        )
-        username: str = payload.get("sub")
-        if username is None:
-            return None
-        return TokenData(username=username)
+        if settings.ALGORITHM.startswith("HS"):
+            key = settings.SECRET_KEY
+        else:
+            # Pick the verification key by kid instead of trying each one
+            from app.services.keyring import key_ring
+            key = key_ring.verifier(jwt.get_unverified_header(token).get("kid"))
+            if key is None:
+                return None
+        return jwt.decode(token, key, algorithms=[settings.ALGORITHM])
     except JWTError:
         return None
 
-async def get_current_user(token: str = Depends(oauth2_scheme)) -> User:
-    from app.db.database import get_db
+def verify_token(token: str) -> Optional[TokenData]:
+    payload = decode_token(token)
+    if payload is None or payload.get("sub") is None:
+        return None
+    return TokenData(username=payload["sub"])
+
+async def get_current_user(request: Request, token: str = Depends(oauth2_scheme)) -> User:
+    # Sub-requests of a batch carry the caller resolved by the batch itself
+    resolved = request.scope.get("state", {}).get(CURRENT_USER_STATE)
+    if resolved is not None and resolved[0] == token:
+        return resolved[1]
+
+    from app.services.activity import activity_tracker
+    from app.services.revocation import deny_list
+    from app.services.user import UserService
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
     
-    try:
-        payload = jwt.decode(
-            token, 
-            settings.SECRET_KEY, 
-            algorithms=[settings.ALGORITHM]
-        )
-        username: str = payload.get("sub")
-        if username is None:
-            raise credentials_exception
-    except JWTError:
+    payload = decode_token(token)
+    if payload is None or payload.get("sub") is None:
         raise credentials_exception
-    
-    with get_db() as db:
-        cursor = db.execute("""
-            SELECT u.id, u.username, u.email, u.role_id, u.is_active
-            FROM users u
-            WHERE u.username = ?
-        """, (username,))
-        user = cursor.fetchone()
-        
-        if user is None:
-            raise credentials_exception
-            
-        return User(
-            id=user["id"],
-            username=user["username"],
-            email=user["email"],
-            role_id=user["role_id"],
-            is_active=user["is_active"]
-        )
\ No newline at end of file
+    username: str = payload["sub"]
+
+    # The cached lookup also syncs the change feed, so revocations made by
+    # other workers are visible to the checks below
+    user = await UserService.get_user_by_username(username)
+    if user is None:
+        raise credentials_exception
+    if deny_list.is_token_revoked(payload.get("jti")) or \
+            deny_list.is_user_revoked(user.id, payload.get("iat")):
+        raise credentials_exception
+
+    activity_tracker.seen(user.id)
+    return User.model_validate(user)
@@ -0,0 +1,22 @@
+import os
+import pytest
+from fastapi.testclient import TestClient
+from app.main import app
+from tests.helpers import bearer, login
+
+@pytest.fixture(scope="session")
+def client(tmp_path_factory):
+    """The app running on a fresh database in a scratch directory."""
+    previous = os.getcwd()
+    # DATABASE_URL and BACKUP_DIR are relative to the working directory
+    os.chdir(tmp_path_factory.mktemp("app"))
+    try:
+        with TestClient(app) as client:
+            yield client
+    finally:
+        os.chdir(previous)
+
+@pytest.fixture(scope="session")
+def admin(client) -> dict:
+    """Authorization headers of the seeded admin user."""
+    return bearer(login(client, "admin", "admin123"))
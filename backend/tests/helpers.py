@@ -0,0 +1,16 @@
+from fastapi.testclient import TestClient
+
+def login(client: TestClient, username: str, password: str) -> dict:
+    response = client.post("/api/token", data={"username": username, "password": password})
+    assert response.status_code == 200, response.text
+    return response.json()
+
+def bearer(tokens: dict) -> dict:
+    return {"Authorization": f"Bearer {tokens['access_token']}"}
+
+def register(client: TestClient, username: str, password: str = "pw123456") -> int:
+    response = client.post("/api/register", json={
+        "username": username, "email": f"{username}@example.com", "password": password
+    })
+    assert response.status_code == 200, response.text
+    return response.json()["id"]
@@ -0,0 +1,47 @@
+import sqlite3
+from datetime import datetime, timedelta, timezone
+import pytest
+from app.db.changes import TRACKED_COLUMNS, UNTRACKED_COLUMNS
+from app.db.database import create_schema, db_writer
+from tests.helpers import login, register
+
+@pytest.fixture
+def db(tmp_path):
+    db = sqlite3.connect(tmp_path / "app.db")
+    create_schema(db)
+    db.execute(
+        "INSERT INTO users (id, username, email, hashed_password) VALUES (1, 'u', 'u@x.com', '-')"
+    )
+    db.commit()
+    yield db
+    db.close()
+
+def _changes(db) -> int:
+    return db.execute("SELECT COUNT(*) FROM change_log WHERE entity = 'users'").fetchone()[0]
+
+def test_tracked_and_untracked_columns_cover_the_table(db):
+    columns = {row[1] for row in db.execute("PRAGMA table_info(users)")}
+    assert columns == {*TRACKED_COLUMNS["users"], *UNTRACKED_COLUMNS["users"]}
+
+def test_activity_only_updates_are_not_broadcast(db):
+    before = _changes(db)
+    db.execute("UPDATE users SET last_seen = CURRENT_TIMESTAMP, last_login = CURRENT_TIMESTAMP")
+    assert _changes(db) == before
+
+def test_updates_that_also_move_activity_are_broadcast(db):
+    before = _changes(db)
+    db.execute("UPDATE users SET last_seen = CURRENT_TIMESTAMP, is_active = 0")
+    assert _changes(db) == before + 1
+
+def test_inactive_filter_counts_unflushed_sightings_without_writing(client, admin):
+    register(client, "recently_seen")
+    login(client, "recently_seen", "pw123456")
+    since = (datetime.now(timezone.utc) - timedelta(minutes=1)).strftime("%Y-%m-%dT%H:%M:%S")
+
+    jobs = db_writer.metrics()["jobs"]
+    response = client.get("/api/users", headers=admin, params={
+        "inactive_since": since, "page_size": 100
+    })
+    assert response.status_code == 200
+    assert "recently_seen" not in [user["username"] for user in response.json()["users"]]
+    assert db_writer.metrics()["jobs"] == jobs
@@ -0,0 +1,60 @@
+import asyncio
+import re
+import pytest
+from app.middleware.admission import AdmissionController, RouteClass, Shed, admission
+
+@pytest.mark.parametrize("method, path, expected", [
+    ("GET", "/api/users", "interactive"),
+    ("POST", "/api/batch", "interactive"),
+    ("GET", "/api/audit/recent", "interactive"),
+    ("POST", "/api/token", "auth"),
+    ("PUT", "/api/users/1", "admin_write"),
+    ("POST", "/api/settings/backup", "export"),
+    ("GET", "/api/settings/backups/x", "export"),
+    ("GET", "/api/system/profile/cpu", "export"),
+])
+def test_routes_are_classified(method, path, expected):
+    assert admission.classify(method, path).name == expected
+
+def _controller() -> AdmissionController:
+    return AdmissionController(
+        classes=[
+            RouteClass("high", 0, limit=1, queue_timeout=1.0, retry_after=1),
+            RouteClass("low", 3, limit=1, queue_timeout=1.0, retry_after=5),
+        ],
+        rules=[(None, re.compile("/low"), "low")],
+        default="high", total_limit=1, max_queue=1,
+    )
+
+def test_full_queue_sheds_the_lowest_priority_waiter():
+    async def scenario():
+        controller = _controller()
+        high, low = controller.classes["high"], controller.classes["low"]
+        await controller.acquire(high)
+        queued_low = asyncio.ensure_future(controller.acquire(low))
+        await asyncio.sleep(0)
+        queued_high = asyncio.ensure_future(controller.acquire(high))
+        await asyncio.sleep(0)
+        with pytest.raises(Shed):
+            await queued_low
+        controller.release(high)
+        await queued_high
+        controller.release(high)
+        return low.stats["shed"]
+
+    assert asyncio.run(scenario()) == 1
+
+def test_newcomer_that_does_not_outrank_the_queue_is_shed():
+    async def scenario():
+        controller = _controller()
+        high = controller.classes["high"]
+        await controller.acquire(high)
+        queued = asyncio.ensure_future(controller.acquire(high))
+        await asyncio.sleep(0)
+        with pytest.raises(Shed):
+            await controller.acquire(controller.classes["low"])
+        controller.release(high)
+        await queued
+        controller.release(high)
+
+    asyncio.run(scenario())
@@ -0,0 +1,43 @@
+import sqlite3
+import pytest
+from app.services.session import session_store
+from tests.helpers import bearer, login, register
+
+def _authenticated(client, tokens) -> bool:
+    # verify-admin answers 403 for a valid non-admin token and 401 otherwise
+    return client.get("/api/verify-admin", headers=bearer(tokens)).status_code != 401
+
+def test_revoke_user_tokens_cuts_off_access_and_refresh(client, admin):
+    user_id = register(client, "revoke_all")
+    tokens = login(client, "revoke_all", "pw123456")
+
+    response = client.post(f"/api/users/{user_id}/revoke-tokens", headers=admin)
+    assert response.status_code == 200
+    assert not _authenticated(client, tokens)
+    refreshed = client.post("/api/token/refresh", json={"refresh_token": tokens["refresh_token"]})
+    assert refreshed.status_code == 401
+
+def test_revoke_user_tokens_is_one_transaction(client, admin, monkeypatch):
+    user_id = register(client, "revoke_atomic")
+    tokens = login(client, "revoke_atomic", "pw123456")
+
+    def fail(db):
+        raise sqlite3.OperationalError("refresh token revocation failed")
+
+    monkeypatch.setattr(session_store, "user_revocation", lambda user_id: (fail, lambda: None))
+    with pytest.raises(sqlite3.OperationalError):
+        client.post(f"/api/users/{user_id}/revoke-tokens", headers=admin)
+    monkeypatch.undo()
+
+    # The access token cutoff was rolled back along with the failed refresh part
+    assert _authenticated(client, tokens)
+    refreshed = client.post("/api/token/refresh", json={"refresh_token": tokens["refresh_token"]})
+    assert refreshed.status_code == 200
+
+def test_refresh_token_reuse_revokes_the_family(client):
+    register(client, "reuse")
+    first = login(client, "reuse", "pw123456")["refresh_token"]
+    second = client.post("/api/token/refresh", json={"refresh_token": first}).json()["refresh_token"]
+
+    assert client.post("/api/token/refresh", json={"refresh_token": first}).status_code == 401
+    assert client.post("/api/token/refresh", json={"refresh_token": second}).status_code == 401
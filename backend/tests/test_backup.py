@@ -0,0 +1,57 @@
+import sqlite3
+from app.db.database import DATABASE_URL
+from app.services.keyring import key_ring
+from tests.helpers import bearer, login, register
+
+def _backup(client, admin) -> str:
+    response = client.post("/api/settings/backup", headers=admin)
+    assert response.status_code == 200, response.text
+    return response.json()["id"]
+
+def _restore(client, admin, backup_id: str):
+    response = client.post(f"/api/settings/backups/{backup_id}/restore", headers=admin)
+    assert response.status_code == 200, response.text
+
+def _status(client, tokens) -> int:
+    return client.get("/api/verify-admin", headers=bearer(tokens)).status_code
+
+def test_restore_rolls_back_data(client, admin):
+    backup_id = _backup(client, admin)
+    user_id = register(client, "after_backup")
+    _restore(client, admin, backup_id)
+    assert client.get(f"/api/users/{user_id}", headers=admin).status_code == 404
+
+def test_revoked_tokens_stay_revoked_after_restore(client, admin):
+    user_id = register(client, "bob")
+    revoked = login(client, "bob", "pw123456")
+    cut_off = login(client, "bob", "pw123456")
+    backup_id = _backup(client, admin)
+
+    response = client.post("/api/token/revoke", headers=bearer(revoked),
+                           json={"refresh_token": revoked["refresh_token"]})
+    assert response.status_code == 200
+    assert client.post(f"/api/users/{user_id}/revoke-tokens", headers=admin).status_code == 200
+
+    _restore(client, admin, backup_id)
+    for tokens in (revoked, cut_off):
+        assert _status(client, tokens) == 401
+        refreshed = client.post("/api/token/refresh", json={"refresh_token": tokens["refresh_token"]})
+        assert refreshed.status_code == 401
+
+def _signing_keys() -> set:
+    db = sqlite3.connect(DATABASE_URL)
+    try:
+        return {kid for kid, in db.execute("SELECT kid FROM signing_keys")}
+    finally:
+        db.close()
+
+def test_restore_keeps_signing_keys_rotated_after_the_backup(client, admin):
+    backup_id = _backup(client, admin)
+    before = _signing_keys()
+    key_ring.rotate().result(timeout=10)
+    rotated = _signing_keys()
+    assert rotated > before
+
+    _restore(client, admin, backup_id)
+    assert _signing_keys() == rotated
+    assert _status(client, login(client, "admin", "admin123")) == 200
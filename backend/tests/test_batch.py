@@ -0,0 +1,42 @@
+from tests.helpers import bearer, login, register
+
+def _batch(client, headers, requests) -> list:
+    response = client.post("/api/batch", headers=headers, json={"requests": requests})
+    assert response.status_code == 200, response.text
+    return response.json()["responses"]
+
+def test_each_sub_request_gets_its_own_status(client, admin):
+    etag = client.get("/api/rbac/permissions", headers=admin).headers["etag"]
+    responses = _batch(client, admin, [
+        {"path": "/api/rbac/roles"},
+        {"path": "/api/rbac/permissions", "headers": {"If-None-Match": etag}},
+        {"path": "/api/nope"},
+        {"path": "/api/batch", "method": "POST"},
+        {"path": "/api/users/999999"},
+        {"path": "/api/users", "method": "POST", "body": {
+            "username": "from_batch", "email": "from_batch@example.com", "password": "pw123456"
+        }},
+    ])
+    assert [response["status"] for response in responses] == [200, 304, 404, 400, 404, 200]
+    assert isinstance(responses[0]["body"], list)
+    assert responses[1]["body"] is None
+    assert responses[4]["body"] == {"detail": "User not found"}
+    assert responses[5]["body"]["username"] == "from_batch"
+
+def test_sub_requests_keep_their_permission_checks(client):
+    register(client, "batch_plain")
+    plain = bearer(login(client, "batch_plain", "pw123456"))
+    responses = _batch(client, plain, [{"path": "/api/rbac/roles"}, {"path": "/api/users"}])
+    assert [response["status"] for response in responses] == [403, 403]
+
+def test_bad_header_fails_only_its_sub_request(client, admin):
+    responses = _batch(client, admin, [
+        {"path": "/api/rbac/roles", "headers": {"X-Note": "é€"}},
+        {"path": "/api/rbac/roles"},
+    ])
+    assert responses[0]["status"] == 400
+    assert responses[0]["body"] == {"detail": "Invalid batch header"}
+    assert responses[1]["status"] == 200
+
+def test_batch_requires_authentication(client):
+    assert client.post("/api/batch", json={"requests": []}).status_code == 401
@@ -0,0 +1,25 @@
+def test_roles_revalidate_with_304(client, admin):
+    first = client.get("/api/rbac/roles", headers=admin)
+    assert first.status_code == 200
+    etag = first.headers["etag"]
+
+    again = client.get("/api/rbac/roles", headers={**admin, "If-None-Match": etag})
+    assert again.status_code == 304
+    assert again.headers["etag"] == etag
+
+def test_roles_etag_ignores_user_changes(client, admin):
+    etag = client.get("/api/rbac/roles", headers=admin).headers["etag"]
+    created = client.post("/api/users", headers=admin, json={
+        "username": "etag_user", "email": "etag_user@example.com", "password": "pw123456"
+    })
+    assert created.status_code == 200
+    response = client.get("/api/rbac/roles", headers={**admin, "If-None-Match": etag})
+    assert response.status_code == 304
+
+def test_roles_etag_changes_with_roles(client, admin):
+    etag = client.get("/api/rbac/roles", headers=admin).headers["etag"]
+    assert client.post("/api/rbac/roles", headers=admin, json={"name": "etag_role"}).status_code == 200
+    response = client.get("/api/rbac/roles", headers={**admin, "If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["etag"] != etag
+    assert "etag_role" in [role["name"] for role in response.json()]
@@ -0,0 +1,77 @@
+import asyncio
+import multiprocessing
+import sqlite3
+import time
+from app.config import settings
+from app.db.changes import ChangeFeed, EntityCache
+from app.db.database import create_schema
+from app.db.writer import DatabaseWriter
+
+WORKERS = 3
+# Time for a worker process to wake up and read the change log after a poll
+SLACK = 0.25
+
+def _worker(database: str, ready, results):
+    """Cache user 1, then report when the change feed drops it."""
+    feed = ChangeFeed()
+    writer = DatabaseWriter(database)
+    cache = EntityCache(feed, "users")
+    feed.start(database, writer)
+    cache.put("admin", "cached", 1)
+    ready.release()
+
+    async def wait_for_invalidation():
+        poller = asyncio.create_task(feed.run(settings.CHANGE_POLL_INTERVAL))
+        try:
+            while cache._entries:
+                await asyncio.sleep(0.005)
+        finally:
+            poller.cancel()
+        return time.time()
+
+    results.put(asyncio.run(wait_for_invalidation()))
+    feed.stop()
+    writer.stop()
+
+def _create_database(path: str):
+    db = sqlite3.connect(path)
+    db.execute("PRAGMA journal_mode=WAL")
+    create_schema(db)
+    db.execute(
+        "INSERT INTO users (id, username, email, hashed_password) VALUES (1, 'admin', 'a@x.com', '-')"
+    )
+    db.commit()
+    db.close()
+
+def test_write_in_one_process_invalidates_the_others(tmp_path):
+    database = str(tmp_path / "app.db")
+    _create_database(database)
+
+    context = multiprocessing.get_context("spawn")
+    ready = context.Semaphore(0)
+    results = context.Queue()
+    workers = [
+        context.Process(target=_worker, args=(database, ready, results), daemon=True)
+        for _ in range(WORKERS)
+    ]
+    for worker in workers:
+        worker.start()
+    try:
+        for _ in workers:
+            assert ready.acquire(timeout=30)
+
+        db = sqlite3.connect(database)
+        db.execute("UPDATE users SET email = 'b@x.com' WHERE id = 1")
+        db.commit()
+        committed = time.time()
+        db.close()
+
+        invalidated = [results.get(timeout=10) for _ in workers]
+    finally:
+        for worker in workers:
+            worker.join(timeout=5)
+            if worker.is_alive():
+                worker.terminate()
+
+    for at in invalidated:
+        assert at - committed <= settings.CHANGE_POLL_INTERVAL + SLACK
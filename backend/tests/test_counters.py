@@ -0,0 +1,53 @@
+import sqlite3
+import pytest
+from app.db.counters import ACTIVE_USERS, AUDIT_EVENTS, ROLE_USERS, ROLES, USERS, read_counter
+from app.db.database import create_schema
+
+@pytest.fixture
+def db(tmp_path):
+    db = sqlite3.connect(tmp_path / "app.db")
+    create_schema(db)
+    db.commit()
+    yield db
+    db.close()
+
+def _count(db, sql: str, *params) -> int:
+    return db.execute(sql, params).fetchone()[0]
+
+def _assert_exact(db):
+    assert read_counter(db, USERS) == _count(db, "SELECT COUNT(*) FROM users")
+    assert read_counter(db, ACTIVE_USERS) == _count(db, "SELECT COUNT(*) FROM users WHERE is_active")
+    assert read_counter(db, ROLES) == _count(db, "SELECT COUNT(*) FROM roles")
+    for role_id, in db.execute("SELECT id FROM roles").fetchall():
+        assert read_counter(db, f"{ROLE_USERS}{role_id}") == _count(
+            db, "SELECT COUNT(*) FROM users WHERE role_id = ?", role_id
+        )
+
+def test_user_counters_follow_inserts_updates_and_deletes(db):
+    role_ids = [row[0] for row in db.execute("SELECT id FROM roles ORDER BY id")]
+    db.executemany(
+        "INSERT INTO users (username, email, hashed_password, role_id, is_active) VALUES (?, ?, '-', ?, ?)",
+        [(f"u{i}", f"u{i}@x.com", role_ids[i % len(role_ids)], i % 3 != 0) for i in range(12)]
+    )
+    _assert_exact(db)
+
+    db.execute("UPDATE users SET is_active = 0 WHERE username IN ('u1', 'u2')")
+    db.execute("UPDATE users SET role_id = ? WHERE username = 'u4'", (role_ids[0],))
+    _assert_exact(db)
+
+    db.execute("DELETE FROM users WHERE username IN ('u0', 'u5')")
+    _assert_exact(db)
+
+def test_role_and_audit_counters(db):
+    db.execute("INSERT INTO roles (name) VALUES ('extra')")
+    _assert_exact(db)
+    db.execute("DELETE FROM roles WHERE name = 'extra'")
+    _assert_exact(db)
+
+    db.executemany(
+        "INSERT INTO audit_logs (action, entity_type, created_at) VALUES ('x', 'y', ?)",
+        [("2024-01-01 10:00:00",), ("2024-01-01 11:00:00",), ("2024-01-02 09:00:00",)]
+    )
+    db.execute("DELETE FROM audit_logs WHERE created_at = '2024-01-01 10:00:00'")
+    assert read_counter(db, f"{AUDIT_EVENTS}2024-01-01") == 1
+    assert read_counter(db, f"{AUDIT_EVENTS}2024-01-02") == 1
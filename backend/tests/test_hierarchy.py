@@ -0,0 +1,33 @@
+def _role(client, admin, name: str, parent_id=None) -> dict:
+    response = client.post("/api/rbac/roles", headers=admin, json={"name": name, "parent_id": parent_id})
+    assert response.status_code == 200, response.text
+    return response.json()
+
+def test_role_cannot_inherit_from_itself_or_a_descendant(client, admin):
+    parent = _role(client, admin, "cycle_parent")
+    child = _role(client, admin, "cycle_child", parent["id"])
+
+    for role_id, parent_id in ((parent["id"], child["id"]), (child["id"], child["id"])):
+        response = client.put(f"/api/rbac/roles/{role_id}", headers=admin, json={"parent_id": parent_id})
+        assert response.status_code == 400
+        assert "inherit" in response.json()["detail"]
+
+def test_missing_parent_is_rejected(client, admin):
+    response = client.post("/api/rbac/roles", headers=admin, json={"name": "orphan", "parent_id": 999999})
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Parent role not found"
+    names = [role["name"] for role in client.get("/api/rbac/roles", headers=admin).json()]
+    assert "orphan" not in names
+
+    role = _role(client, admin, "reparented")
+    response = client.put(f"/api/rbac/roles/{role['id']}", headers=admin, json={"parent_id": 999999})
+    assert response.status_code == 400
+    roles = {role["id"]: role for role in client.get("/api/rbac/roles", headers=admin).json()}
+    assert roles[role["id"]]["parent_id"] is None
+
+def test_moving_a_role_keeps_it_valid(client, admin):
+    parent = _role(client, admin, "move_parent")
+    role = _role(client, admin, "move_child")
+    response = client.put(f"/api/rbac/roles/{role['id']}", headers=admin, json={"parent_id": parent["id"]})
+    assert response.status_code == 200
+    assert response.json()["parent_id"] == parent["id"]
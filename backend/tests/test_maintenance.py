@@ -0,0 +1,45 @@
+import asyncio
+import sqlite3
+from app.db.maintenance import (
+    AUTO_VACUUM_INCREMENTAL, MaintenanceScheduler, MaintenanceTask,
+    enable_incremental_vacuum, incremental_vacuum,
+)
+
+def _legacy_database(path) -> str:
+    db = sqlite3.connect(path)
+    db.execute("CREATE TABLE t (value TEXT)")
+    db.executemany("INSERT INTO t VALUES (?)", [("x" * 1000,)] * 200)
+    db.execute("DELETE FROM t")
+    db.commit()
+    db.close()
+    return str(path)
+
+def test_scheduled_vacuum_never_converts(tmp_path):
+    database = _legacy_database(tmp_path / "legacy.db")
+    db = sqlite3.connect(database, isolation_level=None)
+    result = incremental_vacuum(100)(db)
+    assert "skipped" in result
+    assert db.execute("PRAGMA auto_vacuum").fetchone()[0] != AUTO_VACUUM_INCREMENTAL
+    db.close()
+
+def test_offline_conversion_enables_incremental_vacuum(tmp_path):
+    database = _legacy_database(tmp_path / "legacy.db")
+    assert enable_incremental_vacuum(database)["converted"]
+    assert enable_incremental_vacuum(database) == {"converted": False}
+    db = sqlite3.connect(database, isolation_level=None)
+    assert db.execute("PRAGMA auto_vacuum").fetchone()[0] == AUTO_VACUUM_INCREMENTAL
+    db.close()
+
+def test_failing_task_is_logged_and_counted(tmp_path):
+    def broken(db):
+        raise ValueError("not a database error")
+
+    task = MaintenanceTask("broken", 0, broken)
+    scheduler = MaintenanceScheduler([task])
+    scheduler.start(str(tmp_path / "app.db"), is_idle=lambda: True)
+    try:
+        asyncio.run(scheduler._execute(task))
+    finally:
+        scheduler.stop()
+    assert task.stats["failures"] == 1
+    assert task.stats["last_result"] is None
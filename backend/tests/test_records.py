@@ -0,0 +1,14 @@
+from app.db.records import RoleRecord
+
+def test_get_falls_back_to_default_for_unset_fields():
+    role = RoleRecord()
+    assert role.permissions is None
+    assert role.get("permissions", []) == []
+    assert role.get("not_a_field", "default") == "default"
+
+def test_get_returns_set_fields_even_when_none():
+    role = RoleRecord()
+    role.permissions = None
+    role.name = "admin"
+    assert role.get("permissions", []) is None
+    assert role.get("name") == "admin"
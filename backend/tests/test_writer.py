@@ -0,0 +1,62 @@
+import sqlite3
+import threading
+import pytest
+from app.db.writer import DatabaseWriter
+
+@pytest.fixture
+def writer(tmp_path):
+    database = str(tmp_path / "app.db")
+    db = sqlite3.connect(database)
+    db.execute("PRAGMA journal_mode=WAL")
+    db.execute("CREATE TABLE items (name TEXT PRIMARY KEY)")
+    db.commit()
+    db.close()
+    writer = DatabaseWriter(database)
+    yield writer, database
+    writer.stop()
+
+def _names(database: str) -> set:
+    db = sqlite3.connect(database)
+    try:
+        return {name for name, in db.execute("SELECT name FROM items")}
+    finally:
+        db.close()
+
+def test_failing_job_does_not_roll_back_its_batch_mates(writer):
+    writer, database = writer
+    started, release = threading.Event(), threading.Event()
+
+    def block(db):
+        started.set()
+        release.wait(10)
+
+    # Hold the writer so the next jobs queue up and run as one batch
+    blocker = writer.submit(block)
+    assert started.wait(10)
+
+    def failing(db):
+        db.execute("INSERT INTO items VALUES ('b')")
+        raise ValueError("job failed")
+
+    first = writer.submit(lambda db: db.execute("INSERT INTO items VALUES ('a')").rowcount)
+    second = writer.submit(failing)
+    third = writer.submit(lambda db: db.execute("INSERT INTO items VALUES ('c')").rowcount)
+    release.set()
+    blocker.result(timeout=10)
+
+    assert first.result(timeout=10) == 1
+    with pytest.raises(ValueError):
+        second.result(timeout=10)
+    assert third.result(timeout=10) == 1
+    assert writer.batches == 2
+    assert _names(database) == {"a", "c"}
+
+def test_constraint_violation_fails_only_its_job(writer):
+    writer, database = writer
+    writer.submit(lambda db: db.execute("INSERT INTO items VALUES ('x')")).result(timeout=10)
+    duplicate = writer.submit(lambda db: db.execute("INSERT INTO items VALUES ('x')"))
+    other = writer.submit(lambda db: db.execute("INSERT INTO items VALUES ('y')"))
+    with pytest.raises(sqlite3.IntegrityError):
+        duplicate.result(timeout=10)
+    other.result(timeout=10)
+    assert _names(database) == {"x", "y"}
@@ -88,11 +88,10 @@ class AdminDashboard {
     async loadDashboard() {
         const contentArea = document.getElementById('contentArea');
         try {
-            const [userCount, roleCount, recentActivities] = await Promise.all([
-                this.fetchUserCount(),
-                this.fetchRoleCount(),
-                this.fetchRecentActivities()
-            ]);
+            const summary = await this.fetchSummary();
+            const userCount = summary.users.total;
+            const roleCount = summary.roles ? summary.roles.total : '-';
+            const recentActivities = summary.recent_activity || [];
 
             contentArea.innerHTML = `
                 <div class="dashboard-grid">
@@ -121,28 +120,8 @@ class AdminDashboard {
         }
     }
 
-    async fetchUserCount() {
-        const response = await fetch('http://localhost:8000/api/rbac/users/count', {
-            headers: {
-                'Authorization': `Bearer ${localStorage.getItem('token')}`
-            }
-        });
-        const data = await response.json();
-        return data.count;
-    }
-
-    async fetchRoleCount() {
-        const response = await fetch('http://localhost:8000/api/rbac/roles/count', {
-            headers: {
-                'Authorization': `Bearer ${localStorage.getItem('token')}`
-            }
-        });
-        const data = await response.json();
-        return data.count;
-    }
-
-    async fetchRecentActivities() {
-        const response = await fetch('http://localhost:8000/api/audit/recent', {
+    async fetchSummary() {
+        const response = await fetch('http://localhost:8000/api/dashboard/summary', {
             headers: {
                 'Authorization': `Bearer ${localStorage.getItem('token')}`
             }
@@ -19,6 +19,8 @@ showLoginLink.addEventListener('click', (e) => {
     e.preventDefault();
     toggleForms('loginForm');
 });
+document.getElementById('registerUsername').addEventListener('input', scheduleAvailabilityCheck);
+document.getElementById('registerEmail').addEventListener('input', scheduleAvailabilityCheck);
 
 // Form Handlers
 async function handleLogin(e) {
@@ -98,6 +100,37 @@ async function handleRegister(e) {
     }
 }
 
+let availabilityTimer = null;
+
+function scheduleAvailabilityCheck() {
+    clearTimeout(availabilityTimer);
+    availabilityTimer = setTimeout(checkAvailability, 300);
+}
+
+async function checkAvailability() {
+    const params = new URLSearchParams();
+    const username = document.getElementById('registerUsername').value;
+    const email = document.getElementById('registerEmail').value;
+    if (username) params.set('username', username);
+    if (email) params.set('email', email);
+    if (!username && !email) return;
+
+    try {
+        const response = await fetch(`${API_URL}/api/users/availability?${params}`);
+        if (!response.ok) return;
+        const data = await response.json();
+        if (data.username && !data.username.available) {
+            showError('registerError', 'Username already registered');
+        } else if (data.email && !data.email.available) {
+            showError('registerError', 'Email already registered');
+        } else {
+            clearError('registerError');
+        }
+    } catch (error) {
+        // The check is advisory; registration reports conflicts as well
+    }
+}
+
 function handleLogout() {
     localStorage.removeItem('token');
     localStorage.removeItem('username');